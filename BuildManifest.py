@@ -0,0 +1,177 @@
+##############################################################################
+# The build manifest of incremental builds. Kept next to the outputs, it
+# records for every source the hash of its text, the settings it was compiled
+# with, the version of the compiler and the hashes of its outputs. A source
+# whose text, settings and compiler did not change since it was compiled, and
+# whose outputs are still the ones written then, need not be compiled again.
+##############################################################################
+import os
+from CompilerDefaults import *
+
+#############
+# CONSTANTS #
+#############
+MANIFEST_FORMAT = 1         # Bump whenever the layout of the manifest changes
+COMPILER_EXTENSION = ".py"
+KEY_FORMAT = "format"
+KEY_COMPILER = "compiler"
+KEY_SOURCES = "sources"
+KEY_SOURCE = "source"
+KEY_SETTINGS = "settings"
+KEY_OUTPUTS = "outputs"
+CHUNK_SIZE = 1024 * 1024
+SUMMARY_FORMAT = "Build: {} rebuilt, {} skipped"
+
+
+def hashFile(name):
+    """
+    Returns the hash of the contents of a file, or None if it is missing.
+    """
+    import hashlib
+    digest = hashlib.sha256()
+    try:
+        with open(name, 'rb') as data:
+            for chunk in iter(lambda: data.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def hashStrings(strings):
+    """
+    Returns the hash of a sequence of strings.
+    """
+    import hashlib
+    digest = hashlib.sha256()
+    for string in strings:
+        digest.update(string.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def compilerVersion():
+    """
+    Returns the version of the compiler: the hash of its modules.
+    """
+    import glob
+    directory = os.path.dirname(os.path.abspath(__file__))
+    modules = sorted(glob.glob(os.path.join(directory,
+                                            "*" + COMPILER_EXTENSION)))
+    return hashStrings([hashFile(module) or "" for module in modules])
+
+
+class BuildManifest:
+    """
+    Records the sources built into a directory, and their outputs.
+    """
+
+    ################
+    # CONSTRUCTORS #
+    ################
+
+    def __init__(self, directory):
+        """
+        Loads the manifest of the given directory (or starts a new one).
+        :param directory: directory of the sources and the outputs.
+        """
+        self.__path = os.path.join(directory, MANIFEST_NAME)
+        self.__compiler = compilerVersion()
+        self.__sources = dict()
+        self.__hashes = dict()
+        self.rebuilt = 0
+        self.skipped = 0
+        import json
+        try:
+            with open(self.__path, 'r') as manifest:
+                content = json.load(manifest)
+        except (OSError, ValueError):
+            return
+        if isinstance(content, dict) and \
+                content.get(KEY_FORMAT) == MANIFEST_FORMAT and \
+                content.get(KEY_COMPILER) == self.__compiler:
+            self.__sources = content.get(KEY_SOURCES, dict())
+
+    ###################
+    # PRIVATE METHODS #
+    ###################
+
+    def __sourceHash(self, sourcename):
+        """
+        Returns the hash of a source, hashing it once per build.
+        """
+        if sourcename not in self.__hashes:
+            self.__hashes[sourcename] = hashFile(sourcename)
+        return self.__hashes[sourcename]
+
+    ##################
+    # PUBLIC METHODS #
+    ##################
+
+    def programHash(self, sources):
+        """
+        Returns the hash of all the sources of a program, for the settings of
+        builds whose outputs depend on every source.
+        """
+        return hashStrings([self.__sourceHash(sourcename) or ""
+                            for sourcename in sorted(sources)])
+
+    def isCurrent(self, sourcename, settings, outputs):
+        """
+        Were the outputs of a source built from its current text, with the
+        given settings, and not changed since?
+        :param sourcename: name of the source.
+        :param settings: (String) description of the build settings.
+        :param outputs: names of the outputs of the source.
+        """
+        entry = self.__sources.get(os.path.basename(sourcename))
+        if entry is None or entry[KEY_SETTINGS] != settings or \
+                entry[KEY_SOURCE] != self.__sourceHash(sourcename):
+            return False
+        hashes = entry[KEY_OUTPUTS]
+        return sorted(hashes) == sorted([os.path.basename(output)
+                                         for output in outputs]) and \
+            all([hashFile(output) == hashes[os.path.basename(output)]
+                 for output in outputs])
+
+    def record(self, sourcename, settings, outputs):
+        """
+        Records the outputs just built from a source.
+        :param sourcename: name of the source.
+        :param settings: (String) description of the build settings.
+        :param outputs: names of the outputs of the source.
+        """
+        self.__sources[os.path.basename(sourcename)] = {
+            KEY_SOURCE: self.__sourceHash(sourcename),
+            KEY_SETTINGS: settings,
+            KEY_OUTPUTS: {os.path.basename(output): hashFile(output)
+                          for output in outputs}}
+
+    def forget(self, sourcename):
+        """
+        Removes a source from the manifest (such as one which failed).
+        """
+        self.__sources.pop(os.path.basename(sourcename), None)
+
+    def save(self):
+        """
+        Writes the manifest next to the outputs.
+        """
+        import json
+        import tempfile
+        content = {KEY_FORMAT: MANIFEST_FORMAT,
+                   KEY_COMPILER: self.__compiler,
+                   KEY_SOURCES: self.__sources}
+        descriptor, temp = tempfile.mkstemp(
+            dir=os.path.dirname(self.__path) or os.curdir)
+        with os.fdopen(descriptor, 'w') as manifest:
+            json.dump(content, manifest, indent=1, sort_keys=True)
+        os.replace(temp, self.__path)
+        # Sources may change before the next build
+        self.__hashes.clear()
+
+    def summary(self):
+        """
+        Returns a one line summary of the rebuilt and skipped sources.
+        """
+        return SUMMARY_FORMAT.format(self.rebuilt, self.skipped)
@@ -0,0 +1,165 @@
+###############################################################################
+# The compiler as a library: compiles Jack code held in memory into VM code
+# and XML held in memory, without touching the filesystem. A class is given
+# as its text, a program as a mapping of its class names to their texts, and
+# many independent programs (such as the submissions of a grading service)
+# can be compiled in a single call, on a pool of worker processes.
+#   vm, xml = compileClass(text)
+#   outputs = compileProgram({"Main": main_text, "Square": square_text})
+#   vm = outputs["Main"][0]
+# The options are those of the JackAnalyzer (see analyze()).
+###############################################################################
+import concurrent.futures
+import io
+from CompilationEngine import *
+from JackAnalyzer import *
+from TreeShaker import *
+from VMInliner import *
+
+
+def sourceClass(name):
+    """
+    Returns the class name of a source name (Xxx or Xxx.jack).
+    """
+    if name.endswith(SOURCE_EXTENSION):
+        return name[:-len(SOURCE_EXTENSION)]
+    return name
+
+
+def compileClass(source, mode=MODE_ALL, xml_indent=True, optimizer=None,
+                 fold_constants=False, pool_strings=False, keep=None,
+                 lower_arrays=False, lower_branches=False, token_cache=None,
+                 name=""):
+    """
+    Compiles the text of a class (see analyze() for the parameters).
+    :param source: (String) Jack code of the class.
+    :param keep: names of the VM functions to emit (or None for all of
+    them), see TreeShaker.
+    :param token_cache: TokenCache for the tokenizer (or None).
+    :param name: name of the class.
+    :return: (VM code, XML), either None if the mode does not output it.
+    """
+    outxml = io.StringIO() if mode in XML_MODES else None
+    outvm = io.StringIO() if mode in VM_MODES else None
+    engine = CompilationEngine(name, io.StringIO(source), outxml, outvm,
+                               token_cache, xml_indent=xml_indent,
+                               optimizer=optimizer,
+                               fold_constants=fold_constants,
+                               pool_strings=pool_strings, keep=keep,
+                               lower_arrays=lower_arrays,
+                               lower_branches=lower_branches)
+    engine.compileClass()
+    return (None if outvm is None else outvm.getvalue(),
+            None if outxml is None else outxml.getvalue())
+
+
+def compileProgram(sources, mode=MODE_ALL, xml_indent=True, optimizer=None,
+                   fold_constants=False, pool_strings=False, shake=False,
+                   inline=False, inline_budget=DEFAULT_BUDGET,
+                   lower_arrays=False, lower_branches=False,
+                   token_cache=None, errors=None, removed=None):
+    """
+    Compiles the classes of a program (see analyze() for the parameters).
+    :param sources: dictionary of the class names (Xxx, or Xxx.jack) to the
+    text of the classes.
+    :param inline: inline the calls of small functions across the classes.
+    :param inline_budget: size of the largest inlined function, in VM
+    commands (see VMInliner).
+    :param token_cache: TokenCache for the tokenizers (or None).
+    :param errors: dictionary to store the error messages of the classes
+    which fail to compile in, by class name (or None). A failing class then
+    does not stop the others.
+    :param removed: list to append the names of the VM functions dropped by
+    shake to (or None).
+    :return: dictionary of the class names to their (VM code, XML), either
+    None if the mode does not output it.
+    """
+    names = sorted(sources)
+
+    # Find the subroutines the program uses
+    keep = None
+    if shake and mode in VM_MODES:
+        graph = CallGraph()
+        parsed = []
+        for name in names:
+            try:
+                graph.addClass(io.StringIO(sources[name]), token_cache)
+            except Exception as exception:
+                if errors is None:
+                    raise
+                # Reported as failed, and not compiled
+                errors[sourceClass(name)] = ERROR_FORMAT.format(
+                    type(exception).__name__, exception)
+                continue
+            parsed.append(name)
+        names = parsed
+        keep = graph.reachable()
+        if keep is not None and removed is not None:
+            removed += sorted(graph.functions() - keep)
+
+    # Compile every class
+    outputs = dict()
+    for name in names:
+        try:
+            outputs[sourceClass(name)] = compileClass(
+                sources[name], mode, xml_indent, optimizer, fold_constants,
+                pool_strings, keep, lower_arrays, lower_branches, token_cache,
+                sourceClass(name))
+        except Exception as exception:
+            if errors is None:
+                raise
+            errors[sourceClass(name)] = ERROR_FORMAT.format(
+                type(exception).__name__, exception)
+
+    # Inline the small functions of the whole program
+    if inline and mode in VM_MODES:
+        inliner = VMInliner(inline_budget, optimizer)
+        vm_code = {name: vm.splitlines() for name, (vm, _) in outputs.items()}
+        for commands in vm_code.values():
+            inliner.addClass(commands)
+        for name, commands in vm_code.items():
+            outputs[name] = (NEWLINE.join(inliner.inlineClass(commands)) +
+                             NEWLINE, outputs[name][1])
+    return outputs
+
+
+def compileProgramJob(job):
+    """
+    Compiles a program, catching its errors (see compilePrograms()).
+    :param job: (sources, keyword arguments of compileProgram()).
+    :return: (outputs, errors, removed functions).
+    """
+    sources, options = job
+    errors, removed = dict(), []
+    try:
+        outputs = compileProgram(sources, errors=errors, removed=removed,
+                                 **options)
+    except Exception as exception:
+        # The program as a whole failed (such as the call graph of shake)
+        outputs = dict()
+        errors[None] = ERROR_FORMAT.format(type(exception).__name__,
+                                           exception)
+    return outputs, errors, removed
+
+
+def compilePrograms(programs, jobs=1, **options):
+    """
+    Compiles many independent programs. A failing program (or class) does
+    not stop the others.
+    :param programs: list of the programs, each a dictionary of its class
+    names to their texts (see compileProgram()).
+    :param jobs: number of worker processes (1 to compile in this process,
+    0 for one per CPU).
+    :param options: keyword arguments of compileProgram() (but errors and
+    removed). The token cache, if any, is not shared with the workers.
+    :return: list of (outputs, errors, removed functions) by program, as
+    returned and filled by compileProgram(). The error of a program failing
+    as a whole is stored under None.
+    """
+    jobs = jobs or os.cpu_count()
+    tasks = [(sources, options) for sources in programs]
+    if jobs == 1:
+        return list(map(compileProgramJob, tasks))
+    chunk = max(1, len(tasks) // (jobs * JOB_CHUNKS))
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        return list(executor.map(compileProgramJob, tasks, chunksize=chunk))
@@ -0,0 +1,82 @@
+###############################################################################
+# A thin client of the CompileServer (see CompileProtocol), and a drop-in
+# replacement for the JackAnalyzer: it takes the same command line, reads the
+# sources of the given path, sends them to the server in a single request and
+# writes the outputs the server returns next to the sources. The token cache,
+# the build manifest and the worker processes are the server's business, so
+# --cache, --incremental, --jobs and --profile are accepted but ignored.
+###############################################################################
+import json
+import os
+import sys
+from CompileProtocol import *
+from JackAnalyzer import *
+
+FAILED_EXIT_STATUS = 1
+
+
+def compileRemote(path, args, socket_path=DEFAULT_SOCKET):
+    """
+    Compiles the .jack source file (or files) in the given path on the
+    server, writing the outputs next to them.
+    :param path: a .jack file or a directory of .jack files.
+    :param args: parsed command line arguments of the analyzer.
+    :param socket_path: path of the socket of the server.
+    :return: (names of the dropped VM functions, dictionary of source names
+    to the errors of the sources which failed).
+    """
+    sources = findSources(path)
+    texts = dict()
+    for sourcename in sources:
+        with open(sourcename, 'r') as source:
+            texts[os.path.basename(sourcename)] = source.read()
+    options = {option: getattr(args, option) for option in OPTIONS}
+    response = request({KEY_OP: OP_COMPILE, KEY_OPTIONS: options,
+                        KEY_SOURCES: texts}, socket_path)
+    directory = os.path.dirname(sources[0]) if sources else path
+    for outname, text in response[KEY_OUTPUTS].items():
+        outname = os.path.join(directory, os.path.basename(outname))
+        compress = args.gzip_xml and outname.endswith(XML_EXTENSION)
+        with openOutput(outname, True, compress) as output:
+            output.write(text)
+    errors = {os.path.join(directory, sourcename): error
+              for sourcename, error in response[KEY_ERRORS].items()}
+    return response[KEY_REMOVED], errors
+
+
+def parseClientArguments(argv):
+    """
+    Parses the command line arguments of the client: those of the analyzer,
+    and the socket of the server.
+    :param argv: command line arguments (without the program name).
+    """
+    parser = createParser()
+    parser.add_argument("--socket", metavar="PATH", default=DEFAULT_SOCKET,
+                        help="path of the socket of the server (default: "
+                             "%(default)s)")
+    parser.add_argument("--server-stats", action="store_true",
+                        help="print the counters of the server instead of "
+                             "compiling")
+    return parser.parse_args(argv)
+
+
+if (__name__ == "__main__"):
+    args = parseClientArguments(sys.argv[1:])
+    try:
+        if args.server_stats:
+            print(json.dumps(request({KEY_OP: OP_STATS}, args.socket),
+                             indent=1, sort_keys=True))
+            sys.exit(0)
+        removed, errors = compileRemote(args.path, args, args.socket)
+    except RuntimeError as error:
+        # The request failed as a whole
+        print(JOB_FAILED_FORMAT.format(args.path, error))
+        sys.exit(FAILED_EXIT_STATUS)
+    if args.shake:
+        print("Removed {} unreachable subroutines".format(len(removed)))
+        for name in removed:
+            print("  " + name)
+    for sourcename, error in sorted(errors.items()):
+        print(JOB_FAILED_FORMAT.format(sourcename, error))
+    if errors:
+        sys.exit(FAILED_EXIT_STATUS)
@@ -0,0 +1,298 @@
+###############################################################################
+# Profiles a compilation by phase and by file. Installing the profiler wraps
+# the methods of the compiler which make up every phase (reading, tokenizing,
+# parsing, symbol lookups, folding, generating, optimizing, writing, shaking
+# and inlining); their wall and CPU time is recorded exclusively, so the time
+# of a phase does not include the phases it calls into (the time of the
+# parser does not include the tokenizer it pulls tokens from). The time
+# outside of every phase is recorded as 'other'. Nothing is wrapped until the
+# profiler is installed, so the compiler runs at full speed without it.
+# The report holds the totals of the phases and, for every compiled file, its
+# time by phase, its tokens, its VM commands and the bytes of its outputs.
+###############################################################################
+import importlib
+import json
+import os
+import time
+
+#############
+# CONSTANTS #
+#############
+PHASE_OTHER = "other"
+PROGRAM_FILE = "(program)"      # The time spent outside of any single file
+
+# Phases --> methods (module, class, method) making up the phase. Private
+# methods are given by their mangled names.
+PHASES = [
+    ("read", [("JackTokenizer", "JackTokenizer",
+               "_JackTokenizer__readChunk")]),
+    ("tokenize", [("JackTokenizer", "JackTokenizer",
+                   "_JackTokenizer__tokenizeWindow"),
+                  ("JackTokenizer", "JackTokenizer",
+                   "_JackTokenizer__loadCached")]),
+    ("parse", [("JackParser", "JackParser", "parseClassDeclarations"),
+               ("JackParser", "JackParser", "parseSubroutine"),
+               ("JackParser", "JackParser", "parseClassEnd")]),
+    ("symbols", [("SymbolTable", "SymbolTable", "startSubroutine"),
+                 ("SymbolTable", "SymbolTable", "define"),
+                 ("SymbolTable", "SymbolTable", "varCount"),
+                 ("SymbolTable", "SymbolTable", "segmentOf"),
+                 ("SymbolTable", "SymbolTable", "kindOf"),
+                 ("SymbolTable", "SymbolTable", "typeOf"),
+                 ("SymbolTable", "SymbolTable", "indexOf")]),
+    ("fold", [("ConstantFolder", "ConstantFolder", "foldSubroutine")]),
+    ("generate xml", [("XMLGenerator", "XMLGenerator", "beginClass"),
+                      ("XMLGenerator", "XMLGenerator", "generateSubroutine"),
+                      ("XMLGenerator", "XMLGenerator", "endClass")]),
+    ("generate vm", [("VMGenerator", "VMGenerator", "beginClass"),
+                     ("VMGenerator", "VMGenerator", "generateSubroutine"),
+                     ("VMGenerator", "VMGenerator", "endClass")]),
+    ("optimize", [("VMOptimizer", "VMOptimizer", "optimize")]),
+    ("write", [("XMLWriter", "XMLWriter", "flush"),
+               ("VMWriter", "VMWriter", "_VMWriter__write"),
+               ("VMWriter", "VMWriter", "flush")]),
+    ("shake", [("TreeShaker", "CallGraph", "addClass"),
+               ("TreeShaker", "CallGraph", "reachable")]),
+    ("inline", [("VMInliner", "VMInliner", "addClass"),
+                ("VMInliner", "VMInliner", "inlineClass")])]
+TOKEN_METHOD = ("JackTokenizer", "JackTokenizer", "advance")
+
+# Keys of the report
+KEY_WALL = "wall"
+KEY_CPU = "cpu"
+KEY_CALLS = "calls"
+KEY_PHASES = "phases"
+KEY_FILES = "files"
+KEY_TOTAL = "total"
+KEY_TOKENS = "tokens"
+KEY_VM_COMMANDS = "vm_commands"
+KEY_BYTES = "bytes_written"
+
+# Summary table
+PHASE_HEADER = "{:<14} {:>9} {:>9} {:>6} {:>9}".format(
+    "Phase", "Wall (s)", "CPU (s)", "Wall", "Calls")
+PHASE_ROW = "{:<14} {:>9.4f} {:>9.4f} {:>6.1%} {:>9}"
+FILE_HEADER = "{:<28} {:>9} {:>9} {:>8} {:>8} {:>10}".format(
+    "File", "Wall (s)", "CPU (s)", "Tokens", "VM cmds", "Bytes")
+FILE_ROW = "{:<28} {:>9.4f} {:>9.4f} {:>8} {:>8} {:>10}"
+
+
+class CompileProfiler:
+    """
+    Records the time of the phases of a compilation, by file.
+    """
+
+    ###############
+    # CONSTRUCTOR #
+    ###############
+
+    def __init__(self):
+        """
+        Creates a new profiler (see install()).
+        """
+        self.__phases = dict()
+        self.__files = dict()
+        self.__stack = [PHASE_OTHER]
+        self.__file = PROGRAM_FILE
+        self.__mark = None
+        self.__start = None
+        self.__total = None
+        self.__originals = []
+
+    ###################
+    # PRIVATE METHODS #
+    ###################
+
+    @staticmethod
+    def __newPhase():
+        """
+        Returns the counters of a phase: [wall, cpu, calls].
+        """
+        return [0.0, 0.0, 0]
+
+    def __fileEntry(self, name):
+        """
+        Returns the counters of a file, adding it on first use.
+        """
+        if name not in self.__files:
+            self.__files[name] = {KEY_WALL: 0.0, KEY_CPU: 0.0,
+                                  KEY_TOKENS: 0, KEY_VM_COMMANDS: 0,
+                                  KEY_BYTES: 0, KEY_PHASES: dict()}
+        return self.__files[name]
+
+    def __charge(self):
+        """
+        Charges the time since the last mark to the current phase and file.
+        """
+        wall, cpu = time.perf_counter(), time.process_time()
+        if self.__mark is not None:
+            phase = self.__stack[-1]
+            for counters in (
+                    self.__phases.setdefault(phase, self.__newPhase()),
+                    self.__fileEntry(self.__file)[KEY_PHASES].setdefault(
+                        phase, self.__newPhase())):
+                counters[0] += wall - self.__mark[0]
+                counters[1] += cpu - self.__mark[1]
+        self.__mark = (wall, cpu)
+
+    def __enter(self, phase):
+        """
+        Starts a call of a phase.
+        """
+        self.__charge()
+        self.__stack.append(phase)
+        self.__phases.setdefault(phase, self.__newPhase())[2] += 1
+        self.__fileEntry(self.__file)[KEY_PHASES].setdefault(
+            phase, self.__newPhase())[2] += 1
+
+    def __leave(self):
+        """
+        Ends the current call of a phase.
+        """
+        self.__charge()
+        self.__stack.pop()
+
+    def __timed(self, phase, method):
+        """
+        Returns a method recording its time as the given phase.
+        """
+        def timed(*args, **kwargs):
+            self.__enter(phase)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.__leave()
+        return timed
+
+    def __counted(self, method):
+        """
+        Returns a method counting its calls as tokens of the current file.
+        """
+        def counted(*args, **kwargs):
+            self.__fileEntry(self.__file)[KEY_TOKENS] += 1
+            return method(*args, **kwargs)
+        return counted
+
+    def __wrap(self, location, wrapper):
+        """
+        Replaces a method by its wrapper, remembering the original.
+        :param location: (module, class, method) of the method.
+        """
+        module, class_name, name = location
+        owner = getattr(importlib.import_module(module), class_name)
+        method = owner.__dict__[name]
+        self.__originals.append((owner, name, method))
+        setattr(owner, name, wrapper(method))
+
+    ##################
+    # PUBLIC METHODS #
+    ##################
+
+    def install(self):
+        """
+        Wraps the methods of every phase, and starts the clock.
+        """
+        for phase, locations in PHASES:
+            for location in locations:
+                self.__wrap(location, lambda method, phase=phase:
+                            self.__timed(phase, method))
+        self.__wrap(TOKEN_METHOD, self.__counted)
+        self.__start = (time.perf_counter(), time.process_time())
+        self.__charge()
+
+    def uninstall(self):
+        """
+        Restores the wrapped methods, and stops the clock.
+        """
+        self.__charge()
+        self.__total = (time.perf_counter() - self.__start[0],
+                        time.process_time() - self.__start[1])
+        for owner, name, method in reversed(self.__originals):
+            setattr(owner, name, method)
+        self.__originals.clear()
+
+    def profileFiles(self, function):
+        """
+        Returns a function compiling a file (such as compileSource()) which
+        records its time as the time of the file named by its first argument.
+        """
+        def profiled(sourcename, *args, **kwargs):
+            self.__charge()
+            previous, self.__file = self.__file, sourcename
+            entry = self.__fileEntry(sourcename)
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                return function(sourcename, *args, **kwargs)
+            finally:
+                self.__charge()
+                entry[KEY_WALL] += time.perf_counter() - wall
+                entry[KEY_CPU] += time.process_time() - cpu
+                self.__file = previous
+        return profiled
+
+    def addOutputs(self, sourcename, outputs):
+        """
+        Records the VM commands and the bytes of the outputs of a profiled
+        file, once they are written.
+        :param outputs: names of the output files of the source.
+        """
+        if sourcename not in self.__files:
+            return
+        entry = self.__files[sourcename]
+        for output in outputs:
+            if not os.path.exists(output):
+                continue
+            entry[KEY_BYTES] += os.path.getsize(output)
+            if output.endswith(".vm"):
+                with open(output, 'r') as code:
+                    entry[KEY_VM_COMMANDS] += sum(1 for line in code
+                                                  if line.strip())
+
+    def report(self):
+        """
+        Returns the report of the profile (see the keys above), once
+        uninstalled.
+        """
+        def phases(counters):
+            return {phase: {KEY_WALL: wall, KEY_CPU: cpu, KEY_CALLS: calls}
+                    for phase, (wall, cpu, calls) in counters.items()}
+        files = dict()
+        for name, entry in self.__files.items():
+            files[name] = dict(entry)
+            files[name][KEY_PHASES] = phases(entry[KEY_PHASES])
+        return {KEY_TOTAL: {KEY_WALL: self.__total[0],
+                            KEY_CPU: self.__total[1]},
+                KEY_PHASES: phases(self.__phases),
+                KEY_FILES: files}
+
+    def save(self, name):
+        """
+        Writes the report as JSON into a file.
+        """
+        with open(name, 'w') as out:
+            json.dump(self.report(), out, indent=1, sort_keys=True)
+
+    def summary(self):
+        """
+        Returns the report as a human readable table.
+        """
+        report = self.report()
+        total = report[KEY_TOTAL]
+        lines = [PHASE_HEADER]
+        for phase, counters in sorted(report[KEY_PHASES].items(),
+                                      key=lambda item: -item[1][KEY_WALL]):
+            lines.append(PHASE_ROW.format(
+                phase, counters[KEY_WALL], counters[KEY_CPU],
+                counters[KEY_WALL] / (total[KEY_WALL] or 1),
+                counters[KEY_CALLS]))
+        lines.append(PHASE_ROW.format(KEY_TOTAL, total[KEY_WALL],
+                                      total[KEY_CPU], 1, ""))
+        lines.append("")
+        lines.append(FILE_HEADER)
+        for name, entry in sorted(report[KEY_FILES].items()):
+            if name == PROGRAM_FILE:
+                continue
+            lines.append(FILE_ROW.format(
+                os.path.basename(name), entry[KEY_WALL], entry[KEY_CPU],
+                entry[KEY_TOKENS], entry[KEY_VM_COMMANDS], entry[KEY_BYTES]))
+        return "\n".join(lines)
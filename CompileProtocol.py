@@ -0,0 +1,72 @@
+###############################################################################
+# The protocol between the CompileServer and its clients, kept apart from the
+# server so clients do not load asyncio. Every request and response is a
+# single line of JSON over a Unix domain socket:
+#   {"op": "compile", "options": {...}, "sources": {"Xxx.jack": text, ...}}
+#       --> {"outputs": {"Xxx.vm": text, ...}, "removed": [...],
+#            "errors": {"Xxx.jack": message, ...}}
+#   {"op": "stats"} --> counters of the requests, latencies and the queue.
+# The options are the command line options of the JackAnalyzer which change
+# the outputs; a request failing as a whole is answered by {"error": message}.
+###############################################################################
+import json
+import os
+import socket
+import tempfile
+
+#############
+# CONSTANTS #
+#############
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "jack-compiler.sock")
+ENCODING = "utf-8"
+NEWLINE_BYTES = b"\n"
+
+# Requests and responses
+KEY_OP = "op"
+KEY_OPTIONS = "options"
+KEY_SOURCES = "sources"
+KEY_OUTPUTS = "outputs"
+KEY_REMOVED = "removed"
+KEY_ERRORS = "errors"
+KEY_ERROR = "error"
+OP_COMPILE = "compile"
+OP_STATS = "stats"
+
+# Command line options of the analyzer which change the outputs
+OPTIONS = ["mode", "compact_xml", "optimize", "fold_constants", "pool_strings",
+           "shake", "inline", "inline_budget", "lower_arrays",
+           "lower_branches"]
+
+
+def encode(message):
+    """
+    Returns the line of a request or a response.
+    """
+    return json.dumps(message).encode(ENCODING) + NEWLINE_BYTES
+
+
+def decode(line):
+    """
+    Returns the request or the response of a line.
+    """
+    return json.loads(line.decode(ENCODING))
+
+
+def request(message, path=DEFAULT_SOCKET):
+    """
+    Sends a request to the server and returns its response.
+    :param message: the request.
+    :param path: path of the socket of the server.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        connection.sendall(encode(message))
+        with connection.makefile('rb') as response:
+            line = response.readline()
+    if not line:
+        raise ConnectionError("The server at {} closed the connection"
+                              .format(path))
+    response = decode(line)
+    if KEY_ERROR in response:
+        raise RuntimeError(response[KEY_ERROR])
+    return response
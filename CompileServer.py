@@ -0,0 +1,232 @@
+###############################################################################
+# A compile daemon, serving compile requests over a Unix domain socket. The
+# modules of the compiler are loaded once, into a pool of worker processes
+# which stay warm between requests, so a build pays neither the start up of
+# the interpreter nor the import of the compiler. Requests are read by an
+# asyncio server, any number of clients at once, and compiled concurrently by
+# the workers (see CompileAPI); a request waits in the queue while all the
+# workers are busy.
+#
+# See CompileProtocol for the requests, and CompileClient for a drop-in
+# replacement of the JackAnalyzer talking to the server.
+###############################################################################
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import signal
+import sys
+import time
+from CompileAPI import *
+from CompileProtocol import *
+from JackAnalyzer import *
+
+#############
+# CONSTANTS #
+#############
+LINE_LIMIT = 256 * 1024 * 1024  # Longest request, in bytes
+UNKNOWN_OP_FORMAT = "Unknown request '{}'"
+
+# Class compiled by every worker as it starts
+WARM_UP_SOURCE = "class Main { function void main() { return; } }"
+WARM_UP_NAME = "Main" + SOURCE_EXTENSION
+
+SERVING_FORMAT = "Serving on {} with {} workers"
+
+
+def compileRequest(options, sources):
+    """
+    Compiles the sources of a compile request in memory (see CompileAPI). A
+    failing source does not stop the others; its error is reported instead
+    of its outputs.
+    :param options: dictionary of the command line options of the analyzer
+    (see OPTIONS), missing ones taking their default values.
+    :param sources: dictionary of source names (Xxx.jack) to their text.
+    :return: response of the compile request: the outputs by name (Xxx.vm,
+    Xxx.xml), the dropped VM functions and the errors by source name.
+    """
+    args = parseArguments([])
+    for option in OPTIONS:
+        if option in options:
+            setattr(args, option, options[option])
+    optimizer, _ = createOptimizers(args)
+    errors, removed = dict(), []
+    compiled = compileProgram(
+        {os.path.basename(sourcename): text
+         for sourcename, text in sources.items()},
+        args.mode, not args.compact_xml, optimizer, args.fold_constants,
+        args.pool_strings, args.shake, args.inline, args.inline_budget,
+        args.lower_arrays, args.lower_branches, errors=errors,
+        removed=removed)
+    outputs = dict()
+    for name, (vm, xml) in compiled.items():
+        if xml is not None:
+            outputs[name + XML_EXTENSION] = xml
+        if vm is not None:
+            outputs[name + VM_EXTENSION] = vm
+    return {KEY_OUTPUTS: outputs, KEY_REMOVED: removed,
+            KEY_ERRORS: {name + SOURCE_EXTENSION: error
+                         for name, error in errors.items()}}
+
+
+def warmUp():
+    """
+    Compiles a small class, loading the compiler into a worker process.
+    """
+    compileRequest({}, {WARM_UP_NAME: WARM_UP_SOURCE})
+
+
+class CompileServer:
+    """
+    Serves compile requests over a Unix domain socket.
+    """
+
+    ###############
+    # CONSTRUCTOR #
+    ###############
+
+    def __init__(self, path=DEFAULT_SOCKET, workers=None):
+        """
+        Creates a new server (see serve()).
+        :param path: path of the Unix domain socket to listen on.
+        :param workers: number of worker processes (None for one per CPU).
+        """
+        self.path = path
+        self.workers = workers or os.cpu_count()
+        self.__executor = None
+        self.__started = time.time()
+        # Counters of the requests
+        self.requests = 0
+        self.failed = 0
+        self.pending = 0
+        self.max_queued = 0
+        self.__latency_total = 0.0
+        self.__latency_max = 0.0
+
+    ###################
+    # PRIVATE METHODS #
+    ###################
+
+    async def __compile(self, request):
+        """
+        Compiles a request on a worker, counting its latency.
+        """
+        self.pending += 1
+        self.max_queued = max(self.max_queued, self.queued())
+        start = time.perf_counter()
+        try:
+            response = await asyncio.get_running_loop().run_in_executor(
+                self.__executor, compileRequest,
+                request.get(KEY_OPTIONS, dict()), request[KEY_SOURCES])
+        finally:
+            latency = time.perf_counter() - start
+            self.pending -= 1
+            self.requests += 1
+            self.__latency_total += latency
+            self.__latency_max = max(self.__latency_max, latency)
+        if response[KEY_ERRORS]:
+            self.failed += 1
+        return response
+
+    async def __respond(self, line):
+        """
+        Returns the response to a request line.
+        """
+        try:
+            request = decode(line)
+            operation = request.get(KEY_OP)
+            if operation == OP_STATS:
+                return self.stats()
+            if operation == OP_COMPILE:
+                return await self.__compile(request)
+            return {KEY_ERROR: UNKNOWN_OP_FORMAT.format(operation)}
+        except Exception as exception:
+            self.failed += 1
+            return {KEY_ERROR: ERROR_FORMAT.format(type(exception).__name__,
+                                                   exception)}
+
+    async def __handle(self, reader, writer):
+        """
+        Answers the requests of a client, in order, until it disconnects.
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self.__respond(line)
+                writer.write(encode(response))
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    ##################
+    # PUBLIC METHODS #
+    ##################
+
+    def queued(self):
+        """
+        Returns the number of requests waiting for a free worker.
+        """
+        return max(0, self.pending - self.workers)
+
+    def stats(self):
+        """
+        Returns the counters of the server.
+        """
+        served = max(1, self.requests)
+        return {"requests": self.requests,
+                "failed": self.failed,
+                "workers": self.workers,
+                "pending": self.pending,
+                "queued": self.queued(),
+                "max_queued": self.max_queued,
+                "latency_mean": self.__latency_total / served,
+                "latency_max": self.__latency_max,
+                "uptime": time.time() - self.__started}
+
+    async def serve(self):
+        """
+        Starts the workers and serves requests until cancelled (or
+        terminated).
+        """
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        with concurrent.futures.ProcessPoolExecutor(self.workers) as executor:
+            self.__executor = executor
+            await asyncio.gather(*[loop.run_in_executor(executor, warmUp)
+                                   for _ in range(self.workers)])
+            server = await asyncio.start_unix_server(self.__handle, self.path,
+                                                     limit=LINE_LIMIT)
+            print(SERVING_FORMAT.format(self.path, self.workers), flush=True)
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+
+
+def parseServerArguments(argv):
+    """
+    Parses the command line arguments of the server.
+    :param argv: command line arguments (without the program name).
+    """
+    parser = argparse.ArgumentParser(
+        description="Serves Jack compile requests over a Unix domain socket.")
+    parser.add_argument("--socket", metavar="PATH", default=DEFAULT_SOCKET,
+                        help="path of the socket (default: %(default)s)")
+    parser.add_argument("--workers", metavar="N", type=int,
+                        help="number of worker processes (default: one per "
+                             "CPU)")
+    return parser.parse_args(argv)
+
+
+if (__name__ == "__main__"):
+    args = parseServerArguments(sys.argv[1:])
+    try:
+        asyncio.run(CompileServer(args.socket, args.workers).serve())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
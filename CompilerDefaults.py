@@ -0,0 +1,16 @@
+##############################################################################
+# Defaults of the options of the JackAnalyzer, and names shared by the modules
+# of the options. The analyzer imports the module of an option only when the
+# option is selected, but needs its defaults before (for its command line
+# help), so they are kept here, with no dependencies, for both to import.
+##############################################################################
+
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024   # Bytes of the TokenCache
+DEFAULT_BUDGET = 12                     # Largest inlined callee, in VM
+                                        # commands (see VMInliner)
+DEFAULT_DEBOUNCE = 0.2                  # Seconds without changes ending a
+                                        # burst of saves (see SourceWatcher)
+MANIFEST_NAME = ".jackbuild.json"       # See BuildManifest
+ROOT = "Main.main"                      # Entry point of Jack programs
+RULES_ALL = "all"                       # Every rule of the VMOptimizer
+FRAME_TAG = "#file"                     # Frame header tag (see JackStream)
@@ -0,0 +1,279 @@
+##############################################################################
+# Compile-time evaluation of the constant parts of Jack code. Rewrites the
+# syntax tree of a subroutine (see JackAST) before its VM code is generated:
+# operations on integer, boolean and null constants are computed with the
+# 16-bit arithmetic of the Hack computer, algebraic identities (x + 0, x * 1,
+# x * 0, ~~x, --x, ...) are simplified, and if and while statements with
+# constant conditions are reduced to the statements which actually run.
+# Jack evaluates expressions left to right with no operator priority, so only
+# the constant operands on the left of an expression can be folded together.
+##############################################################################
+from JackAST import *
+from JackGrammar import *
+
+#############
+# CONSTANTS #
+#############
+WORD_SIZE = 1 << 16
+WORD_SIGN = 1 << 15
+MAX_CONSTANT = WORD_SIGN - 1    # Largest VM 'push constant'
+MIN_WORD = -WORD_SIGN
+TRUE = -1
+FALSE = 0
+
+KEYWORD_VALUES = {RE_TRUE: TRUE, RE_FALSE: FALSE, RE_NULL: FALSE}
+
+
+def toWord(value):
+    """
+    Wraps an integer into a signed 16-bit word.
+    """
+    value %= WORD_SIZE
+    if value >= WORD_SIGN:
+        value -= WORD_SIZE
+    return value
+
+
+def divide(x, y):
+    """
+    Divides like Math.divide, rounding towards zero. Returns None where the
+    OS result differs (division by zero, or of the smallest word).
+    """
+    if y == 0 or MIN_WORD in (x, y):
+        return None
+    quotient = abs(x) // abs(y)
+    return quotient if (x < 0) == (y < 0) else -quotient
+
+
+def compare(condition):
+    return TRUE if condition else FALSE
+
+
+# Operators (as returned by the tokenizer: escaped like in the XML)
+BINARY_OPS = {RE_PLUS:          lambda x, y: toWord(x + y),
+              RE_BAR:           lambda x, y: toWord(x - y),
+              RE_ASTERISK:      lambda x, y: toWord(x * y),
+              RE_SLASH:         divide,
+              XML_AMPERSAND:    lambda x, y: x & y,
+              RE_AMPERSAND:     lambda x, y: x & y,
+              RE_VBAR:          lambda x, y: x | y,
+              XML_LT:           lambda x, y: compare(x < y),
+              RE_LT:            lambda x, y: compare(x < y),
+              XML_GT:           lambda x, y: compare(x > y),
+              RE_GT:            lambda x, y: compare(x > y),
+              RE_EQ:            lambda x, y: compare(x == y)}
+UNARY_OPS = {RE_BAR:    lambda x: toWord(-x),
+             RE_TILDA:  lambda x: toWord(~x)}
+
+# Identities: (op, constant) pairs leaving the other operand unchanged
+RIGHT_IDENTITIES = {(RE_PLUS, 0), (RE_BAR, 0), (RE_ASTERISK, 1),
+                    (RE_VBAR, 0), (XML_AMPERSAND, TRUE), (RE_AMPERSAND, TRUE)}
+LEFT_IDENTITIES = {(RE_PLUS, 0), (RE_ASTERISK, 1), (RE_VBAR, 0),
+                   (XML_AMPERSAND, TRUE), (RE_AMPERSAND, TRUE)}
+# Absorbing elements: (op, constant) pairs making the result the constant,
+# whatever the other operand is
+ABSORBING = {(RE_ASTERISK, 0), (XML_AMPERSAND, FALSE), (RE_AMPERSAND, FALSE),
+             (RE_VBAR, TRUE)}
+
+
+class ConstantFolder:
+    """
+    Folds the constant expressions and conditions of subroutines.
+    """
+
+    def __init__(self):
+        self.__statements = {LetStatement:      self.__foldLet,
+                             IfStatement:       self.__foldIf,
+                             WhileStatement:    self.__foldWhile,
+                             DoStatement:       self.__foldDo,
+                             ReturnStatement:   self.__foldReturn}
+        self.folded = 0
+
+    ###################
+    # PRIVATE METHODS #
+    ###################
+
+    @staticmethod
+    def __constantOf(term):
+        """
+        Returns the value of a constant term, or None if it is not constant.
+        """
+        kind = type(term)
+        if kind is IntegerConstant:
+            value = int(term.value)
+            return value if value <= MAX_CONSTANT else None
+        if kind is KeywordConstant:
+            return KEYWORD_VALUES.get(term.keyword)
+        if kind is UnaryTerm and type(term.term) is IntegerConstant:
+            value = ConstantFolder.__constantOf(term.term)
+            if value is not None:
+                return UNARY_OPS[term.op](value)
+        return None
+
+    @staticmethod
+    def __constantTerm(value):
+        """
+        Returns a term pushing the given constant.
+        """
+        if 0 <= value:
+            return IntegerConstant(str(value))
+        if value == TRUE:
+            return KeywordConstant(RE_TRUE)
+        if value == MIN_WORD:
+            return UnaryTerm(RE_TILDA, IntegerConstant(str(MAX_CONSTANT)))
+        return UnaryTerm(RE_BAR, IntegerConstant(str(-value)))
+
+    @staticmethod
+    def __isPure(node):
+        """
+        Does evaluating the node have no side effects (no subroutine calls,
+        including the division calls)?
+        """
+        kind = type(node)
+        if kind is Expression:
+            return RE_SLASH not in node.ops and \
+                all([ConstantFolder.__isPure(term) for term in node.terms])
+        if kind is SubroutineCall:
+            return False
+        if kind is ArrayTerm:
+            return ConstantFolder.__isPure(node.subscript)
+        if kind is ParenTerm:
+            return ConstantFolder.__isPure(node.expression)
+        if kind is UnaryTerm:
+            return ConstantFolder.__isPure(node.term)
+        return True
+
+    def __foldStatements(self, statements):
+        folded = []
+        for statement in statements:
+            folded.extend(self.__statements[type(statement)](statement))
+        return folded
+
+    def __foldLet(self, node):
+        subscript = node.subscript
+        if subscript is not None:
+            subscript = self.foldExpression(subscript)
+        return [LetStatement(node.name, node.kind, node.index, subscript,
+                             self.foldExpression(node.value))]
+
+    def __foldIf(self, node):
+        condition = self.foldExpression(node.condition)
+        value = self.__expressionConstant(condition)
+        else_statements = node.else_statements
+        if value is not None:
+            # if-goto jumps on any value but false
+            self.folded += 1
+            if value != FALSE:
+                return self.__foldStatements(node.statements)
+            return self.__foldStatements(else_statements or [])
+        if else_statements is not None:
+            else_statements = self.__foldStatements(else_statements)
+        return [IfStatement(condition, self.__foldStatements(node.statements),
+                            else_statements)]
+
+    def __foldWhile(self, node):
+        condition = self.foldExpression(node.condition)
+        value = self.__expressionConstant(condition)
+        if value is not None and value != TRUE:
+            # The loop exits unless the negated condition is false
+            self.folded += 1
+            return []
+        return [WhileStatement(condition,
+                               self.__foldStatements(node.statements))]
+
+    def __foldDo(self, node):
+        return [DoStatement(self.__foldTerm(node.call))]
+
+    def __foldReturn(self, node):
+        if node.value is None:
+            return [node]
+        return [ReturnStatement(self.foldExpression(node.value))]
+
+    def __expressionConstant(self, node):
+        if len(node.terms) == 1:
+            return self.__constantOf(node.terms[0])
+        return None
+
+    def __foldTerm(self, node):
+        """
+        Folds the expressions within a term.
+        """
+        kind = type(node)
+        if kind is ParenTerm:
+            expression = self.foldExpression(node.expression)
+            if len(expression.terms) == 1:
+                return expression.terms[0]
+            return ParenTerm(expression)
+        if kind is UnaryTerm:
+            term = self.__foldTerm(node.term)
+            if type(term) is UnaryTerm and term.op == node.op:
+                # ~~x = x, --x = x
+                self.folded += 1
+                return term.term
+            value = self.__constantOf(term)
+            if value is not None:
+                self.folded += 1
+                return self.__constantTerm(UNARY_OPS[node.op](value))
+            return UnaryTerm(node.op, term)
+        if kind is ArrayTerm:
+            return ArrayTerm(node.name, node.kind, node.index,
+                             self.foldExpression(node.subscript))
+        if kind is SubroutineCall:
+            return SubroutineCall(node.target, node.kind, node.index,
+                                  node.class_name, node.name,
+                                  [self.foldExpression(argument)
+                                   for argument in node.arguments])
+        return node
+
+    ##################
+    # PUBLIC METHODS #
+    ##################
+
+    def foldExpression(self, node):
+        """
+        Folds an expression, left to right.
+        :return: the folded Expression.
+        """
+        first = self.__foldTerm(node.terms[0])
+        value = self.__constantOf(first)
+        terms, ops = [first], []
+        for op, term in zip(node.ops, node.terms[1:]):
+            term = self.__foldTerm(term)
+            operand = self.__constantOf(term)
+            if value is not None and operand is not None and \
+                    BINARY_OPS[op](value, operand) is not None:
+                # constant op constant
+                value = BINARY_OPS[op](value, operand)
+                terms, ops = [self.__constantTerm(value)], []
+            elif (op, operand) in RIGHT_IDENTITIES:
+                # x op identity
+                pass
+            elif (op, value) in LEFT_IDENTITIES:
+                # identity op x
+                value = None
+                terms, ops = [term], []
+            elif (op, operand) in ABSORBING and \
+                    self.__isPure(Expression(terms, ops)):
+                # x op absorbing
+                value = operand
+                terms, ops = [term], []
+            elif (op, value) in ABSORBING and self.__isPure(term):
+                # absorbing op x
+                pass
+            else:
+                value = None
+                terms.append(term)
+                ops.append(op)
+                continue
+            self.folded += 1
+        return Expression(terms, ops)
+
+    def foldSubroutine(self, node):
+        """
+        Folds the statements of a subroutine.
+        :return: the folded Subroutine.
+        """
+        return Subroutine(node.kind, node.return_type, node.name,
+                          node.parameters, node.var_decs,
+                          self.__foldStatements(node.statements),
+                          node.n_locals)
@@ -0,0 +1,176 @@
+##############################################################################
+# Incremental compilation of Jack classes, for editors and watch workflows.
+# Remembers the token range and the emitted XML and VM of every subroutine of
+# a class. When a new version of the class is compiled, only the subroutines
+# whose tokens changed are parsed and emitted again. Subroutines are reused
+# only while the class level declarations (class name, fields and statics)
+# are unchanged; otherwise the whole class is compiled again. The watch mode
+# of the JackAnalyzer keeps an IncrementalCompiler for every source.
+##############################################################################
+import io
+from CompilationEngine import *
+from JackTokenizer import *
+
+SUBROUTINE_KEYWORDS = {RE_CONSTRUCTOR, RE_FUNCTION, RE_METHOD}
+
+
+def splitSubroutines(table):
+    """
+    Splits the token table of a class into its class level declarations and
+    its subroutines.
+    :param table: TokenTable of a whole class.
+    :return: (declarations, ranges) where declarations is the tuple of tokens
+    before the first subroutine and ranges maps the source offset of every
+    subroutine to (end offset, tuple of the subroutine tokens).
+    """
+    lexemes, types, offsets = table.lexemes, table.types, table.offsets
+    declarations = None
+    ranges = dict()
+    depth = 0
+    start = None
+    for i, lexeme in enumerate(lexemes):
+        if start is None and depth == 1 and types[i] == CODE_KEYWORD and \
+                lexeme in SUBROUTINE_KEYWORDS:
+            start = i
+            if declarations is None:
+                declarations = tuple(lexemes[:i])
+        if types[i] != CODE_SYMBOL:
+            continue
+        if lexeme == RE_BRACKETS_CURLY_LEFT:
+            depth += 1
+        elif lexeme == RE_BRACKETS_CURLY_RIGHT:
+            depth -= 1
+            if start is not None and depth == 1:
+                ranges[offsets[start]] = (offsets[i] + 1,
+                                          tuple(lexemes[start:i + 1]))
+                start = None
+    if declarations is None:
+        declarations = tuple(lexemes)
+    return declarations, ranges
+
+
+class IncrementalCompiler:
+    """
+    Compiles versions of Jack classes, reusing the output of the subroutines
+    which did not change since the previous version of each class.
+    """
+
+    class __SubroutineStore:
+        """
+        Helper class handing the compiled subroutines of the previous version
+        of a class to the CompilationEngine, and collecting the subroutines
+        it compiles.
+        """
+        def __init__(self, ranges, compiled):
+            """
+            :param ranges: subroutine ranges, as returned by
+            splitSubroutines().
+            :param compiled: maps subroutine tokens to their (xml, vm) output
+            in the previous version.
+            """
+            self.__ranges = ranges
+            self.__compiled = compiled
+            self.__reused = dict()
+            self.__spans = []
+
+        def lookup(self, offset):
+            """
+            Returns the output of the subroutine at the given offset if it
+            did not change, or None if it must be compiled.
+            :return: (end offset, xml, vm) or None.
+            """
+            if offset not in self.__ranges:
+                return None
+            end, tokens = self.__ranges[offset]
+            if tokens not in self.__compiled:
+                return None
+            xml, vm = self.__reused[tokens] = self.__compiled[tokens]
+            return end, xml, vm
+
+        def record(self, offset, xml_start, xml_end, vm_start, vm_end):
+            """
+            Records the output spans of the subroutine compiled at the given
+            offset.
+            """
+            if offset in self.__ranges:
+                self.__spans.append((self.__ranges[offset][1], xml_start,
+                                     xml_end, vm_start, vm_end))
+
+        def reusedCount(self):
+            return len(self.__reused)
+
+        def compiledCount(self):
+            return len(self.__spans)
+
+        def subroutines(self, xml, vm):
+            """
+            Returns the output of all subroutines of the class.
+            :param xml: complete XML output of the class.
+            :param vm: complete VM output of the class.
+            :return: maps subroutine tokens to their (xml, vm) output.
+            """
+            subroutines = dict(self.__reused)
+            for tokens, xml_start, xml_end, vm_start, vm_end in self.__spans:
+                subroutines[tokens] = (xml[xml_start:xml_end],
+                                       vm[vm_start:vm_end])
+            return subroutines
+
+    def __init__(self, xml=True, vm=True, xml_indent=True, optimizer=None,
+                 fold_constants=False, lower_arrays=False,
+                 lower_branches=False):
+        """
+        Creates a new incremental compiler with no previous compilations.
+        The options are those of the CompilationEngine, and hold for every
+        compilation. Pooled strings and dropped subroutines are not
+        supported, since the output of a subroutine then depends on the
+        others.
+        :param xml: emit the XML.
+        :param vm: emit the VM code.
+        """
+        self.__xml, self.__vm = xml, vm
+        self.__options = dict(xml_indent=xml_indent, optimizer=optimizer,
+                              fold_constants=fold_constants,
+                              lower_arrays=lower_arrays,
+                              lower_branches=lower_branches)
+        self.__classes = dict()
+        self.reused = 0
+        self.recompiled = 0
+        self.full_compiles = 0
+
+    def compile(self, name, source):
+        """
+        Compiles the source of a class.
+        :param name: name of the compiled file (without extension).
+        :param source: (String) Jack source of the class.
+        :return: (xml, vm) output of the class, either None if not
+        emitted.
+        """
+        tokenizer = JackTokenizer(io.StringIO(source), WHOLE_FILE)
+        declarations, ranges = splitSubroutines(tokenizer.tokenTable())
+        compiled = dict()
+        if name in self.__classes and \
+                self.__classes[name][0] == declarations:
+            compiled = self.__classes[name][1]
+        else:
+            self.full_compiles += 1
+
+        store = self.__SubroutineStore(ranges, compiled)
+        out_xml = io.StringIO() if self.__xml else None
+        out_vm = io.StringIO() if self.__vm else None
+        engine = CompilationEngine(name, None, out_xml, out_vm,
+                                   tokenizer=tokenizer, subroutines=store,
+                                   **self.__options)
+        engine.compileClass()
+        xml = "" if out_xml is None else out_xml.getvalue()
+        vm = "" if out_vm is None else out_vm.getvalue()
+
+        self.__classes[name] = (declarations, store.subroutines(xml, vm))
+        self.reused += store.reusedCount()
+        self.recompiled += store.compiledCount()
+        return (xml if self.__xml else None), (vm if self.__vm else None)
+
+    def forget(self, name):
+        """
+        Drops the previous compilation of the given class.
+        """
+        self.__classes.pop(name, None)
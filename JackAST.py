@@ -0,0 +1,266 @@
+##############################################################################
+# The abstract syntax tree of Jack code, built by the JackParser and walked
+# by the code generators (XMLGenerator, VMGenerator).
+# There is a node class for every syntactic element of the Jack grammar.
+# Identifier uses are resolved by the parser: every node using a variable
+# carries its kind and running index from the SymbolTable.
+##############################################################################
+
+
+class Node:
+    """
+    Base class of all syntax tree nodes.
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(
+            repr(getattr(self, slot)) for slot in self.__slots__))
+
+
+#############
+# STRUCTURE #
+#############
+
+class ClassNode(Node):
+    """
+    'class' className '{' classVarDec* subroutineDec* '}'
+    n_fields and n_statics are the numbers of fields and of static variables
+    of the class.
+    """
+    __slots__ = ('name', 'var_decs', 'subroutines', 'n_fields', 'n_statics')
+
+    def __init__(self, name, var_decs, subroutines, n_fields, n_statics):
+        self.name = name
+        self.var_decs = var_decs
+        self.subroutines = subroutines
+        self.n_fields = n_fields
+        self.n_statics = n_statics
+
+
+class ClassVarDec(Node):
+    """
+    ('static' | 'field') type varName (',' varName)* ';'
+    """
+    __slots__ = ('kind', 'type', 'names')
+
+    def __init__(self, kind, type, names):
+        self.kind = kind
+        self.type = type
+        self.names = names
+
+
+class Subroutine(Node):
+    """
+    ('constructor' | 'function' | 'method') ('void' | type) subroutineName
+    '(' parameterList ')' '{' varDec* statements '}'
+    parameters is a list of (type, name) pairs; n_locals is the number of
+    local variables of the subroutine.
+    """
+    __slots__ = ('kind', 'return_type', 'name', 'parameters', 'var_decs',
+                 'statements', 'n_locals')
+
+    def __init__(self, kind, return_type, name, parameters, var_decs,
+                 statements, n_locals):
+        self.kind = kind
+        self.return_type = return_type
+        self.name = name
+        self.parameters = parameters
+        self.var_decs = var_decs
+        self.statements = statements
+        self.n_locals = n_locals
+
+
+class VarDec(Node):
+    """
+    'var' type varName (',' varName)* ';'
+    """
+    __slots__ = ('type', 'names')
+
+    def __init__(self, type, names):
+        self.type = type
+        self.names = names
+
+
+##############
+# STATEMENTS #
+##############
+
+class LetStatement(Node):
+    """
+    'let' varName ('[' expression ']')? '=' expression ';'
+    subscript is None unless an array element is assigned.
+    """
+    __slots__ = ('name', 'kind', 'index', 'subscript', 'value')
+
+    def __init__(self, name, kind, index, subscript, value):
+        self.name = name
+        self.kind = kind
+        self.index = index
+        self.subscript = subscript
+        self.value = value
+
+
+class IfStatement(Node):
+    """
+    'if' '(' expression ')' '{' statements '}' ('else' '{' statements '}')?
+    else_statements is None if there is no else clause.
+    """
+    __slots__ = ('condition', 'statements', 'else_statements')
+
+    def __init__(self, condition, statements, else_statements):
+        self.condition = condition
+        self.statements = statements
+        self.else_statements = else_statements
+
+
+class WhileStatement(Node):
+    """
+    'while' '(' expression ')' '{' statements '}'
+    """
+    __slots__ = ('condition', 'statements')
+
+    def __init__(self, condition, statements):
+        self.condition = condition
+        self.statements = statements
+
+
+class DoStatement(Node):
+    """
+    'do' subroutineCall ';'
+    """
+    __slots__ = ('call',)
+
+    def __init__(self, call):
+        self.call = call
+
+
+class ReturnStatement(Node):
+    """
+    'return' expression? ';'
+    value is None for a 'return;' statement.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+###############
+# EXPRESSIONS #
+###############
+
+class Expression(Node):
+    """
+    term (op term)*
+    ops[i] is the operator between terms[i] and terms[i + 1], as returned
+    by the tokenizer (XML escaped).
+    """
+    __slots__ = ('terms', 'ops')
+
+    def __init__(self, terms, ops):
+        self.terms = terms
+        self.ops = ops
+
+
+class IntegerConstant(Node):
+    """
+    value is the constant as it appears in the code.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class StringConstant(Node):
+    """
+    value is the string as returned by the tokenizer (XML escaped).
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class KeywordConstant(Node):
+    """
+    'true' | 'false' | 'null' | 'this'
+    """
+    __slots__ = ('keyword',)
+
+    def __init__(self, keyword):
+        self.keyword = keyword
+
+
+class VarTerm(Node):
+    """
+    varName
+    """
+    __slots__ = ('name', 'kind', 'index')
+
+    def __init__(self, name, kind, index):
+        self.name = name
+        self.kind = kind
+        self.index = index
+
+
+class ArrayTerm(Node):
+    """
+    varName '[' expression ']'
+    """
+    __slots__ = ('name', 'kind', 'index', 'subscript')
+
+    def __init__(self, name, kind, index, subscript):
+        self.name = name
+        self.kind = kind
+        self.index = index
+        self.subscript = subscript
+
+
+class SubroutineCall(Node):
+    """
+    (className | varName) '.' subroutineName '(' expressionList ')' |
+    subroutineName '(' expressionList ')'
+    target is the class or variable name before the '.' (None if there is
+    none). For a variable target, kind and index locate the variable, and
+    class_name is its type; otherwise class_name is the called class.
+    """
+    __slots__ = ('target', 'kind', 'index', 'class_name', 'name',
+                 'arguments')
+
+    def __init__(self, target, kind, index, class_name, name, arguments):
+        self.target = target
+        self.kind = kind
+        self.index = index
+        self.class_name = class_name
+        self.name = name
+        self.arguments = arguments
+
+
+class ParenTerm(Node):
+    """
+    '(' expression ')'
+    """
+    __slots__ = ('expression',)
+
+    def __init__(self, expression):
+        self.expression = expression
+
+
+class UnaryTerm(Node):
+    """
+    unaryOp term
+    """
+    __slots__ = ('op', 'term')
+
+    def __init__(self, op, term):
+        self.op = op
+        self.term = term
+
+
+class EmptyTerm(Node):
+    """
+    A term missing where one was expected (as in 'return ;').
+    """
+    __slots__ = ()
@@ -7,29 +7,101 @@
 #   2.  Create an output file called Xxx.xml and prepare it for writing;
 #   3.  Use the CompilationEngine to compile the input JackTokenizer into the
 #       output file.
+# For a fast start up, the modules of the options which are not selected
+# (worker processes, gzip, the generators of the outputs not written, the
+# token cache, the build manifest, the watcher, the optimizers, the tree
+# shaker and the profiler) are not imported.
 ###############################################################################
+import argparse
+import contextlib
+import io
 import os
 import sys
+import time
 from CompilationEngine import *
+from CompilerDefaults import *
 from JackTokenizer import *
 
 SOURCE_EXTENSION = ".jack"
 XML_EXTENSION = ".xml"
 VM_EXTENSION = ".vm"
+GZIP_EXTENSION = ".gz"
 DEFAULT_SOURCE_FILE = "..\\Square.jack"
 
 XML_DELIM_TERMINAL = " "
 XML_DELIM_NON_TERMINAL = "\n"
 TOKEN_ROOT_START = "<tokens>\n"
 TOKEN_ROOT_END = "</tokens>\n"
+MEGABYTE = 1024 * 1024
 
+# Parallel builds
+JOB_CHUNKS = 4          # Chunks of sources handed to each worker process
+ERROR_FORMAT = "{}: {}"
+JOB_FAILED_FORMAT = "FAILED {}: {}"
+JOBS_FORMAT = "Compiled {} files ({} failed) in {:.3f}s, {:.3f}s of " \
+              "compilation"
+JOBS_ERROR_FORMAT = "invalid job count: {!r} (0 for one per CPU)"
+SLOWEST_FORMAT = "Slowest: {} ({:.3f}s)"
+FRAME_HEADER = FRAME_TAG + " NAME SIZE"
+PROFILE_JOBS_FORMAT = "Warning: --profile compiles on a single process, " \
+                      "ignoring --jobs {}"
+STREAM_NAME = "<stdin>"  # Names the stream when its framing is broken
+WATCH_FORMAT = "[{}] Rebuilt {} of {} files ({} failed) in {:.3f}s, {:.3f}s " \
+               "after the last save"
+WATCH_FIRST_FORMAT = "[{}] Built {} files ({} failed) in {:.3f}s, watching " \
+                     "for changes"
+WATCH_TIME_FORMAT = "%H:%M:%S"
 
-def main(path):
+# Output modes
+MODE_ALL = "all"        # XML parse tree and VM code
+MODE_VM = "vm"          # VM code only
+MODE_XML = "xml"        # XML parse tree only
+MODE_CHECK = "check"    # Parse and resolve symbols only, no output
+MODES = [MODE_ALL, MODE_VM, MODE_XML, MODE_CHECK]
+XML_MODES = {MODE_ALL, MODE_XML}
+VM_MODES = {MODE_ALL, MODE_VM}
+
+
+def main(path, token_cache=None, mode=MODE_ALL, xml_indent=True,
+         xml_gzip=False, optimizer=None, fold_constants=False,
+         pool_strings=False, shake=False, inliner=None,
+         lower_arrays=False, lower_branches=False, jobs=1,
+         results=None, manifest=None, profiler=None):
     """
     Translates the .jack source file (or files) in the given path into a
     .xml output file.
+    :param token_cache: TokenCache for the tokenizers (or None).
+    :param mode: which outputs to write, one of MODES.
+    :param xml_indent: indent the XML tags (False for compact XML).
+    :param xml_gzip: write the XML gzip-compressed, into Xxx.xml.gz.
+    :param optimizer: VMOptimizer of the VM code (or None).
+    :param fold_constants: evaluate constant expressions at compile time.
+    :param pool_strings: build every string literal once.
+    :param shake: drop the subroutines unreachable from Main.main.
+    :param inliner: VMInliner of the calls of small functions (or None).
+    :param lower_arrays: generate specialized code for array elements.
+    :param lower_branches: generate branches with fewer jumps.
+    :param jobs: number of processes compiling the sources.
+    :param results: list to append the outcome of every source to (or None),
+    see compileJobs(). A failing source then does not stop the others.
+    :param manifest: BuildManifest of the directory, to skip the sources
+    whose outputs are up to date (or None).
+    :param profiler: CompileProfiler recording the time of every source (or
+    None).
+    :return: names of the dropped VM functions.
     """
+    # Assemble all files
+    return analyze(findSources(path), token_cache, mode, xml_indent, xml_gzip,
+                   optimizer, fold_constants, pool_strings, shake, inliner,
+                   lower_arrays, lower_branches, jobs, results, manifest,
+                   profiler=profiler)
 
+
+def findSources(path):
+    """
+    Returns the names of the .jack source files in the given path.
+    :param path: a .jack file or a directory of .jack files.
+    """
     # Collect all sources files to tokenize
     sources = None
 
@@ -43,18 +115,34 @@ def main(path):
 
     # Path is a directory with source files?
     elif os.path.isdir(path):
-        sources = [os.path.join(path, f) for f in os.listdir(path) if
-                   f.endswith(SOURCE_EXTENSION)]
+        sources = [os.path.join(path, f) for f in sorted(os.listdir(path))
+                   if f.endswith(SOURCE_EXTENSION)]
 
     if sources == None:
         raise FileNotFoundError("No {} files found to translate!"
                                 .format(SOURCE_EXTENSION))
+    return sources
 
-    # Assemble all files
-    analyze(sources)
+
+def openOutput(name, enabled, compress=False):
+    """
+    Opens an output file for writing if the output is enabled.
+    :param compress: write a gzip-compressed name.gz file instead.
+    :return: context manager of the open file, or of None if disabled.
+    """
+    if not enabled:
+        return contextlib.nullcontext()
+    if compress:
+        import gzip
+        return gzip.open(name + GZIP_EXTENSION, 'wt')
+    return open(name, 'w')
 
 
-def analyze(sources):
+def analyze(sources, token_cache=None, mode=MODE_ALL, xml_indent=True,
+            xml_gzip=False, optimizer=None, fold_constants=False,
+            pool_strings=False, shake=False, inliner=None,
+            lower_arrays=False, lower_branches=False, jobs=1,
+            results=None, manifest=None, compilers=None, profiler=None):
     """
     For each source Xxx.jack file, the analyzer goes through the
     following logic:
@@ -62,28 +150,586 @@ def analyze(sources):
     2.  Use the CompilationEngine to compile the input JackTokenizer into the
         output file.
     :param sources: list of names of sources to compile.
+    :param token_cache: TokenCache for the tokenizers (or None).
+    :param mode: which outputs to write, one of MODES.
+    :param xml_indent: indent the XML tags (False for compact XML).
+    :param xml_gzip: write the XML gzip-compressed, into Xxx.xml.gz.
+    :param optimizer: VMOptimizer of the VM code (or None).
+    :param fold_constants: evaluate constant expressions at compile time.
+    :param pool_strings: build every string literal once.
+    :param shake: treat the sources as a whole program and drop from the VM
+    code the subroutines unreachable from Main.main (see TreeShaker).
+    :param inliner: VMInliner to inline the calls of small functions across
+    all the sources (or None). The VM code of all the sources is then kept in
+    memory and written once they are all compiled.
+    :param lower_arrays: generate specialized code for array elements.
+    :param lower_branches: generate branches with fewer jumps.
+    :param jobs: number of processes compiling the sources (see
+    compileJobs()).
+    :param results: list to append (source name, seconds taken, error
+    message or None) to for every source (or None). A failing source then
+    does not stop the others.
+    :param manifest: BuildManifest of the directory of the sources (or
+    None). The sources whose outputs were built from their current text with
+    the same settings, and did not change since, are skipped.
+    :param compilers: dictionary of the IncrementalCompiler of every source
+    by name (or None), see compileSource().
+    :param profiler: CompileProfiler recording the time of every source (or
+    None). The sources are then compiled in this process, whatever the jobs.
+    :return: names of the dropped VM functions.
     """
+    inline = inliner is not None and mode in VM_MODES
+    compileFile = compileSource
+    if profiler is not None:
+        # The profiler only sees the phases run in this process
+        compileFile, jobs = profiler.profileFiles(compileSource), 1
+
+    # Skip the sources whose outputs are up to date
+    if manifest is not None:
+        settings = buildSettings(mode, xml_indent, xml_gzip, optimizer,
+                                 fold_constants, pool_strings, shake, inliner,
+                                 lower_arrays, lower_branches)
+        if shake or inline:
+            # The outputs depend on all the sources
+            settings += manifest.programHash(sources)
+        stale = [sourcename for sourcename in sources if
+                 not manifest.isCurrent(sourcename, settings,
+                                        outputNames(sourcename, mode,
+                                                    xml_gzip))]
+        if stale and (shake or inline):
+            stale = sources
+        manifest.skipped += len(sources) - len(stale)
+        manifest.rebuilt += len(stale)
+        sources = stale
+
+    # Find the subroutines the program uses
+    keep = None
+    removed = []
+    compiled = sources
+    if shake and mode in VM_MODES:
+        from TreeShaker import CallGraph
+        graph = CallGraph()
+        compiled = []
+        for sourcename in sources:
+            start = time.perf_counter()
+            try:
+                with open(sourcename, 'r') as source:
+                    graph.addClass(source, token_cache)
+            except Exception as exception:
+                if results is None:
+                    raise
+                # Reported as failed, and not compiled
+                results.append((sourcename, time.perf_counter() - start,
+                                ERROR_FORMAT.format(type(exception).__name__,
+                                                    exception)))
+                continue
+            compiled.append(sourcename)
+        keep = graph.reachable()
+        if keep is not None:
+            removed = sorted(graph.functions() - keep)
 
     # Parse each source and translates to it the output:
-    for sourcename in sources:
-        base = os.path.splitext(sourcename)[0]
-        outname_xml = base + XML_EXTENSION
-        outname_vm = base + VM_EXTENSION
+    arguments = (mode, xml_indent, xml_gzip, optimizer, fold_constants,
+                 pool_strings, keep, lower_arrays, lower_branches, inline,
+                 compilers)
+    if results is None and jobs == 1:
+        codes = [compileFile(sourcename, token_cache, *arguments)
+                 for sourcename in compiled]
+    else:
+        codes = compileJobs(compiled, token_cache, arguments, jobs, results,
+                            compileFile)
 
-        # Open source for analyzing, output file for writing
-        with open(sourcename, 'r') as source, open(outname_xml, 'w') as \
-                outxml, open(outname_vm, 'w') as outvm:
-            # Create a CompilationEngine from the Xvmxx.jack input file
-            basename = os.path.basename(base)
-            engine = CompilationEngine(basename, source, outxml, outvm)
-            engine.compileClass()
+    # Inline the small functions of the whole program
+    if inline:
+        from VMWriter import NEWLINE
+        vm_code = {os.path.splitext(sourcename)[0] + VM_EXTENSION:
+                   code.splitlines()
+                   for sourcename, code in zip(compiled, codes)
+                   if code is not None}
+        for commands in vm_code.values():
+            inliner.addClass(commands)
+        for outname_vm, commands in vm_code.items():
+            with open(outname_vm, 'w') as outvm:
+                outvm.write(NEWLINE.join(inliner.inlineClass(commands)) +
+                            NEWLINE)
 
+    # Record the outputs built
+    if manifest is not None:
+        failed = {sourcename for sourcename, _, error in results or []
+                  if error is not None}
+        for sourcename in sources:
+            if sourcename in failed:
+                manifest.forget(sourcename)
+            else:
+                manifest.record(sourcename, settings,
+                                outputNames(sourcename, mode, xml_gzip))
+        manifest.save()
+    return removed
 
-if (__name__ == "__main__"):
-    if len(sys.argv) > 1:
-        main(sys.argv[1])
+
+def buildSettings(mode, xml_indent, xml_gzip, optimizer, fold_constants,
+                  pool_strings, shake, inliner, lower_arrays, lower_branches):
+    """
+    Returns a description of the settings of a build (see analyze() for the
+    parameters), for the BuildManifest.
+    """
+    rules = None if optimizer is None else optimizer.rules
+    budget = None if inliner is None else inliner.budget
+    return repr((mode, xml_indent, xml_gzip, rules, fold_constants,
+                 pool_strings, shake, budget, lower_arrays, lower_branches))
+
+
+def outputNames(sourcename, mode, xml_gzip=False):
+    """
+    Returns the names of the output files of a source.
+    :param mode: which outputs are written, one of MODES.
+    :param xml_gzip: the XML is written gzip-compressed, into Xxx.xml.gz.
+    """
+    base = os.path.splitext(sourcename)[0]
+    outputs = []
+    if mode in XML_MODES:
+        outputs.append(base + XML_EXTENSION +
+                       (GZIP_EXTENSION if xml_gzip else ""))
+    if mode in VM_MODES:
+        outputs.append(base + VM_EXTENSION)
+    return outputs
+
+
+def compileSource(sourcename, token_cache=None, mode=MODE_ALL,
+                  xml_indent=True, xml_gzip=False, optimizer=None,
+                  fold_constants=False, pool_strings=False, keep=None,
+                  lower_arrays=False, lower_branches=False, buffer_vm=False,
+                  compilers=None):
+    """
+    Compiles a source Xxx.jack file into Xxx.xml and Xxx.vm (see analyze()
+    for the parameters).
+    :param keep: names of the VM functions to emit (or None for all of
+    them), see TreeShaker.
+    :param buffer_vm: return the VM code instead of writing it.
+    :param compilers: dictionary of the IncrementalCompiler of every source
+    by name (or None). The source is then compiled by its own compiler
+    (added on first use), reusing the output of the subroutines which did
+    not change since its previous compilation, and its outputs are only
+    written once it compiled. Pooled strings and kept functions need the
+    whole class, so the source is then compiled in full.
+    :return: the VM code if buffered, otherwise None.
+    """
+    base = os.path.splitext(sourcename)[0]
+    outname_xml = base + XML_EXTENSION
+    outname_vm = base + VM_EXTENSION
+
+    if compilers is not None and keep is None and not pool_strings:
+        if sourcename not in compilers:
+            from IncrementalCompiler import IncrementalCompiler
+            compilers[sourcename] = IncrementalCompiler(
+                mode in XML_MODES, mode in VM_MODES, xml_indent, optimizer,
+                fold_constants, lower_arrays, lower_branches)
+        with open(sourcename, 'r') as source:
+            xml, vm = compilers[sourcename].compile(os.path.basename(base),
+                                                     source.read())
+        with openOutput(outname_xml, xml is not None, xml_gzip) as outxml:
+            if outxml is not None:
+                outxml.write(xml)
+        if buffer_vm:
+            return vm
+        with openOutput(outname_vm, vm is not None) as outvm:
+            if outvm is not None:
+                outvm.write(vm)
+        return None
+
+    # Open source for analyzing, output file for writing
+    with open(sourcename, 'r') as source, \
+            openOutput(outname_xml, mode in XML_MODES, xml_gzip) as outxml, \
+            openOutput(outname_vm, mode in VM_MODES and not buffer_vm) as \
+            outvm:
+        if buffer_vm:
+            outvm = io.StringIO()
+        # Create a CompilationEngine from the Xvmxx.jack input file
+        basename = os.path.basename(base)
+        engine = CompilationEngine(basename, source, outxml, outvm,
+                                   token_cache, xml_indent=xml_indent,
+                                   optimizer=optimizer,
+                                   fold_constants=fold_constants,
+                                   pool_strings=pool_strings,
+                                   keep=keep,
+                                   lower_arrays=lower_arrays,
+                                   lower_branches=lower_branches)
+        engine.compileClass()
+    if buffer_vm:
+        return outvm.getvalue()
+    return None
+
+
+def compileJob(job):
+    """
+    Compiles a source, catching its errors (see compileJobs()).
+    :param job: (source name, TokenCache or None, the other arguments of
+    compileSource(), the function compiling the source).
+    :return: (VM code or None, seconds taken, error message or None,
+    counters of the TokenCache added by the source or None). A worker
+    compiles a chunk of sources with the same copy of the cache, so only the
+    counters of the source are returned.
+    """
+    sourcename, token_cache, arguments, compileFile = job
+    start = time.perf_counter()
+    before = None if token_cache is None else token_cache.counters()
+    code, error = None, None
+    try:
+        code = compileFile(sourcename, token_cache, *arguments)
+    except Exception as exception:
+        error = ERROR_FORMAT.format(type(exception).__name__, exception)
+    counters = None
+    if token_cache is not None:
+        counters = [after - count for after, count in
+                    zip(token_cache.counters(), before)]
+    return code, time.perf_counter() - start, error, counters
+
+
+def compileJobs(sources, token_cache, arguments, jobs=1, results=None,
+                compileFile=compileSource):
+    """
+    Compiles sources on a pool of worker processes. A failing source does
+    not stop the others; its error is reported in the results instead.
+    :param sources: list of names of sources to compile.
+    :param token_cache: TokenCache for the tokenizers (or None). The workers
+    use copies of it, whose hits and misses are merged back.
+    :param arguments: the other arguments of compileSource().
+    :param jobs: number of worker processes (1 to compile in this process).
+    :param results: list to append (source name, seconds taken, error
+    message or None) to for every source, in order (or None).
+    :param compileFile: function compiling a source, taking the arguments of
+    compileSource() (such as a CompileProfiler.profileFiles() of it). It is
+    sent to the worker processes, so it must be picklable when jobs is not 1.
+    :return: list of the results of compileSource() by source (None for the
+    sources which failed).
+    """
+    tasks = [(sourcename, token_cache, arguments, compileFile)
+             for sourcename in sources]
+    if jobs == 1:
+        outcomes = list(map(compileJob, tasks))
     else:
-        main(DEFAULT_SOURCE_FILE)
+        import concurrent.futures
+        chunk = max(1, len(tasks) // (jobs * JOB_CHUNKS))
+        with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+            outcomes = list(executor.map(compileJob, tasks, chunksize=chunk))
+    codes = []
+    for sourcename, (code, seconds, error, counters) in zip(sources,
+                                                            outcomes):
+        if token_cache is not None and jobs != 1:
+            token_cache.merge(counters)
+        if results is not None:
+            results.append((sourcename, seconds, error))
+        codes.append(code)
+    return codes
+
+
+def reportJobs(results, seconds):
+    """
+    Prints the failures and the timings of the compiled sources.
+    :param results: list of (source name, seconds taken, error message or
+    None), see compileJobs().
+    :param seconds: total time of the build.
+    """
+    failed = [(sourcename, error) for sourcename, _, error in results
+              if error is not None]
+    for sourcename, error in failed:
+        print(JOB_FAILED_FORMAT.format(sourcename, error))
+    compiling = sum([result[1] for result in results])
+    print(JOBS_FORMAT.format(len(results), len(failed), seconds, compiling))
+    if results:
+        sourcename, slowest, _ = max(results, key=lambda result: result[1])
+        print(SLOWEST_FORMAT.format(sourcename, slowest))
+
+
+def compileStandardStreams(args, token_cache=None, optimizer=None):
+    """
+    Compiles the sources framed on the standard input into frames of their
+    outputs on the standard output (see JackStream), reporting on the
+    standard error.
+    :param args: parsed command line arguments (see parseArguments()).
+    :param token_cache: TokenCache for the tokenizers (or None).
+    :param optimizer: VMOptimizer of the VM code (or None).
+    :return: exit status of the analyzer, 1 if any source failed.
+    """
+    from JackStream import compileStream
+    errors, removed = dict(), []
+    try:
+        removed = compileStream(sys.stdin.buffer, sys.stdout.buffer,
+                                args.mode, not args.compact_xml, optimizer,
+                                args.fold_constants, args.pool_strings,
+                                args.shake, args.inline, args.inline_budget,
+                                args.lower_arrays, args.lower_branches,
+                                token_cache, errors)
+    except ValueError as exception:
+        # A malformed or truncated frame ends the stream; the outputs of the
+        # classes before it are already written
+        errors[STREAM_NAME] = ERROR_FORMAT.format(type(exception).__name__,
+                                                  exception)
+    if args.shake:
+        print("Removed {} unreachable subroutines".format(len(removed)),
+              file=sys.stderr)
+        for name in removed:
+            print("  " + name, file=sys.stderr)
+    for name, error in errors.items():
+        print(JOB_FAILED_FORMAT.format(name, error), file=sys.stderr)
+    if token_cache:
+        print(token_cache.stats(), file=sys.stderr)
+    return 1 if errors else 0
+
+
+def watch(path, token_cache=None, mode=MODE_ALL, xml_indent=True,
+          xml_gzip=False, optimizer=None, fold_constants=False,
+          pool_strings=False, shake=False, inliner=None, lower_arrays=False,
+          lower_branches=False, jobs=1, manifest=None,
+          debounce=DEFAULT_DEBOUNCE):
+    """
+    Compiles the sources in the given path, and then compiles them again
+    whenever they change, until interrupted (see main() for the parameters).
+    Only the new and modified sources are compiled again (all of them with
+    shake or inline), in this process, so the modules and caches stay warm.
+    Unless compiled on several processes, every source keeps an
+    IncrementalCompiler, so only its modified subroutines are compiled again.
+    Prints the failures and a one line summary of every build.
+    :param debounce: seconds the sources must stay unchanged before they are
+    compiled again.
+    """
+    from SourceWatcher import SourceWatcher
+    from VMInliner import VMInliner
+    watcher = SourceWatcher(path, debounce)
+    changed = findSources(path)
+    compilers = dict() if jobs == 1 else None
+    first = True
+    while True:
+        sources = watcher.sources()
+        if shake or inliner is not None:
+            # The outputs depend on all the sources
+            changed = sources
+        if inliner is not None:
+            # Forget the callees of the previous build
+            inliner = VMInliner(inliner.budget, optimizer)
+        results = []
+        start = time.perf_counter()
+        analyze(changed, token_cache, mode, xml_indent, xml_gzip, optimizer,
+                fold_constants, pool_strings, shake, inliner, lower_arrays,
+                lower_branches, jobs, results, manifest, compilers)
+        seconds = time.perf_counter() - start
+        failed = [(sourcename, error) for sourcename, _, error in results
+                  if error is not None]
+        for sourcename, error in failed:
+            print(JOB_FAILED_FORMAT.format(sourcename, error))
+        now = time.strftime(WATCH_TIME_FORMAT)
+        if first:
+            print(WATCH_FIRST_FORMAT.format(now, len(results), len(failed),
+                                            seconds), flush=True)
+        else:
+            print(WATCH_FORMAT.format(now, len(results), len(sources),
+                                      len(failed), seconds,
+                                      time.time() -
+                                      watcher.lastChange(changed)),
+                  flush=True)
+        first = False
+        changed = []
+        while not changed:
+            changed = watcher.wait()
+
+
+def createParser():
+    """
+    Returns the parser of the command line arguments of the analyzer.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compiles .jack files into .xml and .vm files.")
+    parser.add_argument("path", nargs="?", default=DEFAULT_SOURCE_FILE,
+                        help="a .jack file or a directory of .jack files")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="keep token tables of the sources in DIR")
+    parser.add_argument("--cache-size", metavar="MB", type=int,
+                        default=DEFAULT_CACHE_SIZE // MEGABYTE,
+                        help="size cap of the token cache (default: "
+                             "%(default)s)")
+    parser.add_argument("--mode", choices=MODES, default=MODE_ALL,
+                        help="outputs to write: XML and VM, only one of "
+                             "them, or none, only checking the code "
+                             "(default: %(default)s)")
+    parser.add_argument("--compact-xml", action="store_true",
+                        help="write the XML without indentation")
+    parser.add_argument("--gzip-xml", action="store_true",
+                        help="write the XML gzip-compressed, into .xml.gz "
+                             "files")
+    parser.add_argument("--optimize", metavar="RULES", type=optimizerRules,
+                        help="pass the VM code through the peephole "
+                             "optimizer, applying '{}' of its rules or the "
+                             "given comma separated ones (an unknown rule "
+                             "lists them)".format(RULES_ALL))
+    parser.add_argument("--fold-constants", action="store_true",
+                        help="evaluate constant expressions and conditions "
+                             "at compile time in the VM code")
+    parser.add_argument("--pool-strings", action="store_true",
+                        help="build every string literal once, into a "
+                             "static variable of its class (the program "
+                             "must not modify string literals)")
+    parser.add_argument("--shake", action="store_true",
+                        help="compile the sources as a whole program, "
+                             "dropping from the VM code the subroutines "
+                             "unreachable from {}, and list them".format(ROOT))
+    parser.add_argument("--inline", action="store_true",
+                        help="inline the calls of small functions, methods "
+                             "and constructors across all the sources")
+    parser.add_argument("--inline-budget", metavar="N", type=int,
+                        default=DEFAULT_BUDGET,
+                        help="size of the largest inlined function, in VM "
+                             "commands (default: %(default)s)")
+    parser.add_argument("--lower-arrays", action="store_true",
+                        help="generate specialized VM code for array "
+                             "elements: constant subscripts, simple stores "
+                             "and reuse of the 'that' pointer")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip the sources whose outputs are up to "
+                             "date, keeping a build manifest ({}) next to "
+                             "the outputs".format(MANIFEST_NAME))
+    parser.add_argument("--jobs", metavar="N", type=jobCount,
+                        help="compile the sources on N processes (0 for one "
+                             "per CPU), reporting the failures and timings "
+                             "of all of them")
+    parser.add_argument("--lower-branches", action="store_true",
+                        help="generate if statements with a single jump per "
+                             "branch and while loops with boolean conditions "
+                             "testing at the bottom")
+    parser.add_argument("--watch", action="store_true",
+                        help="compile the sources again whenever they "
+                             "change, until interrupted, printing a line "
+                             "per build")
+    parser.add_argument("--debounce", metavar="SECONDS", type=float,
+                        default=DEFAULT_DEBOUNCE,
+                        help="with --watch, wait for the sources to stay "
+                             "unchanged for SECONDS before compiling them "
+                             "(default: %(default)s)")
+    parser.add_argument("--stream", action="store_true",
+                        help="read the sources from the standard input and "
+                             "write the outputs to the standard output as "
+                             "each class is compiled, framed by '{}' header "
+                             "lines (the path is ignored)"
+                             .format(FRAME_HEADER))
+    parser.add_argument("--profile", metavar="FILE",
+                        help="record the wall and CPU time of every phase "
+                             "and file, with their tokens, VM commands and "
+                             "bytes written, into FILE as JSON, and print "
+                             "them as a table (compiles on a single "
+                             "process, not with --watch or --stream)")
+    return parser
+
+
+def jobCount(text):
+    """
+    Parses the number of processes of --jobs.
+    :param text: (String) a non-negative integer, 0 for one per CPU.
+    """
+    try:
+        jobs = int(text)
+    except ValueError:
+        jobs = -1
+    if jobs < 0:
+        raise argparse.ArgumentTypeError(JOBS_ERROR_FORMAT.format(text))
+    return jobs
+
+
+def optimizerRules(names):
+    """
+    Parses the rules of --optimize (see VMOptimizer.parseRules()).
+    :param names: (String) rule names, or "all" for all of the rules.
+    """
+    from VMOptimizer import parseRules
+    try:
+        return parseRules(names)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(error)
+
+
+def parseArguments(argv):
+    """
+    Parses the command line arguments of the analyzer.
+    :param argv: command line arguments (without the program name).
+    """
+    return createParser().parse_args(argv)
+
+
+def createOptimizers(args):
+    """
+    Creates the optimizers selected by the command line arguments.
+    :param args: parsed command line arguments (see parseArguments()).
+    :return: (VMOptimizer or None, VMInliner or None).
+    """
+    optimizer = None
+    if args.optimize is not None:
+        from VMOptimizer import VMOptimizer
+        optimizer = VMOptimizer(args.optimize)
+    inliner = None
+    if args.inline:
+        from VMInliner import VMInliner
+        inliner = VMInliner(args.inline_budget, optimizer)
+    return optimizer, inliner
+
+
+if (__name__ == "__main__"):
+    args = parseArguments(sys.argv[1:])
+    token_cache = None
+    if args.cache:
+        from TokenCache import TokenCache
+        token_cache = TokenCache(args.cache, args.cache_size * MEGABYTE)
+    optimizer, inliner = createOptimizers(args)
+    if args.stream:
+        sys.exit(compileStandardStreams(args, token_cache, optimizer))
+    jobs, results = 1, None
+    if args.jobs is not None:
+        jobs, results = args.jobs or os.cpu_count(), []
+    manifest = None
+    if args.incremental:
+        directory = args.path
+        if not os.path.isdir(directory):
+            directory = os.path.dirname(directory)
+        from BuildManifest import BuildManifest
+        manifest = BuildManifest(directory)
+    if args.watch:
+        try:
+            watch(args.path, token_cache, args.mode, not args.compact_xml,
+                  args.gzip_xml, optimizer, args.fold_constants,
+                  args.pool_strings, args.shake, inliner, args.lower_arrays,
+                  args.lower_branches, jobs, manifest, args.debounce)
+        except KeyboardInterrupt:
+            sys.exit(0)
+    profiler = None
+    if args.profile:
+        from CompileProfiler import CompileProfiler
+        profiler = CompileProfiler()
+        profiler.install()
+        if jobs != 1:
+            print(PROFILE_JOBS_FORMAT.format(args.jobs), file=sys.stderr)
+    start = time.perf_counter()
+    removed = main(args.path, token_cache, args.mode, not args.compact_xml,
+                   args.gzip_xml, optimizer, args.fold_constants,
+                   args.pool_strings, args.shake, inliner,
+                   args.lower_arrays, args.lower_branches, jobs, results,
+                   manifest, profiler)
+    if profiler:
+        profiler.uninstall()
+    if args.shake:
+        print("Removed {} unreachable subroutines".format(len(removed)))
+        for name in removed:
+            print("  " + name)
+    if results is not None:
+        reportJobs(results, time.perf_counter() - start)
+    if token_cache:
+        print(token_cache.stats())
+    if manifest:
+        print(manifest.summary())
+    if profiler:
+        for sourcename in findSources(args.path):
+            profiler.addOutputs(sourcename, outputNames(sourcename, args.mode,
+                                                        args.gzip_xml))
+        profiler.save(args.profile)
+        print(profiler.summary())
+    if results and any([error for _, _, error in results]):
+        sys.exit(1)
 
 
 
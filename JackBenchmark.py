@@ -0,0 +1,405 @@
+###############################################################################
+# Benchmark suite for the Jack compiler. Generates synthetic Jack programs of
+# a configurable size and shape, and times separately:
+#   1.  Tokenizing the sources with the JackTokenizer;
+#   2.  Parsing and emitting XML and VM with the CompilationEngine;
+#   3.  The full JackAnalyzer driver, from the sources on disk to the outputs.
+# The start up of the analyzer (the import of its modules into a fresh
+# interpreter) is timed too, and checked against an import time budget: a
+# multiple of the import of argparse, so the check holds on slow machines.
+# Results can be saved as a JSON baseline, and compared against a baseline,
+# failing when a timing regressed beyond a configured threshold.
+###############################################################################
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import JackAnalyzer
+from CompilationEngine import *
+from JackTokenizer import *
+
+#############
+# CONSTANTS #
+#############
+DEFAULT_SEED = 2017
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.25
+PHASE_TOKENIZE = "tokenize"
+PHASE_COMPILE = "compile"
+PHASE_DRIVER = "driver"
+PHASES = [PHASE_TOKENIZE, PHASE_COMPILE, PHASE_DRIVER]
+PHASE_STARTUP = "startup"
+STARTUP_MODULE = "JackAnalyzer"
+REFERENCE_MODULE = "argparse"           # Needed by STARTUP_MODULE anyway
+DEFAULT_IMPORT_BUDGET = 2.5             # Imports of REFERENCE_MODULE
+MICROSECOND = 1e-6
+IMPORT_TIME_COLUMN = 1                  # Cumulative time, in microseconds
+BUDGET_FORMAT = "OVER BUDGET {:<20} {:>10.4f}s (budget {:.4f}s, {} times " \
+                "{})"
+RESULT_KEY = "{}/{}"
+RESULT_FORMAT = "{:<32} {:>10.4f}s"
+REGRESSION_FORMAT = "REGRESSION {:<21} {:>10.4f}s (baseline {:.4f}s, +{:.0%})"
+MISSING_FORMAT = "NEW        {:<21} {:>10.4f}s (not in baseline)"
+CLASS_NAME_FORMAT = "Bench{}"
+OPS = ['+', '-', '*', '/', '&', '|', '<', '>', '=']
+UNARY_OPS = ['-', '~']
+INDENT = "    "
+
+# Program shapes: parameters of the generator
+SHAPE_CLASSES = "classes"               # Number of classes
+SHAPE_SUBROUTINES = "subroutines"       # Subroutines per class
+SHAPE_STATEMENTS = "statements"         # Statements per subroutine
+SHAPE_DEPTH = "depth"                   # Nesting depth of expressions
+SHAPE_STRING_LENGTH = "string_length"   # Length of string literals
+SHAPE_ARRAYS = "arrays"                 # Array statements per subroutine
+SHAPE_COMMENTS = "comments"             # Comment lines per statement
+BASE_SHAPE = {SHAPE_CLASSES: 4,
+              SHAPE_SUBROUTINES: 8,
+              SHAPE_STATEMENTS: 20,
+              SHAPE_DEPTH: 2,
+              SHAPE_STRING_LENGTH: 12,
+              SHAPE_ARRAYS: 2,
+              SHAPE_COMMENTS: 0}
+SHAPES = {"base": {},
+          "many-classes": {SHAPE_CLASSES: 40, SHAPE_SUBROUTINES: 4},
+          "deep-expressions": {SHAPE_DEPTH: 7, SHAPE_STATEMENTS: 8},
+          "long-strings": {SHAPE_STRING_LENGTH: 400},
+          "arrays": {SHAPE_ARRAYS: 20},
+          "comments": {SHAPE_COMMENTS: 4}}
+
+
+##################
+# JACK GENERATOR #
+##################
+
+class JackGenerator:
+    """
+    Generates synthetic Jack classes of a given shape. The classes are
+    syntactically valid and only use the variables they declare.
+    """
+
+    def __init__(self, shape, seed=DEFAULT_SEED):
+        """
+        :param shape: generator parameters, overriding BASE_SHAPE.
+        :param seed: seed of the random generator.
+        """
+        self.__shape = dict(BASE_SHAPE)
+        self.__shape.update(shape)
+        self.__random = random.Random(seed)
+
+    def __expression(self, depth):
+        """
+        Returns a random expression nested up to the given depth.
+        """
+        choice = self.__random
+        if depth <= 0:
+            return choice.choice([str(choice.randint(0, 32767)), "x",
+                                  "y", "a", "f", "arr[x]", "true", "null",
+                                  "Math.abs(y)"])
+        if choice.random() < 0.2:
+            return choice.choice(UNARY_OPS) + "(" + \
+                self.__expression(depth - 1) + ")"
+        return "(" + self.__expression(depth - 1) + " " + \
+            choice.choice(OPS) + " " + self.__expression(depth - 1) + ")"
+
+    def __string(self):
+        """
+        Returns a random string literal.
+        """
+        letters = "abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ.,!"
+        return '"' + ''.join(self.__random.choice(letters) for _ in
+                             range(self.__shape[SHAPE_STRING_LENGTH])) + '"'
+
+    def __comments(self, indent):
+        """
+        Returns the comment lines preceding a statement.
+        """
+        lines = []
+        for i in range(self.__shape[SHAPE_COMMENTS]):
+            if i % 2:
+                lines.append(indent + "/** Block comment {} with * and / "
+                                      "inside */\n".format(i))
+            else:
+                lines.append(indent + "// Line comment {} about x + y\n"
+                             .format(i))
+        return ''.join(lines)
+
+    def __statements(self, count, indent, depth):
+        """
+        Returns random statements.
+        :param count: number of statements.
+        :param indent: indentation of the statements.
+        :param depth: nesting depth of the expressions.
+        """
+        lines = []
+        for i in range(count):
+            lines.append(self.__comments(indent))
+            kind = i % 5
+            expression = self.__expression(depth)
+            if kind == 0:
+                lines.append(indent + "let x = " + expression + ";\n")
+            elif kind == 1:
+                lines.append(indent + "if (" + expression + ") {\n" +
+                             indent + INDENT + "let y = x + 1;\n" +
+                             indent + "} else {\n" +
+                             indent + INDENT + "let y = x - 1;\n" +
+                             indent + "}\n")
+            elif kind == 2:
+                lines.append(indent + "while (x < " + expression + ") {\n" +
+                             indent + INDENT + "let x = x + 1;\n" +
+                             indent + "}\n")
+            elif kind == 3:
+                lines.append(indent + "let s = " + self.__string() + ";\n")
+            else:
+                lines.append(indent + "do Output.printInt(" + expression +
+                             ");\n")
+        for i in range(self.__shape[SHAPE_ARRAYS]):
+            lines.append(indent + "let arr[{}] = arr[x + {}] + {};\n".format(
+                i, i, self.__expression(depth - 1)))
+        return ''.join(lines)
+
+    def generateClass(self, name):
+        """
+        Returns the source of a synthetic class.
+        :param name: name of the class.
+        """
+        shape = self.__shape
+        lines = ["// Synthetic benchmark class\n",
+                 "class " + name + " {\n",
+                 INDENT + "field int f, g;\n",
+                 INDENT + "static Array table;\n\n",
+                 INDENT + "constructor " + name + " new(int a) {\n",
+                 INDENT * 2 + "let f = a;\n",
+                 INDENT * 2 + "let g = 0;\n",
+                 INDENT * 2 + "return this;\n",
+                 INDENT + "}\n\n"]
+        for i in range(shape[SHAPE_SUBROUTINES]):
+            lines.append(INDENT + "method int run{}(int a, int y) {{\n"
+                         .format(i))
+            lines.append(INDENT * 2 + "var int x;\n")
+            lines.append(INDENT * 2 + "var Array arr;\n")
+            lines.append(INDENT * 2 + "var String s;\n")
+            lines.append(INDENT * 2 + "let arr = Array.new({});\n".format(
+                shape[SHAPE_ARRAYS] + 1))
+            lines.append(self.__statements(shape[SHAPE_STATEMENTS],
+                                           INDENT * 2, shape[SHAPE_DEPTH]))
+            lines.append(INDENT * 2 + "do arr.dispose();\n")
+            lines.append(INDENT * 2 + "return x;\n")
+            lines.append(INDENT + "}\n\n")
+        lines.append(INDENT + "function void main() {\n")
+        lines.append(INDENT * 2 + "var " + name + " obj;\n")
+        lines.append(INDENT * 2 + "let obj = " + name + ".new(1);\n")
+        lines.append(INDENT * 2 + "do obj.run0(1, 2);\n")
+        lines.append(INDENT * 2 + "return;\n")
+        lines.append(INDENT + "}\n")
+        lines.append("}\n")
+        return ''.join(lines)
+
+    def generateProgram(self):
+        """
+        Returns the sources of a synthetic program.
+        :return: dictionary from class name to class source.
+        """
+        return {CLASS_NAME_FORMAT.format(i):
+                self.generateClass(CLASS_NAME_FORMAT.format(i))
+                for i in range(self.__shape[SHAPE_CLASSES])}
+
+
+##############
+# BENCHMARKS #
+##############
+
+def timeTokenize(program):
+    """
+    Tokenizes all classes of the program.
+    """
+    for source in program.values():
+        tokenizer = JackTokenizer(io.StringIO(source))
+        while tokenizer.hasMoreTokens():
+            tokenizer.advance()
+
+
+def timeCompile(program):
+    """
+    Parses all classes of the program and emits XML and VM into memory.
+    """
+    for name, source in program.items():
+        engine = CompilationEngine(name, io.StringIO(source), io.StringIO(),
+                                   io.StringIO())
+        engine.compileClass()
+
+
+def timeDriver(directory):
+    """
+    Runs the full analyzer on a directory of sources.
+    """
+    JackAnalyzer.main(directory)
+
+
+def measureImport(module, repeat):
+    """
+    Returns the best time of importing a module into a fresh interpreter, as
+    reported by python -X importtime (the start up of the interpreter itself
+    is left out). The compiled modules are cached as in normal runs.
+    """
+    environment = dict(os.environ)
+    environment.pop("PYTHONDONTWRITEBYTECODE", None)
+    directory = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    # The first run may compile the modules
+    for _ in range(repeat + 1):
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                                  "import " + module],
+                                 cwd=directory, env=environment, check=True,
+                                 stderr=subprocess.PIPE,
+                                 universal_newlines=True)
+        line = process.stderr.splitlines()[-1]
+        elapsed = int(line.split("|")[IMPORT_TIME_COLUMN]) * MICROSECOND
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def measure(function, argument, repeat):
+    """
+    Returns the best wall time of running function(argument) repeatedly.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def runShape(name, shape, repeat, seed):
+    """
+    Runs all benchmark phases on a program of the given shape.
+    :return: dictionary from result key to best wall time.
+    """
+    program = JackGenerator(shape, seed).generateProgram()
+    results = dict()
+    results[RESULT_KEY.format(name, PHASE_TOKENIZE)] = measure(
+        timeTokenize, program, repeat)
+    results[RESULT_KEY.format(name, PHASE_COMPILE)] = measure(
+        timeCompile, program, repeat)
+    directory = tempfile.mkdtemp()
+    try:
+        for class_name, source in program.items():
+            path = os.path.join(directory, class_name +
+                                JackAnalyzer.SOURCE_EXTENSION)
+            with open(path, 'w') as out:
+                out.write(source)
+        results[RESULT_KEY.format(name, PHASE_DRIVER)] = measure(
+            timeDriver, directory, repeat)
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+
+def compareToBaseline(results, baseline, threshold):
+    """
+    Compares results to a baseline.
+    :param threshold: allowed relative slowdown (0.25 = 25% slower).
+    :return: list of report lines of the regressions.
+    """
+    regressions = []
+    for key, elapsed in sorted(results.items()):
+        if key not in baseline:
+            print(MISSING_FORMAT.format(key, elapsed))
+            continue
+        slowdown = elapsed / baseline[key] - 1
+        if slowdown > threshold:
+            regressions.append(REGRESSION_FORMAT.format(key, elapsed,
+                                                        baseline[key],
+                                                        slowdown))
+    return regressions
+
+
+def parseArguments(argv):
+    """
+    Parses the command line arguments of the benchmark suite.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the Jack compiler on synthetic programs.")
+    parser.add_argument("--shape", action="append", choices=sorted(SHAPES),
+                        help="program shape to run (default: all)")
+    parser.add_argument("--scale", type=int, default=1,
+                        help="multiplies the number of statements")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="runs per phase, the best is kept")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--save", metavar="FILE",
+                        help="save the results as a JSON baseline")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="compare the results to a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown against the baseline "
+                             "(default: %(default)s)")
+    parser.add_argument("--import-budget", metavar="TIMES", type=float,
+                        default=DEFAULT_IMPORT_BUDGET,
+                        help="longest import of the analyzer, as a multiple "
+                             "of the import of {} (default: %(default)s)"
+                             .format(REFERENCE_MODULE))
+    parser.add_argument("--startup-only", action="store_true",
+                        help="only check the start up against the import "
+                             "budget")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    """
+    Runs the benchmarks.
+    :return: process exit code, 1 if a regression was found or the import
+    budget was exceeded.
+    """
+    args = parseArguments(argv)
+    results = dict()
+    startup = RESULT_KEY.format(PHASE_STARTUP, STARTUP_MODULE)
+    reference = RESULT_KEY.format(PHASE_STARTUP, REFERENCE_MODULE)
+    results[startup] = measureImport(STARTUP_MODULE, args.repeat)
+    results[reference] = measureImport(REFERENCE_MODULE, args.repeat)
+    for name in [] if args.startup_only else args.shape or sorted(SHAPES):
+        shape = dict(SHAPES[name])
+        shape[SHAPE_STATEMENTS] = shape.get(
+            SHAPE_STATEMENTS, BASE_SHAPE[SHAPE_STATEMENTS]) * args.scale
+        results.update(runShape(name, shape, args.repeat, args.seed))
+    for key, elapsed in sorted(results.items()):
+        print(RESULT_FORMAT.format(key, elapsed))
+
+    failed = False
+    budget = args.import_budget * results[reference]
+    if results[startup] > budget:
+        print(BUDGET_FORMAT.format(startup, results[startup], budget,
+                                   args.import_budget, REFERENCE_MODULE))
+        failed = True
+
+    if args.save:
+        with open(args.save, 'w') as out:
+            json.dump({"python": platform.python_version(),
+                       "scale": args.scale,
+                       "results": results}, out, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compareToBaseline(results,
+                                            json.load(baseline)["results"],
+                                            args.threshold)
+        for line in regressions:
+            print(line)
+        if regressions:
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,6 +1,7 @@
 ###############################################################################
 # Contains regular expressions and other utilities related to the grammar of
-# the Jack Programming Language.
+# the Jack Programming Language. The regular expressions are compiled on first
+# use (see compiledRegex()), so importing the grammar costs next to nothing.
 ###############################################################################
 import re
 
@@ -10,9 +11,7 @@ import re
 RE_WHITESPACES = r'\s'  # https://regex101.com/r/evyXL2/1
 RE_COMMENT_END_OF_LINE = r'//.*[\r\n]+'  # https://regex101.com/r/PbLBSc/1
 RE_COMMENT_INLINE = r'/\*[\s\S]*?\*/'  # https://regex101.com/r/PbLBSc/3
-RE_COMMENT_END_OF_LINE_COMPILED = re.compile(RE_COMMENT_END_OF_LINE)
-RE_COMMENT_INLINE_COMPILED = re.compile(RE_COMMENT_INLINE)
-RE_WHITESPACE_COMPILED = re.compile(RE_WHITESPACES)
+COMMENT_PREFIXES = ('/*', '//')
 RE_BULLSHIT = r'(?!\w)'#"((/.*[\\r\\n]+)|(/\*[\\s\\S]*?\*/)|(\s))*"
 
 ############
@@ -52,7 +51,6 @@ KEYWORDS = [RE_CLASS, RE_CONSTRUCTOR, RE_FUNCTION, RE_METHOD, RE_FIELD,
             RE_ELSE, RE_WHILE, RE_RETURN_NOTHING, RE_RETURN_SOMETHING]
 RE_KEYWORDS = '('+ r'|'.join(KEYWORDS) +')'+ RE_BULLSHIT #
 # https://regex101.com/r/eVCEmK/2
-RE_KEYWORDS_COMPILED = re.compile(RE_KEYWORDS)
 
 ###########
 # SYMBOLS #
@@ -86,7 +84,6 @@ SYMBOLS = [RE_BRACKETS_CURLY_LEFT, RE_BRACKETS_CURLY_RIGHT,
            RE_PLUS, RE_BAR, RE_ASTERISK, RE_SLASH, RE_AMPERSAND, RE_VBAR,
            RE_LT, RE_GT, RE_EQ, RE_TILDA]
 RE_SYMBOLS = "\\" + '|\\'.join(SYMBOLS)  # https://regex101.com/r/eVCEmK/4
-RE_SYMBOLS_COMPILED = re.compile(RE_SYMBOLS)
 XML_AMPERSAND = "&amp;"
 XML_LT = "&lt;"
 XML_GT = "&gt;"
@@ -101,7 +98,6 @@ RE_SYMBOLS_SPECIAL_TRANSLATE = {
 A decimal number in the range 0 .. 32767. 
 '''
 RE_INTEGER = r'\d+'  # https://regex101.com/r/8eIoqD/1
-RE_INTEGER_COMPILED = re.compile(RE_INTEGER)
 
 ###################
 # STRING CONSTANT #
@@ -110,7 +106,6 @@ RE_INTEGER_COMPILED = re.compile(RE_INTEGER)
 '"' A sequence of Unicode characters not including double quote or newline '"' 
 '''
 RE_STRING = r'\".*?\"'  # https://regex101.com/r/rcXjLE/1
-RE_STRING_COMPILED = re.compile(RE_STRING)
 
 ###############
 # IDENTIFIERS #
@@ -120,7 +115,66 @@ A sequence of letters, digits, and underscore ( '_' ) not starting with a
 digit. 
 '''
 RE_IDENTIDIER = r'[a-zA-Z_$][a-zA-Z_$0-9]*'  # https://regex101.com/r/ZGwjj3/1
-RE_IDENTIDIER_COMPILED = re.compile(RE_IDENTIDIER)
+
+#################
+# MASTER TOKENS #
+#################
+'''
+Single-pass scanning: one regex skips any run of whitespace and comments, and
+one regex matches the next lexical element. Keywords are scanned as words and
+told apart from identifiers by a set lookup.
+'''
+RE_SKIP = '(?:' + r'|'.join([RE_WHITESPACES + '+', RE_COMMENT_INLINE,
+                              RE_COMMENT_END_OF_LINE]) + ')*'
+GROUP_WORD = "word"
+GROUP_SYMBOL = "symbol"
+GROUP_INTEGER = "integer"
+GROUP_STRING = "string"
+RE_TOKEN = r'|'.join(["(?P<{}>{})".format(GROUP_WORD, RE_IDENTIDIER),
+                      "(?P<{}>[{}])".format(GROUP_SYMBOL,
+                                            re.escape(''.join(SYMBOLS))),
+                      "(?P<{}>{})".format(GROUP_INTEGER, RE_INTEGER),
+                      "(?P<{}>{})".format(GROUP_STRING, RE_STRING)])
+KEYWORD_WORDS = frozenset(KEYWORDS) - {RE_RETURN_NOTHING}
+WORD_TERMINATOR = '$'
+
+##################
+# LAZY COMPILING #
+##################
+COMPILED_REGEXES = dict()  # Pattern --> compiled regular expression
+# Names of the compiled regular expressions of the grammar --> their patterns
+LAZY_COMPILED = {"RE_COMMENT_END_OF_LINE_COMPILED": RE_COMMENT_END_OF_LINE,
+                 "RE_COMMENT_INLINE_COMPILED": RE_COMMENT_INLINE,
+                 "RE_WHITESPACE_COMPILED": RE_WHITESPACES,
+                 "RE_KEYWORDS_COMPILED": RE_KEYWORDS,
+                 "RE_SYMBOLS_COMPILED": RE_SYMBOLS,
+                 "RE_INTEGER_COMPILED": RE_INTEGER,
+                 "RE_STRING_COMPILED": RE_STRING,
+                 "RE_IDENTIDIER_COMPILED": RE_IDENTIDIER,
+                 "RE_SKIP_COMPILED": RE_SKIP,
+                 "RE_TOKEN_COMPILED": RE_TOKEN}
+
+
+def compiledRegex(pattern):
+    """
+    Returns the compiled regular expression of a pattern, compiling it on its
+    first use.
+    """
+    regex = COMPILED_REGEXES.get(pattern)
+    if regex is None:
+        regex = COMPILED_REGEXES[pattern] = re.compile(pattern)
+    return regex
+
+
+def __getattr__(name):
+    """
+    Looks up the compiled regular expressions of the grammar (such as
+    RE_TOKEN_COMPILED), compiling them on first use.
+    """
+    if name in LAZY_COMPILED:
+        return compiledRegex(LAZY_COMPILED[name])
+    raise AttributeError("module '{}' has no attribute '{}'"
+                         .format(__name__, name))
 
 
 def main():
@@ -0,0 +1,442 @@
+############################################################################
+# Parses Jack code into an abstract syntax tree (see JackAST). Gets its input
+# from a JackTokenizer. The parsing is done by a series of parseXxx()
+# routines, one for every syntactic element xxx of the Jack grammar. The
+# contract between these routines is that each parseXxx() routine should
+# read the syntactic construct xxx from the input, advance() the tokenizer
+# exactly beyond xxx, and return the node of xxx. Thus, parseXxx() may only be
+# called if indeed xxx is the next syntactic element of the input.
+# While parsing, the parser keeps the SymbolTable of the code and resolves
+# every use of a variable to its kind and running index.
+##############################################################################
+from JackAST import *
+from JackTokenizer import *
+from SymbolTable import *
+
+SUBROUTINE_KEYWORDS = {RE_CONSTRUCTOR, RE_FUNCTION, RE_METHOD}
+PRIMITIVE_TYPES = {RE_INT, RE_CHAR, RE_BOOLEAN}
+STATEMENT_KEYWORDS = {RE_LET, RE_IF, RE_WHILE, RE_DO, RE_RETURN_NOTHING,
+                      RE_RETURN_SOMETHING}
+BINARY_OPS = {RE_PLUS, RE_BAR, RE_ASTERISK, RE_SLASH, RE_AMPERSAND, RE_VBAR,
+              RE_LT, RE_GT, RE_EQ}
+UNARY_OPS = {RE_TILDA, RE_BAR}
+ERROR_UNEXPECTED_SYMBOL = "Unexpected symbol '{}', expected '{}'"
+
+
+class JackParser:
+    ###############
+    # CONSTRUCTOR #
+    ###############
+
+    def __init__(self, tokenizer):
+        """
+        Creates a new parser reading from the given tokenizer.
+        The next routine called must be parseClass() or
+        parseClassDeclarations().
+        :param tokenizer: JackTokenizer of the source.
+        """
+        self.__tokenizer = tokenizer
+        self.__symbolTable = SymbolTable()
+        self.__className = None
+        self.__tokenizer.advance()
+
+    ###################
+    # PRIVATE METHODS #
+    ###################
+
+    def __keyWord(self):
+        """
+        Reads a keyword token.
+        """
+        keyword = self.__tokenizer.keyWord()
+        self.__tokenizer.advance()
+        return keyword
+
+    def __symbol(self, expected=None):
+        """
+        Reads a symbol token.
+        :param expected: the symbol required by the grammar (or None for any
+        symbol).
+        :return: the symbol as returned by the tokenizer (XML escaped).
+        """
+        symbol = self.__tokenizer.symbol()
+        if expected is not None and symbol != expected:
+            raise ValueError(ERROR_UNEXPECTED_SYMBOL.format(symbol, expected))
+        self.__tokenizer.advance()
+        return symbol
+
+    def __identifier(self):
+        """
+        Reads an identifier token.
+        """
+        identifier = self.__tokenizer.identifier()
+        self.__tokenizer.advance()
+        return identifier
+
+    def __type(self):
+        """
+        Reads a type.
+        Syntax:
+        'int' | 'char' | 'boolean' | className
+        """
+        if self.__tokenizer.peek() in PRIMITIVE_TYPES:
+            return self.__keyWord()
+        return self.__identifier()
+
+    def __varNames(self, type, kind):
+        """
+        Reads and defines variable names.
+        Syntax:
+        varName (',' varName)* ';'
+        :return: list of the names.
+        """
+        names = []
+        moreVars = True
+        while moreVars:
+            name = self.__identifier()                  # varName
+            self.__symbolTable.define(name, type, kind)
+            names.append(name)
+            if self.__tokenizer.peek() == RE_COMMA:
+                self.__symbol(RE_COMMA)                 # ','
+            else:
+                moreVars = False
+        self.__symbol(RE_SEMICOLON)                     # ';'
+        return names
+
+    ##################
+    # PUBLIC METHODS #
+    ##################
+
+    def parseClassDeclarations(self):
+        """
+        Parses the beginning of a class, up to its first subroutine.
+        Syntax:
+        'class' className '{' classVarDec*
+        :return: ClassNode with no subroutines.
+        """
+        self.__keyWord()                                # 'class'
+        self.__className = self.__identifier()          # className
+        self.__symbol(RE_BRACKETS_CURLY_LEFT)           # '{'
+        var_decs = []
+        while self.__tokenizer.peek() in {RE_STATIC, RE_FIELD}:
+            var_decs.append(self.parseClassVarDec())    # classVarDec*
+        # Statics are indexed by definition (even a redefined name)
+        n_statics = sum([len(var_dec.names) for var_dec in var_decs
+                         if var_dec.kind == KIND_STATIC])
+        return ClassNode(self.__className, var_decs, [],
+                         self.__symbolTable.varCount(KIND_FIELD), n_statics)
+
+    def hasSubroutine(self):
+        """
+        Is the next syntactic element a subroutine declaration?
+        """
+        return self.__tokenizer.peek() in SUBROUTINE_KEYWORDS
+
+    def parseClassEnd(self):
+        """
+        Parses the end of a class, after its last subroutine.
+        Syntax:
+        '}'
+        """
+        self.__symbol(RE_BRACKETS_CURLY_RIGHT)          # '}'
+
+    def parseClass(self):
+        """
+        Parses a complete class.
+        Syntax:
+        'class' className '{' classVarDec* subroutineDec* '}'
+        """
+        node = self.parseClassDeclarations()
+        while self.hasSubroutine():
+            node.subroutines.append(self.parseSubroutine())
+        self.parseClassEnd()
+        return node
+
+    def parseClassVarDec(self):
+        """
+        Parses a static declaration or a field declaration.
+        Syntax:
+        ('static' | 'field') type varName (',' varName)* ';'
+        """
+        kind = self.__keyWord()                         # ('static' | 'field')
+        type = self.__type()                            # type
+        return ClassVarDec(kind, type, self.__varNames(type, kind))
+
+    def parseSubroutine(self):
+        """
+        Parses a complete method, function, or constructor.
+        Syntax:
+        ('constructor' | 'function' | 'method') ('void' | type)
+        subroutineName '(' parameterList ')' subroutineBody
+        """
+        self.__symbolTable.startSubroutine()
+        kind = self.__keyWord()                         # ('constructor' |
+                                                        # 'function' | 'method')
+        if kind == RE_METHOD:
+            # +1 var count for this method (+1 for self)
+            self.__symbolTable.define(VM_SELF, self.__className, KIND_ARG)
+        if self.__tokenizer.peek() == RE_VOID:
+            return_type = self.__keyWord()              # 'void'
+        else:
+            return_type = self.__type()                 # type
+        name = self.__identifier()                      # subroutineName
+        self.__symbol(RE_BRACKETS_LEFT)                 # '('
+        parameters = self.parseParameterList()          # parameterList
+        self.__symbol(RE_BRACKETS_RIGHT)                # ')'
+        self.__symbol(RE_BRACKETS_CURLY_LEFT)           # '{'
+        var_decs = []
+        while self.__tokenizer.peek() == RE_VAR:
+            var_decs.append(self.parseVarDec())         # varDec*
+        n_locals = self.__symbolTable.varCount(KIND_VAR)
+        statements = self.parseStatements()             # statements
+        self.__symbol(RE_BRACKETS_CURLY_RIGHT)          # '}'
+        return Subroutine(kind, return_type, name, parameters, var_decs,
+                          statements, n_locals)
+
+    def parseParameterList(self):
+        """
+        Parses a (possibly empty) parameter list, not including the
+        enclosing "()".
+        Syntax:
+        ( (type varName) (',' type varName)*)?
+        :return: list of (type, name) pairs.
+        """
+        parameters = []
+        if self.__tokenizer.peek() != RE_BRACKETS_RIGHT:
+            moreVars = True
+            while moreVars:
+                type = self.__type()                    # type
+                name = self.__identifier()              # varName
+                self.__symbolTable.define(name, type, KIND_ARG)
+                parameters.append((type, name))
+                if self.__tokenizer.peek() == RE_COMMA:
+                    self.__symbol(RE_COMMA)             # ','
+                else:
+                    moreVars = False
+        return parameters
+
+    def parseVarDec(self):
+        """
+        Parses a var declaration.
+        Syntax:
+        'var' type varName (',' varName)* ';'
+        """
+        self.__keyWord()                                # 'var'
+        type = self.__type()                            # type
+        return VarDec(type, self.__varNames(type, KIND_VAR))
+
+    def parseStatements(self):
+        """
+        Parses a sequence of statements, not including the enclosing "{}".
+        Syntax:
+        statement*
+        where statement is in:
+        letStatement | ifStatement | whileStatement | doStatement | returnStatement
+        """
+        statements = []
+        statement = self.__tokenizer.peek()
+        while statement in STATEMENT_KEYWORDS:
+            if statement == RE_LET:
+                statements.append(self.parseLet())
+            elif statement == RE_IF:
+                statements.append(self.parseIf())
+            elif statement == RE_WHILE:
+                statements.append(self.parseWhile())
+            elif statement == RE_DO:
+                statements.append(self.parseDo())
+            else:
+                statements.append(self.parseReturn())
+            statement = self.__tokenizer.peek()
+        return statements
+
+    def parseDo(self):
+        """
+        Parses a do statement.
+        Syntax:
+        'do' subroutineCall ';'
+        """
+        self.__keyWord()                                # 'do'
+        call = self.parseSubroutineCall()               # subroutineCall
+        self.__symbol(RE_SEMICOLON)                     # ';'
+        return DoStatement(call)
+
+    def parseLet(self):
+        """
+        Parses a let statement.
+        Syntax:
+        'let' varName ('[' expression ']')? '=' expression ';'
+        """
+        self.__keyWord()                                # 'let'
+        name = self.__tokenizer.peek()
+        index = self.__symbolTable.indexOf(name)
+        kind = self.__symbolTable.kindOf(name)
+        self.__identifier()                             # varName
+        subscript = None
+        if self.__tokenizer.peek() == RE_BRACKETS_SQUARE_LEFT:
+            self.__symbol(RE_BRACKETS_SQUARE_LEFT)      # '['
+            subscript = self.parseExpression()          # expression
+            self.__symbol(RE_BRACKETS_SQUARE_RIGHT)     # ']'
+        self.__symbol(RE_EQ)                            # '='
+        value = self.parseExpression()                  # expression
+        self.__symbol(RE_SEMICOLON)                     # ';'
+        return LetStatement(name, kind, index, subscript, value)
+
+    def parseWhile(self):
+        """
+        Parses a while statement.
+        Syntax:
+        'while' '(' expression ')' '{' statements '}'
+        """
+        self.__keyWord()                                # 'while'
+        self.__symbol(RE_BRACKETS_LEFT)                 # '('
+        condition = self.parseExpression()              # expression
+        self.__symbol(RE_BRACKETS_RIGHT)                # ')'
+        self.__symbol(RE_BRACKETS_CURLY_LEFT)           # '{'
+        statements = self.parseStatements()             # statements
+        self.__symbol(RE_BRACKETS_CURLY_RIGHT)          # '}'
+        return WhileStatement(condition, statements)
+
+    def parseReturn(self):
+        """
+        Parses a return statement.
+        Syntax:
+        'return;' | 'return' expression ';'
+        """
+        statement = self.__tokenizer.peek()
+        self.__tokenizer.advance()                      # 'return;' | 'return'
+        if statement == RE_RETURN_NOTHING:
+            return ReturnStatement(None)
+        value = self.parseExpression()                  # expression
+        self.__symbol(RE_SEMICOLON)                     # ';'
+        return ReturnStatement(value)
+
+    def parseIf(self):
+        """
+        Parses an if statement, possibly with a trailing else clause.
+        Syntax:
+        'if' '(' expression ')' '{' statements '}' ( 'else' '{' statements
+        '}' )?
+        """
+        self.__keyWord()                                # 'if'
+        self.__symbol(RE_BRACKETS_LEFT)                 # '('
+        condition = self.parseExpression()              # expression
+        self.__symbol(RE_BRACKETS_RIGHT)                # ')'
+        self.__symbol(RE_BRACKETS_CURLY_LEFT)           # '{'
+        statements = self.parseStatements()             # statements
+        self.__symbol(RE_BRACKETS_CURLY_RIGHT)          # '}'
+        else_statements = None
+        if self.__tokenizer.peek() == RE_ELSE:
+            self.__keyWord()                            # 'else'
+            self.__symbol(RE_BRACKETS_CURLY_LEFT)       # '{'
+            else_statements = self.parseStatements()    # statements
+            self.__symbol(RE_BRACKETS_CURLY_RIGHT)      # '}'
+        return IfStatement(condition, statements, else_statements)
+
+    def parseExpression(self):
+        """
+        Parses an expression.
+        Syntax:
+        term (op term)*
+        """
+        terms = [self.parseTerm()]                      # term
+        ops = []
+        while self.__tokenizer.peek() in BINARY_OPS:
+            ops.append(self.__symbol())                 # op
+            terms.append(self.parseTerm())              # term
+        return Expression(terms, ops)
+
+    def parseTerm(self):
+        """
+        Parses a term.
+        If the current token is an identifier, the routine must distinguish
+        between a variable, an array entry, and a subroutine call. A single
+        look-ahead token, which may be one of "[", "(", or "." suffices to
+        distinguish between the three possibilities. Any other token is not
+        part of this term and should not be advanced over.
+        Syntax:
+        integerConstant | stringConstant | keywordConstant | varName |
+        varName '[' expression ']' | subroutineCall | '(' expression ')' |
+        unaryOp term
+        """
+        tokenizer = self.__tokenizer
+        lookahead = tokenizer.lookahead()
+        if tokenizer.peek() == RE_BRACKETS_LEFT:
+            self.__symbol(RE_BRACKETS_LEFT)             # '('
+            expression = self.parseExpression()         # expression
+            self.__symbol(RE_BRACKETS_RIGHT)            # ')'
+            return ParenTerm(expression)
+        if tokenizer.peek() in UNARY_OPS:
+            op = self.__symbol()                        # unaryOp
+            return UnaryTerm(op, self.parseTerm())      # term
+        if lookahead == RE_BRACKETS_SQUARE_LEFT:
+            name = tokenizer.peek()
+            index = self.__symbolTable.indexOf(name)
+            kind = self.__symbolTable.kindOf(name)
+            self.__identifier()                         # varName
+            self.__symbol(RE_BRACKETS_SQUARE_LEFT)      # '['
+            subscript = self.parseExpression()          # expression
+            self.__symbol(RE_BRACKETS_SQUARE_RIGHT)     # ']'
+            return ArrayTerm(name, kind, index, subscript)
+        if lookahead in {RE_BRACKETS_LEFT, RE_DOT}:
+            return self.parseSubroutineCall()           # subroutineCall
+        token_type = tokenizer.tokenType()
+        if token_type == TOKEN_TYPE_INTEGER:
+            value = tokenizer.intVal()                  # integerConstant
+            tokenizer.advance()
+            return IntegerConstant(value)
+        if token_type == TOKEN_TYPE_STRING:
+            value = tokenizer.stringVal()               # stringConstant
+            tokenizer.advance()
+            return StringConstant(value)
+        if token_type == TOKEN_TYPE_KEYWORD:
+            return KeywordConstant(self.__keyWord())    # keywordConstant
+        if token_type == TOKEN_TYPE_IDENTIFIER:
+            name = tokenizer.peek()
+            kind = self.__symbolTable.kindOf(name)
+            index = self.__symbolTable.indexOf(name)
+            self.__identifier()                         # varName
+            return VarTerm(name, kind, index)
+        return EmptyTerm()
+
+    def parseSubroutineCall(self):
+        """
+        Parses a subroutine call.
+        Syntax:
+        ( className | varName) '.' subroutineName '(' expressionList ')' |
+        subroutineName '(' expressionList ')'
+        """
+        target = None
+        kind = KIND_NONE
+        index = None
+        class_name = self.__className
+        if self.__tokenizer.lookahead() == RE_DOT:      # className | varName
+            target = self.__tokenizer.peek()
+            kind = self.__symbolTable.kindOf(target)
+            if kind != KIND_NONE:                       # varName
+                class_name = self.__symbolTable.typeOf(target)
+                index = self.__symbolTable.indexOf(target)
+            else:                                       # className
+                class_name = target
+            self.__identifier()
+            self.__symbol(RE_DOT)                       # '.'
+        name = self.__identifier()                      # subroutineName
+        self.__symbol(RE_BRACKETS_LEFT)                 # '('
+        arguments = self.parseExpressionList()          # expressionList
+        self.__symbol(RE_BRACKETS_RIGHT)                # ')'
+        return SubroutineCall(target, kind, index, class_name, name,
+                              arguments)
+
+    def parseExpressionList(self):
+        """
+        Parses a (possibly empty) comma-separated list of expressions.
+        Syntax:
+        (expression (',' expression)* )?
+        :return: list of the expressions.
+        """
+        expressions = []
+        if self.__tokenizer.peek() != RE_BRACKETS_RIGHT:
+            expressions.append(self.parseExpression())  # expression
+            while self.__tokenizer.peek() == RE_COMMA:
+                self.__symbol(RE_COMMA)                 # ','
+                expressions.append(self.parseExpression())
+        return expressions
@@ -0,0 +1,122 @@
+###############################################################################
+# Streaming compilation, for pipelines: Jack classes are read from an input
+# stream and their VM code (and XML) written to an output stream, a class at
+# a time, with no files involved. Both streams hold a sequence of frames, each
+# a header line with the name of a file and the size of its text in bytes,
+# followed by the text itself (in UTF-8):
+#   #file Main.jack 123
+#   class Main { ... }
+# The outputs of a class are written (and flushed) as soon as the class is
+# compiled, as frames named Xxx.vm and Xxx.xml. Whole program options (shake
+# and inline) need every class first, so the outputs then follow the input.
+# A shell loop frames the sources of a directory:
+#   for f in *.jack; do printf '#file %s %d\n' $f $(wc -c < $f); cat $f; done
+###############################################################################
+from CompileAPI import *
+from CompilerDefaults import *
+
+#############
+# CONSTANTS #
+#############
+FRAME_FORMAT = FRAME_TAG + " {} {}\n"
+FRAME_FIELDS = 3                # Tag, name and size
+FRAME_ENCODING = "utf-8"
+FRAME_ERROR_FORMAT = "Invalid frame header: {!r}"
+FRAME_TRUNCATED_FORMAT = "Truncated frame {}: {} of {} bytes"
+
+
+def readFrames(in_stream):
+    """
+    Reads the frames of a binary stream, one at a time.
+    :param in_stream: binary stream of frames.
+    :return: generator of (file name, text) by frame.
+    """
+    while True:
+        header = in_stream.readline()
+        if not header:
+            return
+        if not header.strip():
+            continue
+        fields = header.decode(FRAME_ENCODING).split()
+        if len(fields) != FRAME_FIELDS or fields[0] != FRAME_TAG or \
+                not fields[2].isdigit():
+            raise ValueError(FRAME_ERROR_FORMAT.format(header))
+        _, name, size = fields
+        data = in_stream.read(int(size))
+        if len(data) != int(size):
+            raise ValueError(FRAME_TRUNCATED_FORMAT.format(name, len(data),
+                                                           size))
+        yield name, data.decode(FRAME_ENCODING)
+
+
+def writeFrame(out_stream, name, text):
+    """
+    Writes a frame into a binary stream.
+    :param out_stream: binary stream of frames.
+    :param name: name of the file of the frame.
+    :param text: (String) text of the file.
+    """
+    data = text.encode(FRAME_ENCODING)
+    out_stream.write(FRAME_FORMAT.format(name, len(data))
+                     .encode(FRAME_ENCODING))
+    out_stream.write(data)
+
+
+def writeOutputs(out_stream, name, outputs):
+    """
+    Writes the outputs of a class as frames, and flushes them.
+    :param name: name of the class.
+    :param outputs: (VM code, XML) of the class, either None if not written.
+    """
+    vm, xml = outputs
+    if xml is not None:
+        writeFrame(out_stream, name + XML_EXTENSION, xml)
+    if vm is not None:
+        writeFrame(out_stream, name + VM_EXTENSION, vm)
+    out_stream.flush()
+
+
+def compileStream(in_stream, out_stream, mode=MODE_ALL, xml_indent=True,
+                  optimizer=None, fold_constants=False, pool_strings=False,
+                  shake=False, inline=False, inline_budget=DEFAULT_BUDGET,
+                  lower_arrays=False, lower_branches=False, token_cache=None,
+                  errors=None):
+    """
+    Compiles the classes framed in a binary stream into frames of their
+    outputs (see compileProgram() for the parameters).
+    :param in_stream: binary stream of the frames of the sources.
+    :param out_stream: binary stream to write the frames of the outputs to.
+    :param errors: dictionary to store the error messages of the classes
+    which fail to compile in, by class name (or None). A failing class then
+    does not stop the others.
+    :return: names of the dropped VM functions.
+    """
+    removed = []
+    if (shake or inline) and mode in VM_MODES:
+        sources = dict()
+        for name, text in readFrames(in_stream):
+            sources[name] = text
+        outputs = compileProgram(sources, mode, xml_indent, optimizer,
+                                 fold_constants, pool_strings, shake, inline,
+                                 inline_budget, lower_arrays, lower_branches,
+                                 token_cache, errors, removed)
+        for name in sources:
+            if sourceClass(name) in outputs:
+                writeOutputs(out_stream, sourceClass(name),
+                             outputs[sourceClass(name)])
+        return removed
+
+    for name, text in readFrames(in_stream):
+        try:
+            outputs = compileClass(text, mode, xml_indent, optimizer,
+                                   fold_constants, pool_strings, None,
+                                   lower_arrays, lower_branches, token_cache,
+                                   sourceClass(name))
+        except Exception as exception:
+            if errors is None:
+                raise
+            errors[sourceClass(name)] = ERROR_FORMAT.format(
+                type(exception).__name__, exception)
+            continue
+        writeOutputs(out_stream, sourceClass(name), outputs)
+    return removed
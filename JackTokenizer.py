@@ -4,7 +4,8 @@
 # as specified by the Jack grammar.
 ##############################################################################
 from JackGrammar import *
-import re
+from array import array
+from sys import intern
 
 #############
 # CONSTANTS #
@@ -19,92 +20,268 @@ TOKEN_TYPE_IDENTIFIER = "identifier"
 TOKEN_TYPE_NONE = "TOKEN_TYPE_NONE"
 TOKEN_NONE = "TOKEN_NONE"
 TOKEN_ROOT = "tokens"
+DEFAULT_CHUNK_SIZE = 1 << 16  # Characters read from the input at a time
+WHOLE_FILE = -1  # Chunk size for reading the entire input at once
+TOKENIZER_VERSION = "3"  # Bump whenever the token tables change
+
+TOKEN_TYPES = (TOKEN_TYPE_KEYWORD, TOKEN_TYPE_SYMBOL, TOKEN_TYPE_INTEGER,
+               TOKEN_TYPE_STRING, TOKEN_TYPE_IDENTIFIER)
+CODE_KEYWORD, CODE_SYMBOL, CODE_INTEGER, CODE_STRING, CODE_IDENTIFIER = \
+    range(len(TOKEN_TYPES))
+GROUP_2_CODE = {GROUP_SYMBOL: CODE_SYMBOL,
+                GROUP_INTEGER: CODE_INTEGER,
+                GROUP_STRING: CODE_STRING}
+ARRAY_TYPE_CODE = 'B'
+ARRAY_OFFSET = 'L'
+
+
+class TokenTable:
+    """
+    A compact table of tokens. Every token is a row in parallel columns:
+    array-backed type code, source offset and length, plus the interned
+    lexeme and its value, decoded once when the token is added.
+    """
+    def __init__(self):
+        """
+        Creates a new empty token table.
+        """
+        self.types = array(ARRAY_TYPE_CODE)
+        self.offsets = array(ARRAY_OFFSET)
+        self.lengths = array(ARRAY_OFFSET)
+        self.lexemes = []
+        self.values = []
+
+    def __len__(self):
+        return len(self.lexemes)
+
+    def columns(self):
+        """
+        Returns the columns of the table in a serializable form.
+        :return: (types, offsets, lengths, lexemes, values)
+        """
+        return (self.types.tobytes(), self.offsets.tobytes(),
+                self.lengths.tobytes(), self.lexemes, self.values)
+
+    @staticmethod
+    def fromColumns(columns):
+        """
+        Creates a token table from serialized columns.
+        :param columns: (types, offsets, lengths, lexemes, values) as returned
+        by columns()
+        """
+        table = TokenTable()
+        types, offsets, lengths, table.lexemes, table.values = columns
+        table.types.frombytes(types)
+        table.offsets.frombytes(offsets)
+        table.lengths.frombytes(lengths)
+        return table
+
+    def append(self, type_code, offset, lexeme):
+        """
+        Adds a token to the table.
+        :param type_code: CODE_KEYWORD, CODE_SYMBOL, CODE_INTEGER, CODE_STRING
+        or CODE_IDENTIFIER
+        :param offset: offset of the token in the source
+        :param lexeme: the token as it appears in the source
+        """
+        self.types.append(type_code)
+        self.offsets.append(offset)
+        self.lengths.append(len(lexeme))
+        if type_code == CODE_STRING:
+            self.lexemes.append(lexeme)
+            self.values.append(decodeString(lexeme))
+            return
+        lexeme = intern(lexeme)
+        self.lexemes.append(lexeme)
+        if type_code == CODE_SYMBOL:
+            self.values.append(RE_SYMBOLS_SPECIAL_TRANSLATE.get(lexeme,
+                                                                lexeme))
+        else:
+            self.values.append(lexeme)
+
+
+def decodeString(lexeme):
+    """
+    Returns the value of a string constant token: the string without the
+    double quotes, with XML special characters translated.
+    :param lexeme: the string constant as it appears in the source
+    """
+    string = lexeme
+    # Replace special characters
+    for special in RE_SYMBOLS_SPECIAL_TRANSLATE:
+        string = string.replace(special, RE_SYMBOLS_SPECIAL_TRANSLATE[
+            special])
+    # Remove the opening and closing " characters.
+    return string[1:-1]
+
 
 class JackTokenizer:
-    def __init__(self, in_file):
+    def __init__(self, in_file, chunk_size=DEFAULT_CHUNK_SIZE, cache=None):
         """
      Reads the (already open) input file/stream and gets ready to tokenize it.
+     The input is read in chunks, so only a window of the code around the
+     current position is held in memory. Each window is tokenized at once
+     into a TokenTable.
+     With a token cache, the whole input is read at once and its token table
+     is loaded from the cache when the same source was tokenized before.
      :param in_file: The input jack file descriptor.
+     :param chunk_size: characters to read at a time (WHOLE_FILE for all).
+     :param cache: TokenCache to load and store token tables (or None).
      """
         self.__in_file = in_file
+        self.__chunk_size = chunk_size
         self.__code = EMPTY_STRING  # Default value
+        self.__pos = 0
+        self.__base = 0  # Offset of the code window in the source
+        self.__eof = False
+        self.__done = False
+        self.__table = TokenTable()
+        self.__index = 0  # Row of the token following the next token
+        self.__next_token_code = None
         self.__next_token_type = TOKEN_TYPE_NONE
         self.__next_token = TOKEN_NONE
+        self.__next_value = TOKEN_NONE
+        self.__next_offset = 0
+        self.__current_token_code = None
         self.__current_token_type = TOKEN_TYPE_NONE
         self.__current_token = TOKEN_NONE
-        self.__readFileToString()
+        self.__current_value = TOKEN_NONE
+        self.__current_offset = 0
+        if cache is not None:
+            self.__loadCached(cache)
         self.advance()
 
     ###################
     # PRIVATE METHODS #
     ###################
 
-    def __readFileToString(self):
+    def __readChunk(self):
         """
-        Reads the source file text into a string.
+        Reads the next chunk of the source file into the code window,
+        dropping the part of the window that was already tokenized.
         """
-        for line in self.__in_file:
-            self.__code += line
-        # Shtik for compensating the fact we don't handle the last token
-        # in the file when iterating while hasMoreTokens().
-        # Purposely planting a garbage last token which will not be read:
-        self.__code += TOKEN_NONE
+        chunk = self.__in_file.read(self.__chunk_size)
+        self.__code = self.__code[self.__pos:] + chunk
+        self.__base += self.__pos
+        self.__pos = 0
+        if chunk == EMPTY_STRING or self.__chunk_size == WHOLE_FILE:
+            self.__eof = True
+            # Shtik for compensating the fact we don't handle the last token
+            # in the file when iterating while hasMoreTokens().
+            # Purposely planting a garbage last token which will not be read:
+            self.__code += TOKEN_NONE
 
-    ##################
-    # PUBLIC METHODS #
-    ##################
+    def __isWordChar(self, pos):
+        """
+        Is the character at the given position a word character (\\w)?
+        :param pos: position in the code
+        :return: True if there is a word character at pos.
+        """
+        char = self.__code[pos:pos + 1]
+        return char.isalnum() or char == '_'
 
-    def hasMoreTokens(self):
+    def __scanWord(self, match):
         """
-        Do we have more tokens in the input?
-        :return: True if there are more tokens.
+        Classifies a scanned word as a keyword or an identifier.
+        :param match: RE_TOKEN match of the word group
+        :return: (type code, lexeme) of the token
+        """
+        word = match.group(GROUP_WORD)
+        head = word.partition(WORD_TERMINATOR)[0]
+        if head in KEYWORD_WORDS:
+            after = match.start() + len(head)
+            if head == RE_RETURN_SOMETHING and \
+                    self.__code[after:after + 1] == RE_SEMICOLON and \
+                    not self.__isWordChar(after + 1):
+                return CODE_KEYWORD, RE_RETURN_NOTHING
+            if not self.__isWordChar(after):
+                return CODE_KEYWORD, head
+        return CODE_IDENTIFIER, word
+
+    def __tokenizeWindow(self, table):
+        """
+        Tokenizes the code window into the given table, up to the first
+        token that could still change by reading more of the source.
+        :param table: TokenTable to add the tokens to
         """
-        self.__skipCommentsAndSpaces()
-        return self.__code != EMPTY_STRING
+        code = self.__code
+        pos = self.__pos
+        skip = compiledRegex(RE_SKIP).match
+        scan = compiledRegex(RE_TOKEN).match
+        while True:
+            pos = skip(code, pos).end()
+            match = scan(code, pos)
+            if not self.__eof:
+                # A token must be followed by two more characters to be sure
+                # it is complete ('return' + ';' + non word character)
+                if not match or match.end() + 1 >= len(code) or \
+                        code.startswith(COMMENT_PREFIXES, pos):
+                    break
+            elif not match:
+                self.__done = True
+                break
+            group = match.lastgroup
+            if group == GROUP_WORD:
+                type_code, lexeme = self.__scanWord(match)
+            else:
+                type_code, lexeme = GROUP_2_CODE[group], match.group()
+            table.append(type_code, self.__base + pos, lexeme)
+            pos += len(lexeme)
+        self.__pos = pos
 
-    def __tokenize_match(self, match):
+    def __fetchTokens(self):
         """
-        Set the given match as the current token and strip it off from the
-        jack code.
-        :param match: result of re.match() on some lexical element
+        Replaces the token table with the tokens of the next code window.
+        :return: True if any more tokens were found.
         """
-        # Extract matched token
-        self.__next_token = self.__code[:match.end()]
-        # Peal it from the file
-        self.__pealMatch(match)
+        table = TokenTable()
+        while not len(table) and not self.__done:
+            self.__readChunk()
+            self.__tokenizeWindow(table)
+        if not len(table):
+            return False
+        self.__table = table
+        self.__index = 0
+        return True
 
+    def __loadCached(self, cache):
+        """
+        Takes the token table of the whole input from the given cache, or
+        tokenizes the whole input and stores its table in the cache.
+        :param cache: TokenCache
+        """
+        source = self.__in_file.read()
+        key = cache.key(source, TOKENIZER_VERSION)
+        columns = cache.get(key)
+        if columns is not None:
+            self.__table = TokenTable.fromColumns(columns)
+        else:
+            self.__code = source + TOKEN_NONE
+            self.__eof = True
+            self.__tokenizeWindow(self.__table)
+            self.__code = EMPTY_STRING
+            cache.put(key, self.__table.columns())
+        self.__done = True
 
-    def __pealMatch(self, match):
+    def __invalidToken(self, kind):
         """
-        Peal the given match from the beginning of self.__code to the end of
-        the match.
-        ASSUMES MATCH IS AN ACTUAL MATCH!
-        :param match: an re match
+        Raises an error for an access to the current token as the wrong kind
+        of token.
+        :param kind: name of the expected kind of token
         """
-        self.__code = self.__code[match.end():]
-        self.__next_token = re.sub(RE_BULLSHIT, '', self.__next_token)
+        raise ValueError("Current token '{}' is not {}".format(
+            self.__current_token, kind))
+
+    ##################
+    # PUBLIC METHODS #
+    ##################
 
-    def __skipCommentsAndSpaces(self):
+    def hasMoreTokens(self):
         """
-        Skips all the comments and spaces at the beginning of the code.
+        Do we have more tokens in the input?
+        :return: True if there are more tokens.
         """
-        # Remove Comments and Spaces
-        do = True
-        while (do):
-            do = False
-            whitespace = RE_WHITESPACE_COMPILED.match(self.__code)
-            comment_inline = RE_COMMENT_INLINE_COMPILED.match(self.__code)
-            comment_endline = RE_COMMENT_END_OF_LINE_COMPILED.match(
-                self.__code)
-            if whitespace:
-                self.__pealMatch(whitespace)
-                do = True
-            elif comment_inline:
-                self.__pealMatch(comment_inline)
-                do = True
-            elif comment_endline:
-                self.__pealMatch(comment_endline)
-                do = True
+        return self.__index < len(self.__table) or self.__fetchTokens()
 
     def advance(self):
         """
@@ -112,41 +289,22 @@ class JackTokenizer:
         This method should only be called if hasMoreTokens() is true.
         Initially there is no current token.
         """
-        self.__skipCommentsAndSpaces()
-
         # Advance current to next token
-        self.__current_token = self.__next_token
+        self.__current_token_code = self.__next_token_code
         self.__current_token_type = self.__next_token_type
-        # Match next token
-        keyword = RE_KEYWORDS_COMPILED.match(self.__code)
-        if keyword:
-            self.__next_token_type = TOKEN_TYPE_KEYWORD
-            self.__tokenize_match(keyword)
-            return
-
-        symbol = RE_SYMBOLS_COMPILED.match(self.__code)
-        if symbol:
-            self.__next_token_type = TOKEN_TYPE_SYMBOL
-            self.__tokenize_match(symbol)
-            return
-
-        integer = RE_INTEGER_COMPILED.match(self.__code)
-        if integer:
-            self.__next_token_type = TOKEN_TYPE_INTEGER
-            self.__tokenize_match(integer)
-            return
-
-        string = RE_STRING_COMPILED.match(self.__code)
-        if string:
-            self.__next_token_type = TOKEN_TYPE_STRING
-            self.__tokenize_match(string)
-            return
-
-        identifier = RE_IDENTIDIER_COMPILED.match(self.__code)
-        if identifier:
-            self.__next_token_type = TOKEN_TYPE_IDENTIFIER
-            self.__tokenize_match(identifier)
+        self.__current_token = self.__next_token
+        self.__current_value = self.__next_value
+        self.__current_offset = self.__next_offset
+        # Read next token
+        if not self.hasMoreTokens():
             return
+        table, index = self.__table, self.__index
+        self.__next_token_code = table.types[index]
+        self.__next_token_type = TOKEN_TYPES[self.__next_token_code]
+        self.__next_token = table.lexemes[index]
+        self.__next_value = table.values[index]
+        self.__next_offset = table.offsets[index]
+        self.__index = index + 1
 
     def tokenType(self):
         """
@@ -163,58 +321,58 @@ class JackTokenizer:
         VOID, VAR, STATIC, FIELD, LET, DO, IF, ELSE, WHILE, RETURN, TRUE,
         FALSE, NULL, THIS.
         """
-        if self.__current_token not in KEYWORDS:
-            raise ValueError("Current token '{}' is not a keyword".format(
-                self.__current_token))
-        return self.__current_token
+        if self.__current_token_code != CODE_KEYWORD:
+            self.__invalidToken("a keyword")
+        return self.__current_value
 
     def symbol(self):
         """
         Returns the character which is the current token. Should be called only
         when tokenType() is SYMBOL.
         """
-        if self.__current_token not in SYMBOLS:
-            raise ValueError("Current token '{}' is not a symbol".format(
-                self.__current_token))
-        if self.__current_token in RE_SYMBOLS_SPECIAL_TRANSLATE:
-            return RE_SYMBOLS_SPECIAL_TRANSLATE[self.__current_token]
-        return self.__current_token
+        if self.__current_token_code != CODE_SYMBOL:
+            self.__invalidToken("a symbol")
+        return self.__current_value
 
     def identifier(self):
         """
         Returns the identifier which is the current token. Should be called
         only when tokenType() is IDENTIFIER.
         """
-        if not RE_IDENTIDIER_COMPILED.match(self.__current_token):
-            raise ValueError("Current token '{}' is not an identifier".format(
-                self.__current_token))
-        return self.__current_token
+        if self.__current_token_code not in {CODE_IDENTIFIER, CODE_KEYWORD}:
+            self.__invalidToken("an identifier")
+        return self.__current_value
 
     def intVal(self):
         """
         Returns the integer value of the current token. Should be called only
         when tokenType() is INT_CONST.
         """
-        if not RE_INTEGER_COMPILED.match(self.__current_token):
-            raise ValueError("Current token '{}' is not an integer".format(
-                self.__current_token))
-        return self.__current_token
+        if self.__current_token_code != CODE_INTEGER:
+            self.__invalidToken("an integer")
+        return self.__current_value
 
     def stringVal(self):
         """
         Returns the string value of the current token, without the double
         quotes. Should be called only when tokenType() is STRING_CONST.
         """
-        if not RE_STRING_COMPILED.match(self.__current_token):
-            raise ValueError("Current token '{}' is not a string".format(
-                self.__current_token))
-        # Replace special characters
-        string = self.__current_token
-        for special in RE_SYMBOLS_SPECIAL_TRANSLATE:
-            string = string.replace(special, RE_SYMBOLS_SPECIAL_TRANSLATE[
-                special])
-        # Remove the opening and closing " characters.
-        return string[1:-1]
+        if self.__current_token_code != CODE_STRING:
+            self.__invalidToken("a string")
+        return self.__current_value
+
+    def offset(self):
+        """
+        Returns the offset of the current token in the source.
+        """
+        return self.__current_offset
+
+    def tokenTable(self):
+        """
+        Returns the token table of the current code window. When the whole
+        input is read at once, this is the table of the entire source.
+        """
+        return self.__table
 
     def peek(self):
         """
@@ -0,0 +1,100 @@
+###############################################################################
+# Watches the .jack sources of a path for changes, by polling their sizes and
+# modification times. A burst of saves (such as an editor writing several
+# files, or a file in several writes) is debounced: the changes are only
+# reported once the sources stopped changing for a short delay.
+###############################################################################
+import os
+import time
+from CompilerDefaults import *
+
+#############
+# CONSTANTS #
+#############
+SOURCE_EXTENSION = ".jack"
+DEFAULT_INTERVAL = 0.1      # Seconds between polls
+
+
+class SourceWatcher:
+    """
+    Polls the sources of a path for changes.
+    """
+
+    ###############
+    # CONSTRUCTOR #
+    ###############
+
+    def __init__(self, path, debounce=DEFAULT_DEBOUNCE,
+                 interval=DEFAULT_INTERVAL):
+        """
+        Starts watching the sources of a path.
+        :param path: a .jack file or a directory of .jack files.
+        :param debounce: seconds the sources must stay unchanged before their
+        changes are reported.
+        :param interval: seconds between polls.
+        """
+        self.__path = path
+        self.debounce = debounce
+        self.interval = interval
+        self.__stamps = self.__snapshot()
+
+    ###################
+    # PRIVATE METHODS #
+    ###################
+
+    def __snapshot(self):
+        """
+        Returns the (size, modification time) of every source, by name.
+        """
+        if os.path.isdir(self.__path):
+            names = [os.path.join(self.__path, name)
+                     for name in os.listdir(self.__path)
+                     if name.endswith(SOURCE_EXTENSION)]
+        else:
+            names = [self.__path]
+        stamps = dict()
+        for name in names:
+            try:
+                status = os.stat(name)
+            except OSError:
+                # Removed while listing
+                continue
+            stamps[name] = (status.st_size, status.st_mtime_ns)
+        return stamps
+
+    ##################
+    # PUBLIC METHODS #
+    ##################
+
+    def sources(self):
+        """
+        Returns the names of the sources, as of the last poll.
+        """
+        return sorted(self.__stamps)
+
+    def lastChange(self, sources):
+        """
+        Returns the time of the last modification of the given sources.
+        """
+        return max([self.__stamps[name][1] for name in sources
+                    if name in self.__stamps] or [0]) / 1e9
+
+    def wait(self):
+        """
+        Blocks until sources are added or modified, and then stay unchanged
+        for the debounce delay.
+        :return: sorted names of the new and modified sources.
+        """
+        changed = set()
+        last = None
+        while True:
+            time.sleep(self.interval)
+            stamps = self.__snapshot()
+            modified = {name for name, stamp in stamps.items()
+                        if self.__stamps.get(name) != stamp}
+            self.__stamps = stamps
+            if modified:
+                changed |= modified
+                last = time.monotonic()
+            elif changed and time.monotonic() - last >= self.debounce:
+                return sorted(changed & set(stamps))
@@ -0,0 +1,161 @@
+##############################################################################
+# This is the Token Cache, it keeps the token tables of Jack sources on disk,
+# keyed by a hash of the source text and the tokenizer version, so sources
+# which did not change since the last run are not tokenized again.
+# The cache has a size cap; the least recently used entries are evicted
+# first.
+##############################################################################
+import marshal
+import os
+from CompilerDefaults import *
+
+#############
+# CONSTANTS #
+#############
+CACHE_EXTENSION = ".tok"
+SOURCE_ENCODING = "utf-8"
+KEY_DELIMITER = b"\0"
+STATS_FORMAT = "Token cache: {} hits, {} misses, {} tokens loaded, " \
+               "{} evictions"
+
+
+class TokenCache:
+    """
+    Persistent cache of serialized token tables.
+    """
+
+    ################
+    # CONSTRUCTORS #
+    ################
+
+    def __init__(self, directory, max_size=DEFAULT_CACHE_SIZE):
+        """
+        Opens (or creates) a token cache in the given directory.
+        :param directory: directory holding the cache entries.
+        :param max_size: maximal total size of the entries, in bytes.
+        """
+        self.__directory = directory
+        self.__max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.tokens_loaded = 0
+        os.makedirs(directory, exist_ok=True)
+        self.__size = sum(entry.stat().st_size for entry in
+                          self.__entries())
+
+    ###################
+    # PRIVATE METHODS #
+    ###################
+
+    def __entries(self):
+        """
+        Returns the directory entries of all cached token tables.
+        """
+        return [entry for entry in os.scandir(self.__directory)
+                if entry.name.endswith(CACHE_EXTENSION)]
+
+    def __path(self, key):
+        """
+        Returns the path of the cache entry of the given key.
+        """
+        return os.path.join(self.__directory, key + CACHE_EXTENSION)
+
+    def __evict(self):
+        """
+        Removes the least recently used entries until the cache is within
+        its size cap.
+        """
+        entries = sorted(self.__entries(),
+                         key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self.__size <= self.__max_size:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self.__size -= size
+            self.evictions += 1
+
+    ##################
+    # PUBLIC METHODS #
+    ##################
+
+    def key(self, source, version):
+        """
+        Returns the cache key of the given source text.
+        :param source: (String) the source text.
+        :param version: (String) version of the tokenizer.
+        """
+        import hashlib
+        digest = hashlib.sha256(version.encode(SOURCE_ENCODING))
+        digest.update(KEY_DELIMITER)
+        digest.update(source.encode(SOURCE_ENCODING))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Returns the serialized columns cached under the given key, or None if
+        the key is not cached. A hit marks the entry as recently used.
+        :param key: cache key of the source.
+        :return: (types, offsets, lengths, lexemes, values) or None.
+        """
+        path = self.__path(key)
+        try:
+            with open(path, 'rb') as entry:
+                columns = marshal.load(entry)
+            os.utime(path)
+        except (OSError, EOFError, ValueError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.tokens_loaded += len(columns[3])
+        return columns
+
+    def put(self, key, columns):
+        """
+        Stores serialized columns under the given key, evicting old entries
+        if the cache grows beyond its size cap.
+        :param key: cache key of the source.
+        :param columns: (types, offsets, lengths, lexemes, values).
+        """
+        data = marshal.dumps(columns)
+        path = self.__path(key)
+        import tempfile
+        descriptor, temp = tempfile.mkstemp(dir=self.__directory)
+        with os.fdopen(descriptor, 'wb') as entry:
+            entry.write(data)
+        if os.path.exists(path):
+            self.__size -= os.path.getsize(path)
+        os.replace(temp, path)
+        self.__size += len(data)
+        if self.__size > self.__max_size:
+            self.__evict()
+
+    def counters(self):
+        """
+        Returns the (hits, misses, tokens loaded, evictions) counted so far.
+        """
+        return self.hits, self.misses, self.tokens_loaded, self.evictions
+
+    def merge(self, counters):
+        """
+        Adds the counters counted by another instance of the cache (such as
+        a copy used by a worker process).
+        :param counters: (hits, misses, tokens loaded, evictions) to add,
+        see counters().
+        """
+        hits, misses, tokens_loaded, evictions = counters
+        self.hits += hits
+        self.misses += misses
+        self.tokens_loaded += tokens_loaded
+        self.evictions += evictions
+
+    def stats(self):
+        """
+        Returns a one line summary of the cache hits and misses.
+        """
+        return STATS_FORMAT.format(self.hits, self.misses, self.tokens_loaded,
+                                   self.evictions)
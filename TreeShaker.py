@@ -0,0 +1,89 @@
+##############################################################################
+# Whole-program tree shaking. Builds the call graph of all the classes of a
+# program, whose nodes are the VM functions of the subroutines and whose edges
+# are the subroutine calls in their code, and finds the subroutines reachable
+# from Main.main. Jack calls are resolved at compile time (a method is called
+# through the declared type of its object), so the other subroutines can
+# never run and need not be emitted. A program shipping its own OS classes
+# is also entered through Sys.init, and calls the OS functions the compiler
+# emits itself (for allocation, string literals, * and /), so these are
+# roots too.
+##############################################################################
+from CompilerDefaults import *
+from JackParser import *
+from VMGrammar import OS_MATH_DIVIDE, OS_MATH_MULTIPLY, OS_MEMORY_ALLOC, \
+    OS_STRING_APPEND_CHAR, OS_STRING_NEW, OS_SYS_INIT
+from VMWriter import FUNC_NAME_DELIMITER
+
+ROOTS = (ROOT, OS_SYS_INIT, OS_MEMORY_ALLOC, OS_STRING_NEW,
+         OS_STRING_APPEND_CHAR, OS_MATH_MULTIPLY, OS_MATH_DIVIDE)
+
+
+def callTargets(node):
+    """
+    Returns the VM functions called within a syntax tree.
+    :param node: syntax tree node (or list of nodes).
+    :return: set of the called VM function names.
+    """
+    targets = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if type(node) is list:
+            stack.extend(node)
+        elif isinstance(node, Node):
+            if type(node) is SubroutineCall:
+                targets.add(node.class_name + FUNC_NAME_DELIMITER +
+                            node.name)
+            stack.extend([getattr(node, slot) for slot in node.__slots__])
+    return targets
+
+
+class CallGraph:
+    """
+    The call graph of the subroutines of a program.
+    """
+
+    def __init__(self):
+        # VM function name --> set of VM functions it calls
+        self.__calls = dict()
+
+    def addClass(self, in_file, token_cache=None):
+        """
+        Adds the subroutines of a class to the graph.
+        :param in_file: Open source Jack file.
+        :param token_cache: TokenCache for the tokenizer (or None).
+        """
+        parser = JackParser(JackTokenizer(in_file, cache=token_cache))
+        node = parser.parseClassDeclarations()
+        while parser.hasSubroutine():
+            subroutine = parser.parseSubroutine()
+            name = node.name + FUNC_NAME_DELIMITER + subroutine.name
+            self.__calls[name] = callTargets(subroutine.statements)
+        parser.parseClassEnd()
+
+    def functions(self):
+        """
+        Returns the names of all the VM functions of the program.
+        """
+        return set(self.__calls)
+
+    def reachable(self, roots=ROOTS):
+        """
+        Returns the VM functions of the program reachable from the given
+        roots (functions outside of the program, such as the OS, are not
+        included), or None if the program has no entry point (ROOT), such as
+        a library of classes, whose functions are all kept.
+        """
+        if ROOT not in self.__calls:
+            return None
+        reached = set()
+        stack = [root for root in roots if root in self.__calls]
+        while stack:
+            name = stack.pop()
+            if name in reached:
+                continue
+            reached.add(name)
+            stack.extend([callee for callee in self.__calls[name]
+                          if callee in self.__calls])
+        return reached
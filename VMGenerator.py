@@ -0,0 +1,594 @@
+############################################################################
+# Generates executable VM code from the syntax tree of Jack code (see
+# JackAST). Every subroutine is compiled into a VM function; identifiers were
+# resolved by the parser, so every variable node already carries its kind
+# and running index.
+##############################################################################
+from JackAST import *
+from SymbolTable import *
+from VMWriter import *
+
+UNIQUE_DELIMITER = ""
+WHILE_EXP = "WHILE_EXP"
+WHILE_BODY = "WHILE_BODY"
+WHILE_END = "WHILE_END"
+IF_TRUE = "IF_TRUE"
+IF_FALSE = "IF_FALSE"
+IF_END = "IF_END"
+STR_READY = "STR_READY"
+
+# String pooling
+MAX_POOLED_STRINGS = 32     # Static slots taken per class (of 240 in all)
+APPEND_CHARS = "$appendChars"
+APPEND_CHARS_COUNT = 8      # Characters appended per helper call
+
+# Array lowering
+MAX_THAT_OFFSET = 32767     # Largest constant subscript addressed by 'that'
+# Segments of the array bases whose pointer may be reused: only the code of
+# the function itself changes them (calls are assumed to change the others)
+THAT_BASE_SEGMENTS = {VM_SEGMENT_VAR, VM_SEGMENT_ARGUMENT, VM_SEGMENT_STATIC}
+# Segments the code of a call cannot change
+FRAME_SEGMENTS = {VM_SEGMENT_VAR, VM_SEGMENT_ARGUMENT}
+
+# Branch lowering: operators and constants resulting in true (-1) or false (0)
+COMPARISON_OPS = {XML_LT, XML_GT, RE_LT, RE_GT, RE_EQ}
+LOGICAL_OPS = {XML_AMPERSAND, RE_AMPERSAND, RE_VBAR}
+BOOLEAN_KEYWORDS = {RE_TRUE, RE_FALSE, RE_NULL}
+
+
+class VMGenerator:
+    ###############
+    # CONSTRUCTOR #
+    ###############
+
+    def __init__(self, vm_writer, folder=None, pool_strings=False,
+                 keep=None, lower_arrays=False, lower_branches=False):
+        """
+        Creates a new VM generator writing into the given VMWriter.
+        The generator is fed a class by beginClass(), generateSubroutine()
+        for each of its subroutines, and endClass().
+        :param folder: ConstantFolder to pass every subroutine through (or
+        None).
+        :param pool_strings: build every string literal of a class once,
+        into a static variable, and reuse it when evaluated again. Long
+        literals are appended by a helper function of the class. Pooled
+        strings are shared, so the program must not modify them.
+        :param keep: names of the VM functions to generate (or None for all
+        of them), see TreeShaker.
+        :param lower_arrays: generate specialized code for array elements:
+        constant subscripts are addressed by 'that' directly, stores of simple
+        values skip the temp 0 round trip, and the 'that' pointer is reused
+        while it still holds the array base.
+        :param lower_branches: generate if statements with a single jump per
+        branch taken, and while loops with boolean conditions with their test
+        at the bottom.
+        """
+        self.__vmWriter = vm_writer
+        self.__folder = folder
+        self.__poolStrings = pool_strings
+        self.__keep = keep
+        self.__lowerArrays = lower_arrays
+        self.__lowerBranches = lower_branches
+        # (segment, index) of the variable 'that' points at (or None)
+        self.__thatBase = None
+        self.__className = None
+        self.__nFields = 0
+        self.__nStatics = 0
+        self.__pool = dict()
+        self.__appendsChars = False
+        self.__statements = {LetStatement:      self.__generateLet,
+                             IfStatement:       self.__generateIf,
+                             WhileStatement:    self.__generateWhile,
+                             DoStatement:       self.__generateDo,
+                             ReturnStatement:   self.__generateReturn}
+        self.__terms = {IntegerConstant:    self.__generateIntVal,
+                        StringConstant:     self.__generateStringVal,
+                        KeywordConstant:    self.__generateKeywordConstant,
+                        VarTerm:            self.__generateVarTerm,
+                        ArrayTerm:          self.__generateArrayTerm,
+                        SubroutineCall:     self.__generateSubroutineCall,
+                        ParenTerm:          self.__generateParenTerm,
+                        UnaryTerm:          self.__generateUnaryTerm,
+                        EmptyTerm:          self.__generateEmptyTerm}
+        self.__resetUniqueLabels()
+
+    ###################
+    # PRIVATE METHODS #
+    ###################
+
+    def __resetUniqueLabels(self):
+        self.__unique_id_if = 0
+        self.__unique_id_while = 0
+        self.__unique_id_string = 0
+
+    def __uniqueWhileLabels(self):
+        """
+        Return (WHILE_EXP, WHILE_BODY, WHILE_END) labels carrying a unique id
+        to prevent collisions with other labels carrying the same name.
+        Example:
+            while_exp, while_body, while_end = __uniqueWhileLabels()
+            -->
+            while_exp = "WHILE_EXP123"
+            while_body = "WHILE_BODY123"
+            while_end = "WHILE_END123"
+        """
+        unique_labels = []
+        for label in [WHILE_EXP, WHILE_BODY, WHILE_END]:
+            unique_labels.append("{}{}{}".format(label,
+                                                 UNIQUE_DELIMITER,
+                                                 self.__unique_id_while))
+        self.__unique_id_while += 1
+        return unique_labels
+
+    def __uniqueIfLabels(self):
+        """
+        Return (IF_TRUE, IF_FALSE, IF_END) labels carrying a unique id to
+        prevent collisions with other labels carrying the same name.
+        Example:
+            if_true, if_false, if_end = __uniqueIfLabels()
+            -->
+            if_true = "IF_TRUE123"
+            if_false = "IF_FALSE123"
+            if_end = "IF_END123"
+        """
+        unique_labels = []
+        for label in [IF_TRUE, IF_FALSE, IF_END]:
+            unique_labels.append("{}{}{}".format(label,
+                                                 UNIQUE_DELIMITER,
+                                                 self.__unique_id_if))
+        self.__unique_id_if += 1
+        return unique_labels
+
+    def __uniqueStringLabel(self):
+        """
+        Return a STR_READY label carrying a unique id.
+        """
+        label = "{}{}{}".format(STR_READY, UNIQUE_DELIMITER,
+                                self.__unique_id_string)
+        self.__unique_id_string += 1
+        return label
+
+    def __correctString(self, string):
+        """
+        Convert escape characters in a string to valid chars
+        :param string: string to correct
+        :return: corrected strings with escaped characters corrected
+        """
+        correct = string.replace('\t', '\\t')
+        correct = correct.replace('\n', '\\n')
+        correct = correct.replace('\r', '\\r')
+        return correct
+
+    @staticmethod
+    def __constantSubscript(node):
+        """
+        Returns the value of a constant subscript expression, or None.
+        """
+        if len(node.terms) == 1 and type(node.terms[0]) is IntegerConstant:
+            value = int(node.terms[0].value)
+            if value <= MAX_THAT_OFFSET:
+                return value
+        return None
+
+    @staticmethod
+    def __isSimple(node):
+        """
+        Does evaluating the node leave the 'that' pointer alone (no array
+        elements and no subroutine calls, including multiplication, division
+        and strings)?
+        """
+        kind = type(node)
+        if kind is Expression:
+            return RE_ASTERISK not in node.ops and RE_SLASH not in node.ops \
+                and all([VMGenerator.__isSimple(term) for term in node.terms])
+        if kind is ParenTerm:
+            return VMGenerator.__isSimple(node.expression)
+        if kind is UnaryTerm:
+            return VMGenerator.__isSimple(node.term)
+        return kind in {IntegerConstant, KeywordConstant, VarTerm, EmptyTerm}
+
+    @staticmethod
+    def __isBoolean(node):
+        """
+        Is the value of the node always true (-1) or false (0)?
+        """
+        kind = type(node)
+        if kind is Expression:
+            if not node.ops:
+                return VMGenerator.__isBoolean(node.terms[0])
+            op = node.ops[-1]
+            if op in LOGICAL_OPS:
+                return VMGenerator.__isBoolean(node.terms[-1]) and \
+                    VMGenerator.__isBoolean(Expression(node.terms[:-1],
+                                                       node.ops[:-1]))
+            return op in COMPARISON_OPS
+        if kind is ParenTerm:
+            return VMGenerator.__isBoolean(node.expression)
+        if kind is UnaryTerm:
+            return node.op == RE_TILDA and VMGenerator.__isBoolean(node.term)
+        if kind is KeywordConstant:
+            return node.keyword in BOOLEAN_KEYWORDS
+        return False
+
+    @staticmethod
+    def __unwrapCondition(node, when):
+        """
+        Strips the parentheses and boolean negations around a condition.
+        :param when: the value of the condition to test for (True/False).
+        :return: (condition, value of it to test for).
+        """
+        while len(node.terms) == 1:
+            term = node.terms[0]
+            if type(term) is ParenTerm:
+                node = term.expression
+            elif type(term) is UnaryTerm and term.op == RE_TILDA and \
+                    VMGenerator.__isBoolean(term.term):
+                # ~b is false when b is true
+                node = Expression([term.term], [])
+                when = not when
+            else:
+                break
+        return node, when
+
+    def __generateJump(self, node, label, when):
+        """
+        Writes a condition and a jump to the label taken when the condition
+        is true (when=True), or false; the latter requires a boolean
+        condition.
+        """
+        self.__generateExpression(node)
+        if not when:
+            self.__vmWriter.writeArithmetic(RE_TILDA, False)
+        self.__vmWriter.writeIf(label)
+
+    def __pointThat(self, segment, index):
+        """
+        Points 'that' at the array held by the given variable, unless it
+        already does.
+        """
+        if self.__thatBase == (segment, index):
+            return
+        self.__vmWriter.writePush(segment, index)
+        self.__vmWriter.writePop(VM_SEGMENT_POINTER, 1)
+        self.__thatBase = None
+        if segment in THAT_BASE_SEGMENTS:
+            self.__thatBase = (segment, index)
+
+    def __generateStatements(self, statements):
+        for statement in statements:
+            self.__statements[type(statement)](statement)
+
+    def __generateDo(self, node):
+        self.__generateSubroutineCall(node.call)
+        self.__vmWriter.writePop(VM_SEGMENT_TEMP, 0)
+
+    def __generateLet(self, node):
+        segment = KIND_2_SEGMENT[node.kind]
+        if node.subscript is not None and self.__lowerArrays:
+            self.__generateArrayLet(node, segment)
+            return
+        if node.subscript is not None:
+            self.__generateExpression(node.subscript)
+            # Add the offset to the variable address
+            self.__vmWriter.writePush(segment, node.index)
+            self.__vmWriter.writeArithmetic(RE_PLUS, True)
+            # Address of array element is at stack top
+        self.__generateExpression(node.value)
+        if node.subscript is not None:
+            # Pop rh-expression to temp
+            self.__vmWriter.writePop(VM_SEGMENT_TEMP, 0)
+            # Get address of array element
+            self.__vmWriter.writePop(VM_SEGMENT_POINTER, 1)
+            # Push rh-expression to stack
+            self.__vmWriter.writePush(VM_SEGMENT_TEMP, 0)
+            # Pop rh-expression to address of element
+            self.__vmWriter.writePop(VM_SEGMENT_THAT, 0)
+        else:
+            self.__vmWriter.writePop(segment, node.index)
+            if self.__thatBase == (segment, node.index):
+                self.__thatBase = None
+
+    def __generateArrayLet(self, node, segment):
+        """
+        Generates the store into an array element, specialized by the kind
+        of its subscript and value.
+        """
+        offset = self.__constantSubscript(node.subscript)
+        simple = self.__isSimple(node.value)
+        if offset is None:
+            self.__generateExpression(node.subscript)
+            self.__vmWriter.writePush(segment, node.index)
+            self.__vmWriter.writeArithmetic(RE_PLUS, True)
+            if simple:
+                # The value cannot move 'that'
+                self.__vmWriter.writePop(VM_SEGMENT_POINTER, 1)
+                self.__generateExpression(node.value)
+            else:
+                self.__generateExpression(node.value)
+                self.__vmWriter.writePop(VM_SEGMENT_TEMP, 0)
+                self.__vmWriter.writePop(VM_SEGMENT_POINTER, 1)
+                self.__vmWriter.writePush(VM_SEGMENT_TEMP, 0)
+            self.__vmWriter.writePop(VM_SEGMENT_THAT, 0)
+            self.__thatBase = None
+        elif simple:
+            self.__pointThat(segment, node.index)
+            self.__generateExpression(node.value)
+            self.__vmWriter.writePop(VM_SEGMENT_THAT, offset)
+        elif segment in FRAME_SEGMENTS:
+            # The value cannot change the array base: read it afterwards
+            self.__generateExpression(node.value)
+            self.__pointThat(segment, node.index)
+            self.__vmWriter.writePop(VM_SEGMENT_THAT, offset)
+        else:
+            self.__vmWriter.writePush(segment, node.index)
+            self.__generateExpression(node.value)
+            self.__vmWriter.writePop(VM_SEGMENT_TEMP, 0)
+            self.__vmWriter.writePop(VM_SEGMENT_POINTER, 1)
+            self.__vmWriter.writePush(VM_SEGMENT_TEMP, 0)
+            self.__vmWriter.writePop(VM_SEGMENT_THAT, offset)
+            self.__thatBase = None
+
+    def __generateWhile(self, node):
+        LABEL_EXP, LABEL_BODY, LABEL_END = self.__uniqueWhileLabels()
+
+        if self.__lowerBranches and self.__isBoolean(node.condition):
+            # Test at the bottom: a single jump per iteration
+            self.__vmWriter.writeGoto(LABEL_EXP)    # goto WHILE_EXP
+            self.__vmWriter.writeLabel(LABEL_BODY)  # label WHILE_BODY
+            self.__thatBase = None
+            self.__generateStatements(node.statements)
+            self.__vmWriter.writeLabel(LABEL_EXP)   # label WHILE_EXP
+            self.__thatBase = None
+            condition, when = self.__unwrapCondition(node.condition, True)
+            self.__generateJump(condition, LABEL_BODY, when)
+            self.__thatBase = None
+            return
+
+        self.__thatBase = None
+        self.__vmWriter.writeLabel(LABEL_EXP)       # label WHILE_EXP
+        self.__generateExpression(node.condition)
+        # Negate the expression
+        # (jump out of while if *NOT* expression)
+        self.__vmWriter.writeArithmetic(RE_TILDA, False)
+        self.__vmWriter.writeIf(LABEL_END)          # if-goto WHILE_END
+        self.__generateStatements(node.statements)
+        self.__vmWriter.writeGoto(LABEL_EXP)        # goto WHILE_EXP
+        self.__vmWriter.writeLabel(LABEL_END)       # label WHILE_END
+        self.__thatBase = None
+
+    def __generateReturn(self, node):
+        if node.value is None:
+            self.__vmWriter.writeReturn(True)
+        else:
+            self.__generateExpression(node.value)
+            self.__vmWriter.writeReturn()
+
+    def __generateIf(self, node):
+        LABEL_TRUE, LABEL_FALSE, LABEL_END = self.__uniqueIfLabels()
+
+        condition, when = node.condition, True
+        if self.__lowerBranches:
+            condition, when = self.__unwrapCondition(condition, True)
+        if self.__lowerBranches and node.else_statements is not None:
+            # Jump to one branch, fall through to the other
+            label, jumped, fallen = LABEL_TRUE, node.statements, \
+                node.else_statements
+            if not when:
+                label, jumped, fallen = LABEL_FALSE, fallen, jumped
+            self.__generateJump(condition, label, True)
+            that_base = self.__thatBase
+            self.__generateStatements(fallen)
+            self.__vmWriter.writeGoto(LABEL_END)    # goto LABEL_END
+            self.__vmWriter.writeLabel(label)       # label TRUE/FALSE
+            self.__thatBase = that_base
+            self.__generateStatements(jumped)
+            self.__vmWriter.writeLabel(LABEL_END)   # label END
+            self.__thatBase = None
+            return
+        if not when:
+            # Jump over the statements if the negated condition is true
+            self.__generateJump(condition, LABEL_FALSE, True)
+            self.__generateStatements(node.statements)
+            self.__vmWriter.writeLabel(LABEL_FALSE) # label FALSE
+            self.__thatBase = None
+            return
+
+        self.__generateExpression(node.condition)
+        self.__vmWriter.writeIf(LABEL_TRUE)         # if-goto LABEL_TRUE
+        self.__vmWriter.writeGoto(LABEL_FALSE)      # goto LABEL_FALSE
+        self.__vmWriter.writeLabel(LABEL_TRUE)      # label LABEL_TRUE
+        that_base = self.__thatBase
+        self.__generateStatements(node.statements)
+        if node.else_statements is not None:
+            self.__vmWriter.writeGoto(LABEL_END)    # goto LABEL_END
+            self.__vmWriter.writeLabel(LABEL_FALSE) # label LABEL_FALSE
+            self.__thatBase = that_base
+            self.__generateStatements(node.else_statements)
+            self.__vmWriter.writeLabel(LABEL_END)   # label END
+        else:
+            self.__vmWriter.writeLabel(LABEL_FALSE) # label FALSE
+        self.__thatBase = None
+
+    def __generateExpression(self, node):
+        terms = node.terms
+        self.__generateTerm(terms[0])
+        for op, term in zip(node.ops, terms[1:]):
+            self.__generateTerm(term)
+            self.__vmWriter.writeSymbol(op)
+            if op in (RE_ASTERISK, RE_SLASH):
+                # Math.multiply and Math.divide calls
+                self.__thatBase = None
+
+    def __generateTerm(self, node):
+        self.__terms[type(node)](node)
+
+    def __generateIntVal(self, node):
+        self.__vmWriter.writePush(VM_SEGMENT_CONSTANT, node.value)
+
+    def __generateStringVal(self, node):
+        self.__thatBase = None
+        corrected = self.__correctString(node.value)
+        if not self.__poolStrings:
+            self.__buildString(corrected)
+            return
+        slot = self.__pool.get(corrected)
+        if slot is None and len(self.__pool) < MAX_POOLED_STRINGS:
+            slot = self.__nStatics + len(self.__pool)
+            self.__pool[corrected] = slot
+        if slot is None:
+            self.__buildString(corrected)
+            return
+        # Build the string on its first evaluation only
+        LABEL_READY = self.__uniqueStringLabel()
+        self.__vmWriter.writePush(VM_SEGMENT_STATIC, slot)
+        self.__vmWriter.writeIf(LABEL_READY)        # if-goto STR_READY
+        self.__buildString(corrected)
+        self.__vmWriter.writePop(VM_SEGMENT_STATIC, slot)
+        self.__vmWriter.writeLabel(LABEL_READY)     # label STR_READY
+        self.__vmWriter.writePush(VM_SEGMENT_STATIC, slot)
+
+    def __buildString(self, string):
+        """
+        Writes the VM code creating a new string of the given characters.
+        """
+        self.__vmWriter.writePush(VM_SEGMENT_CONSTANT, len(string))
+        self.__vmWriter.writeCall(OS_STRING_NEW, 1)
+        start = 0
+        if self.__poolStrings:
+            # Append whole chunks of characters by the helper function
+            while len(string) - start >= APPEND_CHARS_COUNT:
+                for char in string[start:start + APPEND_CHARS_COUNT]:
+                    self.__vmWriter.writePush(VM_SEGMENT_CONSTANT, ord(char))
+                self.__vmWriter.writeCall(self.__appendCharsName(),
+                                          APPEND_CHARS_COUNT + 1)
+                self.__appendsChars = True
+                start += APPEND_CHARS_COUNT
+        for char in string[start:]:
+            self.__vmWriter.writePush(VM_SEGMENT_CONSTANT, ord(char))
+            self.__vmWriter.writeCall(OS_STRING_APPEND_CHAR, 2)
+
+    def __appendCharsName(self):
+        return "{}{}{}{}".format(self.__className, FUNC_NAME_DELIMITER,
+                                 APPEND_CHARS, APPEND_CHARS_COUNT)
+
+    def __generateAppendChars(self):
+        """
+        Writes the helper function appending APPEND_CHARS_COUNT characters
+        (arguments 1, 2, ...) to a string (argument 0), and returning it.
+        """
+        self.__vmWriter.writeFunction(self.__appendCharsName(), 0)
+        self.__vmWriter.writePush(VM_SEGMENT_ARGUMENT, 0)
+        for argument in range(1, APPEND_CHARS_COUNT + 1):
+            self.__vmWriter.writePush(VM_SEGMENT_ARGUMENT, argument)
+            self.__vmWriter.writeCall(OS_STRING_APPEND_CHAR, 2)
+        self.__vmWriter.writeReturn()
+
+    def __generateKeywordConstant(self, node):
+        # true | false | null - pushed to stack as constants
+        keyword = node.keyword
+        if keyword in {RE_FALSE, RE_NULL, RE_TRUE}:
+            self.__vmWriter.writePush(VM_SEGMENT_CONSTANT, 0)
+            if keyword == RE_TRUE:
+                self.__vmWriter.writeArithmetic(RE_TILDA, False)
+        # this - pushes pointer
+        elif keyword == RE_THIS:
+            self.__vmWriter.writePush(VM_SEGMENT_POINTER, 0)
+
+    def __generateVarTerm(self, node):
+        self.__vmWriter.writePush(KIND_2_SEGMENT[node.kind], node.index)
+
+    def __generateArrayTerm(self, node):
+        offset = None
+        if self.__lowerArrays:
+            offset = self.__constantSubscript(node.subscript)
+        if offset is not None:
+            self.__pointThat(KIND_2_SEGMENT[node.kind], node.index)
+            self.__vmWriter.writePush(VM_SEGMENT_THAT, offset)
+            return
+        self.__generateExpression(node.subscript)
+        # Compile array indexing
+        self.__vmWriter.writePush(KIND_2_SEGMENT[node.kind], node.index)
+        self.__vmWriter.writeArithmetic(RE_PLUS, True)
+        self.__vmWriter.writePop(VM_SEGMENT_POINTER, 1)
+        self.__vmWriter.writePush(VM_SEGMENT_THAT, 0)
+        self.__thatBase = None
+
+    def __generateParenTerm(self, node):
+        self.__generateExpression(node.expression)
+
+    def __generateUnaryTerm(self, node):
+        self.__generateTerm(node.term)
+        self.__vmWriter.writeArithmetic(node.op, False)
+
+    def __generateEmptyTerm(self, node):
+        pass
+
+    def __generateSubroutineCall(self, node):
+        exp_count = len(node.arguments)
+        if node.target is None:
+            # Subroutine -> className.Subroutine
+            self.__vmWriter.writePush(VM_SEGMENT_POINTER, 0)
+            exp_count += 1
+        elif node.kind != KIND_NONE:
+            # Push variable (this) and call class method
+            self.__vmWriter.writePush(KIND_2_SEGMENT[node.kind], node.index)
+            # Include self as argument 0
+            exp_count += 1
+        for argument in node.arguments:
+            self.__generateExpression(argument)
+        self.__vmWriter.writeCall(
+            node.class_name + FUNC_NAME_DELIMITER + node.name, exp_count)
+        self.__thatBase = None
+
+    ##################
+    # PUBLIC METHODS #
+    ##################
+
+    def beginClass(self, node):
+        """
+        Starts generating the given class.
+        :param node: ClassNode of the class.
+        """
+        self.__className = node.name
+        self.__nFields = node.n_fields
+        self.__nStatics = node.n_statics
+        self.__pool = dict()
+        self.__appendsChars = False
+
+    def generateSubroutine(self, node):
+        """
+        Generates the VM function of a method, function, or constructor.
+        :param node: Subroutine node.
+        """
+        name = self.__className + FUNC_NAME_DELIMITER + node.name
+        if self.__keep is not None and name not in self.__keep:
+            return
+        if self.__folder is not None:
+            node = self.__folder.foldSubroutine(node)
+        self.__resetUniqueLabels()
+        self.__thatBase = None
+        self.__vmWriter.writeFunction(name, node.n_locals)
+        if node.kind == RE_METHOD:
+            # Hold self at pointer
+            self.__vmWriter.writePush(VM_SEGMENT_ARGUMENT, 0)
+            self.__vmWriter.writePop(VM_SEGMENT_POINTER, 0)
+        if node.kind == RE_CONSTRUCTOR:
+            # Allocate memory for all fields
+            self.__vmWriter.writePush(VM_SEGMENT_CONSTANT, self.__nFields)
+            self.__vmWriter.writeCall(OS_MEMORY_ALLOC, 1)
+            # Hold allocated memory at pointer
+            self.__vmWriter.writePop(VM_SEGMENT_POINTER, 0)
+        self.__generateStatements(node.statements)
+
+    def endClass(self):
+        """
+        Ends generating the current class.
+        """
+        if self.__appendsChars:
+            self.__generateAppendChars()
+
+    def flush(self):
+        """
+        Writes the VM code buffered by the VMWriter to the output.
+        """
+        self.__vmWriter.flush()
@@ -44,5 +44,8 @@ VM_SEGMENT_THAT = "that"
 OS_STRING_NEW = "String.new" # Takes 1 argument
 OS_STRING_APPEND_CHAR = "String.appendChar" # Takes 2 arguments
 OS_MEMORY_ALLOC = "Memory.alloc" # Takes 1 argument
+OS_MATH_MULTIPLY = "Math.multiply" # Takes 2 arguments
+OS_MATH_DIVIDE = "Math.divide" # Takes 2 arguments
+OS_SYS_INIT = "Sys.init" # Called by the bootstrap code of the VM
 
 VM_SELF = VM_SEGMENT_FIELD # this
\ No newline at end of file
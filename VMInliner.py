@@ -0,0 +1,230 @@
+##############################################################################
+# Inlining of small VM functions into their callers, across all the classes of
+# a program. A call of a small function (or method, or constructor) is
+# replaced by its code: the arguments are popped into extra local variables
+# of the caller, the arguments and local variables of the callee are remapped
+# into them, its labels are renamed, and its returns jump to the end of the
+# inlined code, leaving the return value on the stack like a call does. The
+# 'this' pointer of a caller using it is saved around a callee which sets it,
+# and the object of an inlined method is popped directly into 'this'.
+# Only the original code of the callees is inlined (one level deep), and
+# functions calling themselves are never inlined.
+##############################################################################
+from CompilerDefaults import *
+from VMGrammar import *
+from VMWriter import *
+
+INLINE_LABEL = "{}_INLINE{}"    # Renamed label of the callee, by call site
+INLINE_END = "INLINE_END{}"     # End of the inlined code, by call site
+
+# Prologue of methods, setting 'this' to the object (argument 0)
+METHOD_PROLOGUE = [[PUSH, VM_SEGMENT_ARGUMENT, "0"],
+                   [POP, VM_SEGMENT_POINTER, "0"]]
+
+
+def splitFunctions(commands):
+    """
+    Splits VM code into its functions.
+    :param commands: list of the VM commands of a class (without newlines).
+    :return: list of the functions, each a list of split VM commands starting
+    with its function command.
+    """
+    functions = []
+    for command in commands:
+        command = command.split(SPACE)
+        if command[0] == FUNCTION_DEC:
+            functions.append([])
+        functions[-1].append(command)
+    return functions
+
+
+def className(function):
+    """
+    Returns the class of a VM function name.
+    """
+    return function.split(FUNC_NAME_DELIMITER, 1)[0]
+
+
+class VMInliner:
+    """
+    Inlines the calls of the small functions of a program.
+    """
+
+    ###############
+    # CONSTRUCTOR #
+    ###############
+
+    def __init__(self, budget=DEFAULT_BUDGET, optimizer=None):
+        """
+        Creates a new inliner.
+        :param budget: size of the largest inlined function, in VM commands
+        (without its function command).
+        :param optimizer: VMOptimizer to pass the functions through after
+        inlining (or None).
+        """
+        self.budget = budget
+        self.__optimizer = optimizer
+        # VM function name --> (number of locals, commands), of the functions
+        # which may be inlined
+        self.__callees = dict()
+        self.inlined = 0
+
+    ###################
+    # PRIVATE METHODS #
+    ###################
+
+    def __isInlinable(self, name, body):
+        """
+        Can calls of the function be replaced by its body? It must be small,
+        end with a return and not call itself.
+        """
+        return len(body) <= self.budget and body[-1:] == [[RETURN]] and \
+            [CALL, name] not in [command[:2] for command in body]
+
+    def __canInline(self, caller, callee, n_args):
+        """
+        Can the callee be inlined into the caller, called with n_args?
+        """
+        if callee not in self.__callees:
+            return False
+        _, body = self.__callees[callee]
+        for command in body:
+            if len(command) != 3 or command[0] not in (PUSH, POP):
+                continue
+            # Static variables belong to the class of the code
+            if command[1] == VM_SEGMENT_STATIC and \
+                    className(caller) != className(callee):
+                return False
+            if command[1] == VM_SEGMENT_ARGUMENT and \
+                    int(command[2]) >= n_args:
+                return False
+        return True
+
+    @staticmethod
+    def __usesThis(function):
+        """
+        Does the code of a function use its 'this' pointer?
+        """
+        for command in function:
+            if command[0] in (PUSH, POP) and \
+                    (command[1] == VM_SEGMENT_FIELD or
+                     command[1:] == [VM_SEGMENT_POINTER, "0"]):
+                return True
+        return False
+
+    def __inlineCall(self, callee, n_args, base, site, uses_this):
+        """
+        Returns the code replacing a call.
+        :param callee: name of the called function.
+        :param n_args: number of arguments on the stack.
+        :param base: first local variable of the caller free for the callee.
+        :param site: number of the call site within the caller.
+        :param uses_this: does the caller use its 'this' pointer?
+        :return: (list of the commands, number of local variables used).
+        """
+        n_locals, body = self.__callees[callee]
+        first_local = base + n_args
+        save = first_local + n_locals
+        saves_this = uses_this and [POP, VM_SEGMENT_POINTER, "0"] in body
+        end = INLINE_END.format(site)
+
+        code = []
+        if saves_this:
+            code += [[PUSH, VM_SEGMENT_POINTER, "0"],
+                     [POP, VM_SEGMENT_VAR, str(save)]]
+        # Pop the arguments (the last one is on the top of the stack)
+        code += [[POP, VM_SEGMENT_VAR, str(base + i)]
+                 for i in reversed(range(n_args))]
+        if body[:2] == METHOD_PROLOGUE and \
+                METHOD_PROLOGUE[0] not in body[2:] and \
+                [POP, VM_SEGMENT_ARGUMENT, "0"] not in body[2:]:
+            # Pop the object directly into 'this'
+            code[-1] = METHOD_PROLOGUE[1]
+            body = body[2:]
+        # The VM clears the local variables of a function
+        for i in range(n_locals):
+            code += [[PUSH, VM_SEGMENT_CONSTANT, "0"],
+                     [POP, VM_SEGMENT_VAR, str(first_local + i)]]
+
+        jumps_to_end = False
+        for i, command in enumerate(body):
+            operation = command[0]
+            if operation in (PUSH, POP) and \
+                    command[1] == VM_SEGMENT_ARGUMENT:
+                command = [operation, VM_SEGMENT_VAR,
+                           str(base + int(command[2]))]
+            elif operation in (PUSH, POP) and command[1] == VM_SEGMENT_VAR:
+                command = [operation, VM_SEGMENT_VAR,
+                           str(first_local + int(command[2]))]
+            elif operation in (LABEL, GOTO, IF_GOTO):
+                command = [operation, INLINE_LABEL.format(command[1], site)]
+            elif operation == RETURN:
+                if i == len(body) - 1:
+                    continue
+                command = [GOTO, end]
+                jumps_to_end = True
+            code.append(command)
+        if jumps_to_end:
+            code.append([LABEL, end])
+        if saves_this:
+            code += [[PUSH, VM_SEGMENT_VAR, str(save)],
+                     [POP, VM_SEGMENT_POINTER, "0"]]
+        return code, n_args + n_locals + saves_this
+
+    def __inlineFunction(self, function):
+        """
+        Inlines the calls of a function.
+        :param function: list of the split commands of the function.
+        :return: list of the commands of the function after inlining.
+        """
+        _, name, n_locals = function[0]
+        base = int(n_locals)
+        uses_this = self.__usesThis(function)
+        extra = 0
+        inlined_any = False
+        code = []
+        for command in function[1:]:
+            if command[0] == CALL and \
+                    self.__canInline(name, command[1], int(command[2])):
+                inlined, used = self.__inlineCall(command[1], int(command[2]),
+                                                  base, self.inlined,
+                                                  uses_this)
+                code += inlined
+                extra = max(extra, used)
+                inlined_any = True
+                self.inlined += 1
+            else:
+                code.append(command)
+        commands = [SPACE.join(command) for command in
+                    [[FUNCTION_DEC, name, str(base + extra)]] + code]
+        if inlined_any and self.__optimizer is not None:
+            commands = self.__optimizer.optimize(commands)
+        return commands
+
+    ##################
+    # PUBLIC METHODS #
+    ##################
+
+    def addClass(self, commands):
+        """
+        Adds the functions of a class which may be inlined.
+        :param commands: list of the VM commands of the class (without
+        newlines).
+        """
+        for function in splitFunctions(commands):
+            _, name, n_locals = function[0]
+            if self.__isInlinable(name, function[1:]):
+                self.__callees[name] = (int(n_locals), function[1:])
+
+    def inlineClass(self, commands):
+        """
+        Inlines the calls of small functions in the code of a class. All the
+        classes of the program should be added first.
+        :param commands: list of the VM commands of the class (without
+        newlines).
+        :return: list of the VM commands after inlining.
+        """
+        inlined = []
+        for function in splitFunctions(commands):
+            inlined += self.__inlineFunction(function)
+        return inlined
@@ -0,0 +1,340 @@
+############################################################################
+# Peephole optimizer of VM code. Rewrites the commands of a VM function
+# through a table of rules, each matching a short window of consecutive
+# commands and replacing it by a shorter equivalent sequence, until no rule
+# applies anymore. Labels are local to a function, so every function is
+# optimized on its own (see VMWriter). Whole function rules remove unused
+# labels, and renumber the local variables so that variables which are never
+# live at the same time share a slot, shrinking the frame of the function.
+##############################################################################
+from CompilerDefaults import *
+from VMGrammar import *
+from VMWriter import *
+
+# Rules
+RULE_BRANCHES = "branches"      # cmp; not; if-goto A; goto B; label A
+                                #   --> cmp; if-goto B; label A
+                                # cmp; if-goto A; goto B; label A
+                                #   --> cmp; not; if-goto B; label A
+                                # (if nothing else jumps to A)
+                                # push constant c; if-goto L
+                                #   --> goto L (c != 0) | (nothing)
+RULE_MOVES = "moves"            # push X; pop X --> (nothing)
+RULE_ARRAYS = "arrays"          # push X; pop temp 0; pop pointer 1;
+                                # push temp 0; pop that 0
+                                #   --> pop pointer 1; push X; pop that 0
+RULE_NEGATIONS = "negations"    # not; not --> (nothing), neg; neg too
+RULE_JUMPS = "jumps"            # goto L; label L --> label L
+RULE_DEAD_CODE = "dead-code"    # goto L | return; X --> goto L | return
+                                # (unless X is a label or a function)
+RULE_LABELS = "labels"          # drops labels no goto or if-goto uses
+RULE_LOCALS = "locals"          # shares local slots between variables with
+                                # disjoint live ranges
+RULES = [RULE_BRANCHES, RULE_MOVES, RULE_ARRAYS, RULE_NEGATIONS, RULE_JUMPS,
+         RULE_DEAD_CODE, RULE_LABELS, RULE_LOCALS]
+
+ERROR_UNKNOWN_RULE = "Unknown optimization rule '{}' (expected {})"
+
+VM_COMPARISONS = {VM_EQ, VM_GT, VM_LT}      # Push true (-1) or false (0)
+VM_SELF_INVERSE = {VM_NOT, VM_NEG}
+VM_JUMPS = {GOTO, IF_GOTO}
+
+
+def parseRules(names):
+    """
+    Parses a comma separated list of rule names.
+    :param names: (String) rule names, or "all" for all of the rules.
+    :return: list of the rule names.
+    """
+    if names == RULES_ALL:
+        return list(RULES)
+    rules = [name.strip() for name in names.split(",") if name.strip()]
+    for rule in rules:
+        if rule not in RULES:
+            raise ValueError(ERROR_UNKNOWN_RULE.format(
+                rule, ", ".join(RULES + [RULES_ALL])))
+    return rules
+
+
+class VMOptimizer:
+    """
+    Rewrites VM functions into shorter equivalent VM code.
+    """
+
+    ###############
+    # CONSTRUCTOR #
+    ###############
+
+    def __init__(self, rules=RULES):
+        """
+        Creates a new optimizer applying the given rules.
+        :param rules: names of the rules to apply, out of RULES.
+        """
+        # Rule table: (rule, first commands of the window, window size,
+        # rewrite of the window returning None to keep it)
+        table = [(RULE_BRANCHES,  VM_COMPARISONS, 5, self.__branch),
+                 (RULE_BRANCHES,  VM_COMPARISONS, 4, self.__branchIfTrue),
+                 (RULE_BRANCHES,  {PUSH}, 2, self.__constantBranch),
+                 (RULE_MOVES,     {PUSH}, 2, self.__move),
+                 (RULE_ARRAYS,    {PUSH}, 5, self.__arrayStore),
+                 (RULE_NEGATIONS, VM_SELF_INVERSE, 2, self.__negation),
+                 (RULE_JUMPS,     {GOTO}, 2, self.__jump),
+                 (RULE_DEAD_CODE, {GOTO, RETURN}, 2, self.__deadCode)]
+        self.__rules = dict()
+        for rule, commands, size, rewrite in table:
+            if rule in rules:
+                for command in commands:
+                    self.__rules.setdefault(command, []).append(
+                        (size, rewrite))
+        self.rules = list(rules)
+        self.__window = max([size for _, _, size, _ in table])
+        self.__labels = RULE_LABELS in rules
+        self.__locals = RULE_LOCALS in rules
+        self.__jumps = dict()
+        self.removed = 0
+
+    def __reduce__(self):
+        """
+        Pickles the optimizer by its rules, for worker processes (the rule
+        table holds private methods, which pickle cannot look up).
+        """
+        return VMOptimizer, (self.rules,)
+
+    ###################
+    # PRIVATE METHODS #
+    ###################
+
+    @staticmethod
+    def __branch(window):
+        """
+        A comparison is either true (-1) or false (0), so jumping if its
+        negation is true and otherwise jumping elsewhere is the same as
+        jumping elsewhere if it is true.
+        """
+        _, negation, if_goto, goto, label = window
+        if negation == [VM_NOT] and if_goto[0] == IF_GOTO and \
+                goto[0] == GOTO and label[0] == LABEL and \
+                label[1] == if_goto[1]:
+            return [window[0], [IF_GOTO, goto[1]], label]
+        return None
+
+    def __branchIfTrue(self, window):
+        """
+        Jumping over a jump if a comparison is true is the same as jumping
+        if its negation is true. The label jumped to is left for the labels
+        rule, so it may only be used by the jump over.
+        """
+        _, if_goto, goto, label = window
+        if if_goto[0] == IF_GOTO and goto[0] == GOTO and \
+                label[0] == LABEL and label[1] == if_goto[1] and \
+                self.__jumps.get(label[1]) == 1:
+            return [window[0], [VM_NOT], [IF_GOTO, goto[1]], label]
+        return None
+
+    @staticmethod
+    def __constantBranch(window):
+        push, if_goto = window
+        if push[1] == VM_SEGMENT_CONSTANT and if_goto[0] == IF_GOTO:
+            if push[2] != "0":
+                return [[GOTO, if_goto[1]]]
+            return []
+        return None
+
+    @staticmethod
+    def __move(window):
+        push, pop = window
+        if pop[0] == POP and pop[1:] == push[1:]:
+            return []
+        return None
+
+    @staticmethod
+    def __arrayStore(window):
+        """
+        The stored value may be pushed after the element address is popped,
+        unless pushing it reads through the address.
+        """
+        push = window[0]
+        if window[1:] == [[POP, VM_SEGMENT_TEMP, "0"],
+                          [POP, VM_SEGMENT_POINTER, "1"],
+                          [PUSH, VM_SEGMENT_TEMP, "0"],
+                          [POP, VM_SEGMENT_THAT, "0"]] and \
+                push[1] != VM_SEGMENT_THAT and \
+                push[1:] != [VM_SEGMENT_POINTER, "1"]:
+            return [window[2], push, window[4]]
+        return None
+
+    @staticmethod
+    def __negation(window):
+        if window[1] == window[0]:
+            return []
+        return None
+
+    @staticmethod
+    def __jump(window):
+        goto, label = window
+        if label[0] == LABEL and label[1] == goto[1]:
+            return [label]
+        return None
+
+    @staticmethod
+    def __deadCode(window):
+        if window[1][0] not in {LABEL, FUNCTION_DEC}:
+            return [window[0]]
+        return None
+
+    def __applyRules(self, code):
+        """
+        Applies the window rules at every position of the code.
+        :return: True if the code changed.
+        """
+        rules = self.__rules
+        changed = False
+        # Jumps by label (the rewrites never add jumps to a label, so the
+        # counts are never too low during the pass)
+        self.__jumps = dict()
+        for command in code:
+            if command[0] in VM_JUMPS:
+                self.__jumps[command[1]] = self.__jumps.get(command[1], 0) + 1
+        i = 0
+        while i < len(code):
+            for size, rewrite in rules.get(code[i][0], ()):
+                window = code[i:i + size]
+                if len(window) < size:
+                    continue
+                replacement = rewrite(window)
+                if replacement is not None:
+                    code[i:i + size] = replacement
+                    changed = True
+                    # Earlier windows may match now
+                    i = max(i - self.__window, -1)
+                    break
+            i += 1
+        return changed
+
+    def __removeLabels(self, code):
+        """
+        Removes the labels which are not jumped to.
+        :return: True if the code changed.
+        """
+        targets = {command[1] for command in code if command[0] in VM_JUMPS}
+        length = len(code)
+        code[:] = [command for command in code
+                   if command[0] != LABEL or command[1] in targets]
+        return len(code) != length
+
+    @staticmethod
+    def __liveLocals(code):
+        """
+        Computes which local variables are live (read before being written
+        again, on some path) before every command of a function.
+        :return: list of bit masks of the live slots, by command (one more
+        for the end of the code), or None if a jump leaves the function.
+        """
+        labels = {command[1]: i for i, command in enumerate(code)
+                  if command[0] == LABEL}
+        for command in code:
+            if command[0] in VM_JUMPS and command[1] not in labels:
+                return None
+        live = [0] * (len(code) + 1)
+        changed = True
+        while changed:
+            changed = False
+            for i in range(len(code) - 1, -1, -1):
+                command = code[i]
+                operation = command[0]
+                if operation == RETURN:
+                    mask = 0
+                elif operation == GOTO:
+                    mask = live[labels[command[1]]]
+                elif operation == IF_GOTO:
+                    mask = live[i + 1] | live[labels[command[1]]]
+                else:
+                    mask = live[i + 1]
+                if len(command) == 3 and command[1] == VM_SEGMENT_VAR:
+                    if operation == PUSH:
+                        mask |= 1 << int(command[2])
+                    elif operation == POP:
+                        mask &= ~(1 << int(command[2]))
+                if mask != live[i]:
+                    live[i] = mask
+                    changed = True
+        return live
+
+    def __reuseLocals(self, code):
+        """
+        Renumbers the local variables of a function, so variables which are
+        never live at the same time share a slot. Variables read before being
+        written hold the zero the VM initializes them with, so they are live
+        from the start of the function.
+        :return: True if the code changed.
+        """
+        if not code or code[0][0] != FUNCTION_DEC:
+            return False
+        n_locals = int(code[0][2])
+        used = 0
+        for command in code:
+            if len(command) == 3 and command[1] == VM_SEGMENT_VAR:
+                used |= 1 << int(command[2])
+        live = self.__liveLocals(code)
+        if live is None or used >> n_locals:
+            return False
+
+        # Interference: a variable written while another one is live
+        neighbours = [0] * n_locals
+        for slot in range(n_locals):
+            if live[1] >> slot & 1:
+                neighbours[slot] |= live[1]
+        for i, command in enumerate(code):
+            if command[0] == POP and command[1] == VM_SEGMENT_VAR:
+                slot = int(command[2])
+                # Live after the command (it is not a jump)
+                after = live[i + 1]
+                neighbours[slot] |= after
+                for other in range(n_locals):
+                    if after >> other & 1:
+                        neighbours[other] |= 1 << slot
+
+        # Greedy coloring, by slot
+        colors = []
+        for slot in range(n_locals):
+            taken = {colors[other] for other in range(slot)
+                     if neighbours[slot] >> other & 1 and
+                     used >> other & 1}
+            color = 0
+            while color in taken:
+                color += 1
+            colors.append(color)
+        n_used = max([colors[slot] + 1 for slot in range(n_locals)
+                      if used >> slot & 1] or [0])
+
+        changed = n_used != n_locals
+        code[0][2] = str(n_used)
+        for command in code:
+            if len(command) == 3 and command[1] == VM_SEGMENT_VAR:
+                color = str(colors[int(command[2])])
+                if command[2] != color:
+                    command[2] = color
+                    changed = True
+        return changed
+
+    ##################
+    # PUBLIC METHODS #
+    ##################
+
+    def optimize(self, commands):
+        """
+        Optimizes the code of a VM function.
+        :param commands: list of the VM commands of the function (without
+        newlines).
+        :return: list of the optimized VM commands.
+        """
+        code = [command.split(SPACE) for command in commands]
+        changed = True
+        while changed:
+            changed = self.__applyRules(code)
+            if self.__labels and self.__removeLabels(code):
+                changed = True
+            if self.__locals and self.__reuseLocals(code):
+                changed = True
+        self.removed += len(commands) - len(code)
+        return [SPACE.join(command) for command in code]
@@ -47,13 +47,31 @@ class VMWriter:
     # CONSTRUCTORS #
     ################
 
-    def __init__(self, in_filename, output_file):
+    def __init__(self, in_filename, output_file, optimizer=None):
         """
         Create a new VMWriter object, creates a new output file and prepares it
         for writing
+        :param optimizer: VMOptimizer to pass every function through (or
+        None). The commands of the current function are then buffered; call
+        flush() when done.
         """
         self.__in_filename = in_filename
         self.__output = output_file
+        self.__optimizer = optimizer
+        self.__commands = list()
+
+    ###################
+    # PRIVATE METHODS #
+    ###################
+
+    def __write(self, command):
+        """
+        Writes a VM command to the output, or buffers it for the optimizer.
+        """
+        if self.__optimizer is None:
+            self.__output.write(command + NEWLINE)
+        else:
+            self.__commands.append(command)
 
     ##################
     # PUBLIC METHODS #
@@ -65,8 +83,7 @@ class VMWriter:
         :param segment: CONST, ARG, LOCAL, STATIC, THIS, THAT, POINTER, TEMP.
         :param index: The index of a register in the segment.
         """
-        self.__output.write(
-            PUSH + SPACE + segment + SPACE + str(index) + NEWLINE)
+        self.__write(PUSH + SPACE + segment + SPACE + str(index))
 
     def writePop(self, segment, index):
         """
@@ -79,8 +96,7 @@ class VMWriter:
         if segment == vg.VM_SEGMENT_CONSTANT:
             raise ValueError(POP_TO_CONST_MSG)
 
-        self.__output.write(POP + SPACE + segment + SPACE + str(index) +
-                            NEWLINE)
+        self.__write(POP + SPACE + segment + SPACE + str(index))
 
     def writeArithmetic(self, command, isBinary=True):
         """
@@ -91,21 +107,21 @@ class VMWriter:
         if isBinary:
             translate = vg.JACK_2_VM_ARITHMETIC_BINARY
         vm_command = translate[command]
-        self.__output.write(vm_command + NEWLINE)
+        self.__write(vm_command)
 
     def writeLabel(self, label):
         """
         Writes a VM label command.
         :param label: Label's name.
         """
-        self.__output.write(LABEL + SPACE + label + NEWLINE)
+        self.__write(LABEL + SPACE + label)
 
     def writeGoto(self, label):
         """
         Writes a VM label command.
         :param label: Label's name.
         """
-        self.__output.write(GOTO + SPACE + label + NEWLINE)
+        self.__write(GOTO + SPACE + label)
 
     def writeIf(self, label):
         """
@@ -113,7 +129,7 @@ class VMWriter:
         :param label: The name of the label into which the instruction pointer
         will jump to if the condition is fulfilled.
         """
-        self.__output.write(IF_GOTO + SPACE + label + NEWLINE)
+        self.__write(IF_GOTO + SPACE + label)
 
     def writeCall(self, name, n_args):
         """
@@ -122,8 +138,7 @@ class VMWriter:
         :param n_args: The number of arguments of the called function.
         """
         #funcname = self.__funcname(name)
-        self.__output.write(
-            CALL + SPACE + name + SPACE + str(n_args) + NEWLINE)
+        self.__write(CALL + SPACE + name + SPACE + str(n_args))
 
     def writeFunction(self, name, n_locals):
         """
@@ -132,8 +147,8 @@ class VMWriter:
         :param n_locals: The number of local variables it has.
         """
         #funcname = self.__funcname(name)
-        self.__output.write(
-            FUNCTION_DEC + SPACE + name + SPACE + str(n_locals) + NEWLINE)
+        self.flush()
+        self.__write(FUNCTION_DEC + SPACE + name + SPACE + str(n_locals))
 
     def writeReturn(self, isVoid=False):
         """
@@ -142,9 +157,9 @@ class VMWriter:
         # Void functions forced to push 0 before returning
         # (Non-void already pushed return value before reaching here)
         if (isVoid):
-            self.__output.write(PUSH_VOID + NEWLINE)
+            self.__write(PUSH_VOID)
         # Write 'return' statement
-        self.__output.write(RETURN + NEWLINE)
+        self.__write(RETURN)
 
     def writeSymbol(self, symbol):
         """
@@ -156,10 +171,21 @@ class VMWriter:
         elif symbol in vg.RE_BRACKETS_SQUARE_RIGHT:  # x[1] --> ]=add
            self.writeArithmetic(vg.RE_PLUS, True)
 
+    def flush(self):
+        """
+        Optimizes the buffered function and writes it to the output.
+        """
+        if self.__commands:
+            commands = self.__optimizer.optimize(self.__commands)
+            if commands:
+                self.__output.write(NEWLINE.join(commands) + NEWLINE)
+            self.__commands.clear()
+
     def close(self):
         """
         Closes the output file.
         """
+        self.flush()
         self.__output.close()
 
 ########################
@@ -0,0 +1,297 @@
+############################################################################
+# Emits the syntax tree of Jack code (see JackAST) as a structured printout
+# of the code, wrapped in XML tags. Every node is written as the tags of the
+# tokens it was parsed from, nested in the tag of its syntactic element.
+# Identifiers are annotated with their category, status, segment and index.
+##############################################################################
+from JackAST import *
+from JackParser import PRIMITIVE_TYPES
+from XMLWriter import *
+
+# Identifiers
+STATUS_DEFINE = "definition"
+STATUS_USE = "usage"
+CATEGORY_VAR = KIND_VAR
+CATEGORY_ARG = KIND_ARG
+CATEGORY_STATIC = KIND_STATIC
+CATEGORY_FIELD = KIND_FIELD
+CATEGORY_CLASS = RE_CLASS
+CATEGORY_SUBROUTINE = "subroutine"
+
+
+class XMLGenerator:
+    ###############
+    # CONSTRUCTOR #
+    ###############
+
+    def __init__(self, xml_writer):
+        """
+        Creates a new XML generator writing into the given XMLWriter.
+        The generator is fed a class by beginClass(), generateSubroutine()
+        for each of its subroutines, and endClass().
+        """
+        self.__xmlWriter = xml_writer
+        self.__openTag = xml_writer.openTag
+        self.__closeTag = xml_writer.closeTag
+        self.__writeToken = xml_writer.writeToken
+        self.__writeIdentifier = xml_writer.writeIdentifier
+        self.__statements = {LetStatement:      self.__generateLet,
+                             IfStatement:       self.__generateIf,
+                             WhileStatement:    self.__generateWhile,
+                             DoStatement:       self.__generateDo,
+                             ReturnStatement:   self.__generateReturn}
+        self.__terms = {IntegerConstant:    self.__generateIntVal,
+                        StringConstant:     self.__generateStringVal,
+                        KeywordConstant:    self.__generateKeywordConstant,
+                        VarTerm:            self.__generateVarTerm,
+                        ArrayTerm:          self.__generateArrayTerm,
+                        SubroutineCall:     self.__generateSubroutineCall,
+                        ParenTerm:          self.__generateParenTerm,
+                        UnaryTerm:          self.__generateUnaryTerm,
+                        EmptyTerm:          self.__generateEmptyTerm}
+
+    ###################
+    # PRIVATE METHODS #
+    ###################
+
+    def __keyWord(self, keyword):
+        self.__writeToken(keyword, TOKEN_TYPE_KEYWORD)
+
+    def __symbol(self, symbol):
+        self.__writeToken(symbol, TOKEN_TYPE_SYMBOL)
+
+    def __type(self, type):
+        """
+        Generates a type.
+        Syntax:
+        'int' | 'char' | 'boolean' | className
+        """
+        if type in PRIMITIVE_TYPES:
+            self.__keyWord(type)
+        else:
+            self.__writeIdentifier(type, CATEGORY_CLASS, STATUS_USE,
+                                   KIND_NONE, INDEX_NONE)
+
+    def __varName(self, name, status, index=INDEX_NONE):
+        self.__writeIdentifier(name, CATEGORY_VAR, status, KIND_VAR, index)
+
+    def __varNames(self, names):
+        """
+        Generates varName (',' varName)* ';'
+        """
+        for i, name in enumerate(names):
+            if i:
+                self.__symbol(RE_COMMA)             #   ','
+            self.__varName(name, STATUS_DEFINE)     #   varName
+        self.__symbol(RE_SEMICOLON)                 #   ';'
+
+    def __generateClassVarDec(self, node):
+        self.__openTag('classVarDec')       # <classVarDec>
+        self.__keyWord(node.kind)           #   ('static' | 'field')
+        self.__type(node.type)              #   type
+        self.__varNames(node.names)         #   varName (',' varName)* ';'
+        self.__closeTag()                   # </classVarDec>
+
+    def __generateParameterList(self, parameters):
+        self.__openTag('parameterList')     # <parameterList>
+        for i, (type, name) in enumerate(parameters):
+            if i:
+                self.__symbol(RE_COMMA)     #   ','
+            self.__type(type)               #   type
+            self.__varName(name, STATUS_DEFINE)
+        self.__closeTag()                   # </parametersList>
+
+    def __generateVarDec(self, node):
+        self.__openTag('varDec')            # <varDec>
+        self.__keyWord(RE_VAR)              #   'var'
+        self.__type(node.type)              #   type
+        self.__varNames(node.names)         #   varName (',' varName)* ';'
+        self.__closeTag()                   # </varDec>
+
+    def __generateStatements(self, statements):
+        self.__openTag('statements')        # <statements>
+        for statement in statements:
+            self.__statements[type(statement)](statement)
+        self.__closeTag()                   # </statements>
+
+    def __generateDo(self, node):
+        self.__openTag('doStatement')               # <doStatement>
+        self.__keyWord(RE_DO)                       #   'do'
+        self.__generateSubroutineCall(node.call)    #   subroutineCall
+        self.__symbol(RE_SEMICOLON)                 #   ';'
+        self.__closeTag()                           # </doStatement>
+
+    def __generateLet(self, node):
+        self.__openTag('letStatement')              # <letStatement>
+        self.__keyWord(RE_LET)                      #   'let'
+        self.__varName(node.name, STATUS_USE,       #   varName
+                       node.index)
+        if node.subscript is not None:
+            self.__symbol(RE_BRACKETS_SQUARE_LEFT)  #   '['
+            self.__generateExpression(
+                node.subscript)                     #   expression
+            self.__symbol(RE_BRACKETS_SQUARE_RIGHT) #   ']'
+        self.__symbol(RE_EQ)                        #   '='
+        self.__generateExpression(node.value)       #   expression
+        self.__symbol(RE_SEMICOLON)                 #   ';'
+        self.__closeTag()                           # </letStatement>
+
+    def __generateWhile(self, node):
+        self.__openTag('whileStatement')            # <whileStatement>
+        self.__keyWord(RE_WHILE)                    #   'while'
+        self.__symbol(RE_BRACKETS_LEFT)             #   '('
+        self.__generateExpression(node.condition)   #   expression
+        self.__symbol(RE_BRACKETS_RIGHT)            #   ')'
+        self.__symbol(RE_BRACKETS_CURLY_LEFT)       #   '{'
+        self.__generateStatements(node.statements)  #   statements
+        self.__symbol(RE_BRACKETS_CURLY_RIGHT)      #   '}'
+        self.__closeTag()                           # </whileStatement>
+
+    def __generateReturn(self, node):
+        self.__openTag('returnStatement')           # <returnStatement>
+        self.__keyWord(RE_RETURN_SOMETHING)         #   'return'
+        if node.value is not None:
+            self.__generateExpression(node.value)   #   expression
+        self.__symbol(RE_SEMICOLON)                 #   ';'
+        self.__closeTag()                           # </returnStatement>
+
+    def __generateIf(self, node):
+        self.__openTag('ifStatement')               # <ifStatement>
+        self.__keyWord(RE_IF)                       #   'if'
+        self.__symbol(RE_BRACKETS_LEFT)             #   '('
+        self.__generateExpression(node.condition)   #   expression
+        self.__symbol(RE_BRACKETS_RIGHT)            #   ')'
+        self.__symbol(RE_BRACKETS_CURLY_LEFT)       #   '{'
+        self.__generateStatements(node.statements)  #   statements
+        self.__symbol(RE_BRACKETS_CURLY_RIGHT)      #   '}'
+        if node.else_statements is not None:
+            self.__keyWord(RE_ELSE)                 #   'else'
+            self.__symbol(RE_BRACKETS_CURLY_LEFT)   #   '{'
+            self.__generateStatements(
+                node.else_statements)               #   statements
+            self.__symbol(RE_BRACKETS_CURLY_RIGHT)  #   '}'
+        self.__closeTag()                           # </ifStatement>
+
+    def __generateExpression(self, node):
+        self.__openTag('expression')        # <expression>
+        terms = node.terms
+        self.__generateTerm(terms[0])       # term
+        for op, term in zip(node.ops, terms[1:]):
+            self.__symbol(op)               # op
+            self.__generateTerm(term)       # term
+        self.__closeTag()                   # </expression>
+
+    def __generateTerm(self, node):
+        self.__openTag('term')              # <term>
+        self.__terms[type(node)](node)
+        self.__closeTag()                   # </term>
+
+    def __generateIntVal(self, node):
+        self.__writeToken(node.value, TOKEN_TYPE_INTEGER)
+
+    def __generateStringVal(self, node):
+        self.__writeToken(node.value, TOKEN_TYPE_STRING)
+
+    def __generateKeywordConstant(self, node):
+        self.__keyWord(node.keyword)
+
+    def __generateVarTerm(self, node):
+        self.__writeIdentifier(node.name, node.kind, STATUS_USE, node.kind,
+                               node.index)
+
+    def __generateArrayTerm(self, node):
+        self.__varName(node.name, STATUS_USE, node.index)   # varName
+        self.__symbol(RE_BRACKETS_SQUARE_LEFT)              # '['
+        self.__generateExpression(node.subscript)           # expression
+        self.__symbol(RE_BRACKETS_SQUARE_RIGHT)             # ']'
+
+    def __generateParenTerm(self, node):
+        self.__symbol(RE_BRACKETS_LEFT)                     # '('
+        self.__generateExpression(node.expression)          # expression
+        self.__symbol(RE_BRACKETS_RIGHT)                    # ')'
+
+    def __generateUnaryTerm(self, node):
+        self.__symbol(node.op)                              # unaryOp
+        self.__generateTerm(node.term)                      # term
+
+    def __generateEmptyTerm(self, node):
+        pass
+
+    def __generateSubroutineCall(self, node):
+        if node.target is not None:                 # className | varName
+            if node.kind != KIND_NONE:              # varName
+                self.__writeIdentifier(node.target, node.kind, STATUS_USE,
+                                       node.kind, node.index)
+            else:                                   # className
+                self.__writeIdentifier(node.target, CATEGORY_CLASS,
+                                       STATUS_USE, KIND_NONE, INDEX_NONE)
+            self.__symbol(RE_DOT)                   # '.'
+        self.__writeIdentifier(node.name,           # subroutineName
+                               CATEGORY_SUBROUTINE, STATUS_USE, KIND_NONE,
+                               INDEX_NONE)
+        self.__symbol(RE_BRACKETS_LEFT)             # '('
+        self.__openTag('expressionList')            # <expressionList>
+        for i, argument in enumerate(node.arguments):
+            if i:
+                self.__symbol(RE_COMMA)             #   ','
+            self.__generateExpression(argument)     #   expression
+        self.__closeTag()                           # </expressionList>
+        self.__symbol(RE_BRACKETS_RIGHT)            # ')'
+
+    ##################
+    # PUBLIC METHODS #
+    ##################
+
+    def beginClass(self, node):
+        """
+        Generates the beginning of a class, up to its first subroutine.
+        :param node: ClassNode of the class.
+        """
+        self.__openTag('class')                     # <class>
+        self.__keyWord(RE_CLASS)                    #   'class'
+        self.__writeIdentifier(node.name, CATEGORY_CLASS, STATUS_DEFINE,
+                               KIND_NONE, INDEX_NONE)   #   className
+        self.__symbol(RE_BRACKETS_CURLY_LEFT)       #   '{'
+        for var_dec in node.var_decs:
+            self.__generateClassVarDec(var_dec)     #   classVarDec*
+
+    def generateSubroutine(self, node):
+        """
+        Generates a complete method, function, or constructor.
+        :param node: Subroutine node.
+        """
+        self.__openTag('subroutineDec')             # <subroutineDec>
+        self.__keyWord(node.kind)                   #   ('constructor' |
+                                                    #   'function' | 'method')
+        if node.return_type == RE_VOID:
+            self.__keyWord(RE_VOID)                 #   'void'
+        else:
+            self.__type(node.return_type)           #   type
+        self.__writeIdentifier(node.name,           #   subroutineName
+                               CATEGORY_SUBROUTINE, STATUS_DEFINE, KIND_NONE,
+                               INDEX_NONE)
+        self.__symbol(RE_BRACKETS_LEFT)             #   '('
+        self.__generateParameterList(
+            node.parameters)                        #   parameterList
+        self.__symbol(RE_BRACKETS_RIGHT)            #   ')'
+        self.__openTag('subroutineBody')            #   <subroutineBody>
+        self.__symbol(RE_BRACKETS_CURLY_LEFT)       #     '{'
+        for var_dec in node.var_decs:
+            self.__generateVarDec(var_dec)          #     varDec*
+        self.__generateStatements(node.statements)  #     statements
+        self.__symbol(RE_BRACKETS_CURLY_RIGHT)      #     '}'
+        self.__closeTag()                           #   </subroutineBody>
+        self.__closeTag()                           # </subroutineDec>
+
+    def endClass(self):
+        """
+        Generates the end of a class, after its last subroutine.
+        """
+        self.__symbol(RE_BRACKETS_CURLY_RIGHT)      #   '}'
+        self.__closeTag()                           # </class>
+
+    def flush(self):
+        """
+        Writes the buffered XML to the output.
+        """
+        self.__xmlWriter.flush()
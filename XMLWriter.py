@@ -0,0 +1,136 @@
+############################################################
+# This class writes the parse tree of Jack code as XML tags
+# into a file. It encapsulates the XML syntax.
+############################################################
+from JackTokenizer import *
+from SymbolTable import *
+
+#############
+# CONSTANTS #
+#############
+XML_DELIM_TERMINAL = " "
+XML_INDENT_CHAR = "  "
+XML_NO_INDENT = ""
+INDEX_NONE = -1
+FLUSH_PARTS = 1 << 13  # Buffered strings written to the output at once
+
+
+##############
+# XML WRITER #
+##############
+
+class XMLWriter:
+    """
+    Writes the parse tree tags into the output file.
+    Tags are appended into a buffer which is written out in large chunks;
+    call flush() when done.
+    """
+
+    ################
+    # CONSTRUCTORS #
+    ################
+
+    def __init__(self, output_file, indent=True):
+        """
+        Create a new XMLWriter object writing into the given (open) file.
+        :param indent: indent inner tags (False for compact output).
+        """
+        self.__output = output_file
+        self.__stack = list()
+        self.__buffer = list()
+        self.__indent_char = XML_INDENT_CHAR if indent else XML_NO_INDENT
+        self.__indents = [EMPTY_STRING]
+        self.__indent = EMPTY_STRING
+        self.__open_tags = dict()
+        self.__close_tags = dict()
+        self.__token_tags = dict()
+
+    ###################
+    # PRIVATE METHODS #
+    ###################
+
+    def __write(self, tag):
+        """
+        Appends the given tag to the output buffer, flushing the buffer once
+        it is large enough.
+        """
+        buffer = self.__buffer
+        buffer.append(tag)
+        if len(buffer) >= FLUSH_PARTS:
+            self.flush()
+
+    def __setDepth(self, depth):
+        """
+        Sets the indentation of the following tags to the given depth.
+        """
+        while len(self.__indents) <= depth:
+            self.__indents.append(self.__indents[-1] + self.__indent_char)
+        self.__indent = self.__indents[depth]
+
+    def __tokenTag(self, token_type):
+        """
+        Returns the (prefix, suffix) wrapping a token of the given type.
+        """
+        if token_type not in self.__token_tags:
+            self.__token_tags[token_type] = (
+                "<{}>{}".format(token_type, XML_DELIM_TERMINAL),
+                "{}</{}>\n".format(XML_DELIM_TERMINAL, token_type))
+        return self.__token_tags[token_type]
+
+    ##################
+    # PUBLIC METHODS #
+    ##################
+
+    def writeToken(self, token, token_type):
+        """
+        Writes the given token as an xml tag to the output.
+        :param token: token tag value
+        :param token_type: token tag type
+        """
+        prefix, suffix = self.__tokenTag(token_type)
+        self.__write(self.__indent + prefix + token + suffix)
+
+    def writeIdentifier(self, identifier, category, status, kind, index):
+        """
+        Writes the given identifier as an xml tag to the output, annotated
+        with its category, status, and (if known) its segment and index.
+        """
+        info = "[" + category + " " + status
+        if kind != KIND_NONE:
+            info += " " + KIND_2_SEGMENT[kind]
+        if index != INDEX_NONE:
+            info += " " + str(index)
+        self.writeToken(info + "] " + identifier, TOKEN_TYPE_IDENTIFIER)
+
+    def openTag(self, tagName):
+        """
+        Open an XML tag with the given name.
+        All following tags will be written as inner tags until closeTag()
+        is called.
+        :param tagName: name of the tag to open
+        """
+        if tagName not in self.__open_tags:
+            self.__open_tags[tagName] = "<{}>\n".format(tagName)
+            self.__close_tags[tagName] = "</{}>\n".format(tagName)
+        self.__write(self.__indent + self.__open_tags[tagName])
+        self.__stack.append(tagName)
+        self.__setDepth(len(self.__stack))
+
+    def closeTag(self):
+        """
+        Close the current open XML tag.
+        All following tags will be written as outer tags in the previous
+        indentation level.
+        """
+        tagName = self.__stack.pop()
+        self.__setDepth(len(self.__stack))
+        self.__write(self.__indent + self.__close_tags[tagName])
+
+    def flush(self):
+        """
+        Writes the buffered tags to the output.
+        """
+        if self.__buffer:
+            self.__output.write(EMPTY_STRING.join(self.__buffer))
+            self.__buffer.clear()
+